@@ -0,0 +1,774 @@
+"""
+Benchmark do compilador
+
+Gera programas .mc sintéticos (válidos ou com erros de propósito) e mede,
+separadamente, o Scanner, o Parser e a análise completa (analyze_code):
+tokens por segundo, MB por segundo e pico de memória.
+
+Uso:
+  python3 benchmark.py                          # roda e mostra os resultados
+  python3 benchmark.py --salvar=base.json       # grava os resultados em JSON
+  python3 benchmark.py --base=base.json         # compara com resultados gravados
+                                                # (sai com código 1 se piorou)
+  python3 benchmark.py --gerar=pasta            # só grava programas gerados
+  python3 benchmark.py --verificar-motores      # compara os motores entre si
+                                                # (sai com código 1 se diferem)
+"""
+# Importa recursos para usar anotações de tipo mais modernas
+from __future__ import annotations
+
+# Importa sys para acessar argumentos da linha de comando e sair do programa
+import sys
+# Importa os para descartar a saída do analyze_code (os.devnull)
+import os
+# Importa json para gravar e ler os resultados
+import json
+# Importa platform para registrar a versão do Python nos resultados
+import platform
+# Importa random para gerar os programas (com semente fixa: sempre iguais)
+import random
+# Importa io para passar os programas gerados ao StreamScanner
+import io
+# Importa time para medir o tempo de cada fase
+import time
+# Importa tracemalloc para medir o pico de memória de cada fase
+import tracemalloc
+# Importa contextlib para redirecionar a saída do analyze_code
+import contextlib
+# Importa zlib para tirar a semente de cada caso do nome dele
+import zlib
+# Importa Path para trabalhar com caminhos de arquivos
+from pathlib import Path
+# Importa dataclass para criar classes de dados de forma simples
+from dataclasses import dataclass, asdict
+# Importa Optional para as anotações de retorno que podem ser None
+from typing import Optional
+
+# Importa o compilador
+from main import (RECOVERY_TOKENS, SCANNER_ENGINES, BytesScanner, Colors, IncrementalDocument,
+                  LexicalError, Parser, RegexScanner, Scanner, StreamScanner, TokenBuffer,
+                  TokenType, analyze_code, parse_options)
+
+
+# ============================================================================
+# GERADOR DE PROGRAMAS
+# ============================================================================
+# Gera programas seguindo a gramática da linguagem:
+#   DECLARAÇÃO -> TIPO IDENTIFIER = EXPRESSAO | IDENTIFIER = EXPRESSAO
+#               | print ( EXPRESSAO ) | if ( EXPRESSAO ) DECLARAÇÃO [else DECLARAÇÃO]
+# Cada variável é declarada antes de ser usada (o programa é válido), a não
+# ser nas declarações quebradas de propósito, que têm um erro sintático
+# (falta '=', falta ')', falta o nome) ou semântico (variável não declarada).
+# - depth: quantos if aninhados e parênteses aninhados, no máximo
+# - comment_density: chance de um comentário antes de cada declaração
+# - broken_ratio: chance de cada declaração ter um erro
+# ============================================================================
+# Operadores aritméticos e de comparação
+ARITHMETIC = ("+", "-", "*", "/")
+COMPARISONS = (">", ">=", "<", "<=", "==", "!=")
+
+
+class ProgramGenerator:
+    # Construtor - recebe os parâmetros do programa e a semente
+    def __init__(self, depth: int = 4, comment_density: float = 0.1,
+                 broken_ratio: float = 0.0, seed: int = 0) -> None:
+        self.depth = depth
+        self.comment_density = comment_density
+        self.broken_ratio = broken_ratio
+        # Gerador de números aleatórios próprio (a semente fixa o programa)
+        self.random = random.Random(seed)
+        # Variáveis já declaradas
+        self.variables: list[str] = []
+        # Contador para nomes novos (variáveis e comentários)
+        self._counter = 0
+
+    # Gera um programa com pelo menos 'size' caracteres
+    def generate(self, size: int) -> str:
+        lines = []
+        length = 0
+        while length < size:
+            # Comentário antes da declaração (de linha ou de bloco)
+            if self.random.random() < self.comment_density:
+                lines.append(self._comment())
+                length += len(lines[-1]) + 1
+            # Declaração (com erro, na proporção pedida)
+            if self.random.random() < self.broken_ratio:
+                lines.append(self._broken_statement())
+            else:
+                lines.append(self._statement(self.depth, 0))
+            length += len(lines[-1]) + 1
+        return "\n".join(lines) + "\n"
+
+    # Nome novo (nunca repetido)
+    def _new_name(self, prefix: str = "v") -> str:
+        self._counter += 1
+        return f"{prefix}{self._counter}"
+
+    # Comentário de linha ou de bloco
+    def _comment(self) -> str:
+        self._counter += 1
+        if self.random.random() < 0.7:
+            return f"# comentário {self._counter}: calcula os valores seguintes"
+        return f"/* bloco {self._counter}\n   explica o trecho abaixo\n   em várias linhas */"
+
+    # Número inteiro ou decimal (ex: 42, 3.14, .5)
+    def _number(self) -> str:
+        choice = self.random.random()
+        if choice < 0.6:
+            return str(self.random.randint(0, 999))
+        if choice < 0.9:
+            return f"{self.random.randint(0, 99)}.{self.random.randint(0, 99)}"
+        return f".{self.random.randint(1, 9)}"
+
+    # Número ou variável já declarada
+    def _operand(self) -> str:
+        if self.variables and self.random.random() < 0.6:
+            return self.random.choice(self.variables)
+        return self._number()
+
+    # Expressão aritmética com até 'depth' parênteses aninhados
+    def _expression(self, depth: int) -> str:
+        parts = [self._operand()]
+        for _ in range(self.random.randint(0, 2)):
+            parts.append(self.random.choice(ARITHMETIC))
+            parts.append(self._operand())
+        # Subexpressão entre parênteses (um nível a mais)
+        if depth > 0 and self.random.random() < 0.5:
+            parts.append(self.random.choice(ARITHMETIC))
+            parts.append(f"({self._expression(depth - 1)})")
+        return " ".join(parts)
+
+    # Condição de um if (comparação entre duas expressões)
+    def _condition(self, depth: int) -> str:
+        return f"{self._expression(depth)} {self.random.choice(COMPARISONS)} {self._expression(depth)}"
+
+    # Declaração válida (depth: quantos if ainda podem ser aninhados)
+    def _statement(self, depth: int, indent: int) -> str:
+        prefix = "    " * indent
+        choice = self.random.random()
+        # Declaração de variável nova (sempre, enquanto não há variáveis)
+        if not self.variables or choice < 0.3:
+            # O valor é gerado antes (a variável ainda não existe nele)
+            value = self._expression(self.depth)
+            name = self._new_name()
+            self.variables.append(name)
+            return f"{prefix}{self.random.choice(('int', 'float'))} {name} = {value}"
+        if choice < 0.45:
+            return f"{prefix}{self.random.choice(self.variables)} = {self._expression(self.depth)}"
+        if choice < 0.7 or depth <= 0:
+            return f"{prefix}print({self._expression(self.depth)})"
+        # if com uma declaração (que pode ser outro if) e, às vezes, else
+        text = f"{prefix}if ({self._condition(self.depth)})\n{self._statement(depth - 1, indent + 1)}"
+        if self.random.random() < 0.4:
+            text += f"\n{prefix}else\n{self._statement(depth - 1, indent + 1)}"
+        return text
+
+    # Declaração com um erro sintático ou semântico
+    def _broken_statement(self) -> str:
+        value = self._expression(self.depth)
+        choice = self.random.randint(0, 3)
+        if choice == 0:
+            # Falta o '='
+            return f"int {self._new_name()} {value}"
+        if choice == 1:
+            # Falta o ')'
+            return f"print({value}"
+        if choice == 2:
+            # Falta o nome da variável
+            return f"float = {value}"
+        # Variável nunca declarada
+        return f"print({self._new_name('indefinida')} + {value})"
+
+
+# ============================================================================
+# CASOS DO BENCHMARK
+# ============================================================================
+# Cada caso é um programa gerado (sempre o mesmo, pela semente) medido em
+# cada fase. O tamanho é multiplicado por --escala.
+# ============================================================================
+@dataclass
+class BenchmarkCase:
+    name: str                    # Nome do caso
+    size: int                    # Tamanho do programa (caracteres)
+    depth: int = 4               # Aninhamento máximo
+    comment_density: float = 0.1 # Chance de comentário por declaração
+    broken_ratio: float = 0.0    # Chance de erro por declaração
+
+    # Gera o programa do caso
+    def program(self, scale: float = 1.0) -> str:
+        generator = ProgramGenerator(self.depth, self.comment_density, self.broken_ratio, seed=zlib.crc32(self.name.encode()))
+        return generator.generate(int(self.size * scale))
+
+
+BENCHMARK_CASES = (
+    BenchmarkCase("pequeno", 20_000),
+    BenchmarkCase("medio", 200_000),
+    BenchmarkCase("aninhado", 200_000, depth=12),
+    BenchmarkCase("comentarios", 200_000, comment_density=0.6),
+    BenchmarkCase("quebrado", 200_000, broken_ratio=0.1),
+)
+
+
+# Resultado de uma fase num caso
+@dataclass
+class BenchmarkResult:
+    case: str                    # Nome do caso
+    phase: str                   # "scanner", "parser" ou "analyze_code"
+    bytes: int                   # Tamanho do programa (bytes UTF-8)
+    tokens: int                  # Quantidade de tokens
+    seconds: float               # Melhor tempo entre as repetições
+    tokens_per_second: float
+    mb_per_second: float
+    peak_memory_mb: float        # Pico de memória alocada durante a fase
+
+
+# ============================================================================
+# MEDIÇÃO
+# ============================================================================
+# Cada fase roda 'repeats' vezes e vale o menor tempo (o menos afetado por
+# outros processos). O pico de memória é medido numa execução separada, com
+# tracemalloc (que deixa a execução mais lenta e não pode entrar no tempo).
+# ============================================================================
+# Mede o menor tempo de 'repeats' execuções e o pico de memória de uma função
+def measure(function, repeats: int) -> tuple:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+# Mede as três fases de um caso
+def run_case(case: BenchmarkCase, engine: str = "regex", repeats: int = 3,
+             scale: float = 1.0) -> list[BenchmarkResult]:
+    source = case.program(scale)
+    size = len(source.encode("utf-8"))
+    scanner_class = SCANNER_ENGINES[engine]
+    tokens = TokenBuffer.from_scanner(scanner_class.from_string(source))
+    count = len(tokens)
+
+    # Fases: só a varredura, só a análise sintática (com a árvore, sobre os
+    # tokens já lidos) e a análise completa (com a saída descartada)
+    def scan():
+        TokenBuffer.from_scanner(scanner_class.from_string(source))
+
+    def parse():
+        Parser.from_tokens(tokens, build_tree=True).parse()
+
+    def analyze():
+        with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+            analyze_code(source, engine=engine)
+
+    results = []
+    for phase, function in (("scanner", scan), ("parser", parse), ("analyze_code", analyze)):
+        seconds, peak = measure(function, repeats)
+        # (um programa minúsculo pode medir 0 s no relógio: taxa 0)
+        rate = 1 / seconds if seconds > 0 else 0.0
+        results.append(BenchmarkResult(case.name, phase, size, count, seconds,
+                                       count * rate, size * rate / 1e6, peak / 1e6))
+    return results
+
+
+# ============================================================================
+# COMPARAÇÃO COM OS RESULTADOS GRAVADOS
+# ============================================================================
+# Uma fase piorou se ficou mais lenta (tokens/s) ou gastou mais memória do
+# que o limite permite (ex: 0.10 -> 10% pior que o gravado).
+# Só são comparados resultados medidos do mesmo jeito (mesmo motor, escala
+# e repetições): senão a diferença vem das opções, e não do código.
+# ============================================================================
+# Limite padrão de piora
+DEFAULT_THRESHOLD = 0.10
+# Opções que precisam ser iguais às dos resultados gravados
+COMPARABLE_SETTINGS = ("engine", "scale", "repeats")
+
+
+# Retorna as opções que diferem dos resultados gravados (lista vazia: dá
+# para comparar)
+def settings_mismatch(baseline: dict, settings: dict) -> list[str]:
+    mismatches = []
+    for name in COMPARABLE_SETTINGS:
+        # (resultados gravados antes desta opção existir não têm o valor)
+        recorded = baseline.get(name, "não gravado")
+        if recorded != settings[name]:
+            mismatches.append(f"{name}: {recorded} gravado, {settings[name]} agora")
+    return mismatches
+
+
+# Compara os resultados com os gravados e retorna a lista de pioras
+def find_regressions(results: list[BenchmarkResult], baseline: dict,
+                     threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    previous = {(entry["case"], entry["phase"]): entry for entry in baseline["results"]}
+    regressions = []
+    for result in results:
+        entry = previous.get((result.case, result.phase))
+        # Caso ou fase que não existia antes: nada a comparar
+        if entry is None:
+            continue
+        label = f"{result.case}/{result.phase}"
+        speed, memory = entry["tokens_per_second"], entry["peak_memory_mb"]
+        # (valor gravado 0: não há base para a porcentagem)
+        if speed > 0 and result.tokens_per_second < speed * (1 - threshold):
+            change = 1 - result.tokens_per_second / speed
+            regressions.append(f"{label}: {change:.1%} mais lento "
+                               f"({speed:,.0f} -> {result.tokens_per_second:,.0f} tokens/s)")
+        if memory > 0 and result.peak_memory_mb > memory * (1 + threshold):
+            change = result.peak_memory_mb / memory - 1
+            regressions.append(f"{label}: {change:.1%} mais memória "
+                               f"({memory:.2f} -> {result.peak_memory_mb:.2f} MB)")
+    return regressions
+
+# ============================================================================
+# VERIFICAÇÃO DOS MOTORES (--verificar-motores)
+# ============================================================================
+# Os caminhos rápidos precisam dar exatamente o mesmo resultado que os
+# caminhos simples. Em programas gerados (válidos, com erros e cortados no
+# meio) e em sequências aleatórias de pedaços de código, compara:
+# - Scanners: regex, mmap (BytesScanner, lendo o texto em bytes) e em fluxo
+#   (StreamScanner, com pedaços pequenos que cortam os tokens no meio)
+#   contra o Scanner clássico: tokens, linhas, colunas e erro léxico,
+#   iterando o scanner e pelo TokenBuffer
+# - Parser: a tabela LL(1) contra ReferenceParser, um analisador descendente
+#   recursivo escrito direto da gramática (como o parser antes da tabela):
+#   erros sintáticos e semânticos e a árvore de cada declaração
+# - IncrementalDocument: depois de cada edição aleatória, os tokens e os
+#   erros são os mesmos da análise do texto inteiro
+# Cada verificação para na primeira diferença e mostra o programa que a
+# causou (a semente repete o mesmo programa).
+# ============================================================================
+# Pedaços de código para as sequências aleatórias (inclui erros léxicos,
+# quebras de linha \r\n, comentários abertos e acentos)
+SOUP_PIECES = ("int ", "float ", "print", "if ", "else ", "x", "y1", "=", "==", "!=", "<", "<=",
+               ">", ">=", "+", "-", "*", "/", "(", ")", "10", "3.14", ".5", "2.", " ", "\t", "\n",
+               "\r\n", "# nota\n", "/* á */", "/*", "*/", "@", "!", "é")
+# Tamanho dos pedaços do StreamScanner (pequeno: força tokens cortados)
+VERIFY_CHUNK_SIZE = 7
+# Edições aplicadas a cada documento na verificação incremental
+VERIFY_EDITS = 20
+
+
+# Programas de uma semente: gerado válido, gerado com erros, cortado no
+# meio e uma sequência aleatória de pedaços
+def verification_sources(seed: int) -> list[str]:
+    rng = random.Random(seed)
+    valid = ProgramGenerator(rng.randint(0, 6), 0.3, 0.0, seed).generate(rng.randint(50, 2000))
+    broken = ProgramGenerator(rng.randint(0, 6), 0.3, 0.3, seed).generate(rng.randint(50, 2000))
+    soup = "".join(rng.choice(SOUP_PIECES) for _ in range(rng.randint(0, 60)))
+    return [valid, broken, broken[:rng.randint(0, len(broken))], soup]
+
+
+# Tokens de um scanner (tipo, lexema, linha, coluna), terminando no erro
+# léxico, se houver
+def scanner_snapshot(scanner, buffered: bool) -> list:
+    snapshot = []
+    try:
+        tokens = TokenBuffer.from_scanner(scanner) if buffered else scanner
+        for token in tokens:
+            snapshot.append((token.type, token.lexeme, token.line, token.column))
+    except LexicalError as error:
+        snapshot.append(("erro", error.message, error.line, error.column))
+    return snapshot
+
+
+# Scanners comparados com o clássico (nome -> cria o scanner para um texto)
+VERIFIED_SCANNERS = {
+    "regex": RegexScanner.from_string,
+    "mmap": BytesScanner.from_string,
+    "fluxo": lambda source: StreamScanner(io.StringIO(source), VERIFY_CHUNK_SIZE),
+}
+
+
+# Compara os scanners com o clássico (retorna a diferença ou None)
+def verify_scanners(source: str) -> Optional[str]:
+    for buffered in (False, True):
+        expected = scanner_snapshot(Scanner.from_string(source), buffered)
+        for name, create in VERIFIED_SCANNERS.items():
+            got = scanner_snapshot(create(source), buffered)
+            if got != expected:
+                # Primeiro token diferente
+                index = next((i for i, (a, b) in enumerate(zip(got, expected)) if a != b),
+                             min(len(got), len(expected)))
+                where = "TokenBuffer" if buffered else "iteração"
+                return (f"scanner {name} ({where}), token {index}: "
+                        f"{got[index:index + 1]} em vez de {expected[index:index + 1]}")
+    return None
+
+
+# Operadores do nível da soma e das comparações (escritos de novo aqui, e
+# não lidos da gramática, para a referência não herdar um erro dela)
+ADDITIVE_TYPES = (TokenType.PLUS, TokenType.MINUS, TokenType.GT, TokenType.GTE,
+                  TokenType.LT, TokenType.LTE, TokenType.EQUAL_EQUAL, TokenType.NOT_EQUAL)
+
+
+# Erro de uma declaração na ReferenceParser (interrompe a declaração)
+class ReferenceFailure(Exception):
+    pass
+
+
+class ReferenceParser:
+    """
+    Analisador descendente recursivo (uma função por regra da gramática).
+
+    É lento e usa a pilha do Python, mas é simples de conferir com a
+    gramática: serve só de referência para a tabela LL(1). Segue as mesmas
+    regras de mensagens, recuperação de erros e variáveis do Parser, e gera
+    cada nó como (tipo, número do token, filhos...).
+    """
+
+    # Construtor - recebe a lista de tokens
+    def __init__(self, tokens: list) -> None:
+        self.tokens = tokens
+        self.current = 0
+        self.errors: list[tuple] = []
+        self.semantic_errors: list[tuple] = []
+        self.statements: list[tuple] = []
+        # Variáveis declaradas, na ordem
+        self.variables: list[str] = []
+
+    # Analisa o programa inteiro
+    def parse(self) -> None:
+        while self.current < len(self.tokens):
+            start = self.current
+            variable_count = len(self.variables)
+            semantic_count = len(self.semantic_errors)
+            try:
+                self.statements.append(self._statement())
+            except ReferenceFailure:
+                # A declaração com erro não vale (nem as variáveis e os erros
+                # semânticos dela)
+                del self.variables[variable_count:]
+                del self.semantic_errors[semantic_count:]
+                self._synchronize(start)
+
+    # Recuperação: próximo token que começa uma declaração, ou o token depois
+    # de um ')' (pula um token se a busca não sair do lugar)
+    def _synchronize(self, start: int) -> None:
+        position = self.current
+        while position < len(self.tokens):
+            if self.tokens[position].type in RECOVERY_TOKENS:
+                break
+            if position > 0 and self.tokens[position - 1].type is TokenType.RPAREN:
+                break
+            position += 1
+        self.current = position if position != start else position + 1
+
+    # Token atual (EOF depois do último)
+    def _peek(self):
+        if self.current < len(self.tokens):
+            return self.tokens[self.current]
+        return None
+
+    # Tipo do token atual
+    def _type(self) -> TokenType:
+        token = self._peek()
+        return TokenType.EOF if token is None else token.type
+
+    # Registra um erro no token atual e interrompe a declaração
+    def _fail(self, message: str) -> None:
+        token = self._peek()
+        if token is None:
+            self.errors.append((f"{message}, encontrado: ''", 0, 0))
+        else:
+            self.errors.append((f"{message}, encontrado: '{token.lexeme}'", token.line, token.column))
+        raise ReferenceFailure()
+
+    # Consome o token atual e retorna o número dele
+    def _advance(self) -> int:
+        self.current += 1
+        return self.current - 1
+
+    # Consome um token do tipo esperado (erro com 'message' se não for)
+    def _expect(self, token_type: TokenType, message: str) -> int:
+        if self._type() is not token_type:
+            self._fail(message)
+        return self._advance()
+
+    # Registra um erro semântico no token 'index'
+    def _semantic_error(self, message: str, index: int) -> None:
+        token = self.tokens[index]
+        self.semantic_errors.append((message, token.line, token.column))
+
+    # DECLARAÇÃO -> TIPO IDENTIFIER = EXPRESSAO | IDENTIFIER = EXPRESSAO
+    #             | print ( EXPRESSAO ) | if ( EXPRESSAO ) DECLARAÇÃO [else DECLARAÇÃO]
+    def _statement(self) -> tuple:
+        kind = self._type()
+        if kind in (TokenType.INT, TokenType.FLOAT):
+            type_token = self._advance()
+            name_token = self._expect(TokenType.IDENTIFIER, "Esperado identificador")
+            name = self.tokens[name_token].lexeme
+            if name in self.variables:
+                self._semantic_error(f"Variável '{name}' já declarada", name_token)
+            self._expect(TokenType.ASSIGN, "Esperado '='")
+            value = self._expression()
+            # A variável só existe depois do valor (que não pode usá-la)
+            if name not in self.variables:
+                self.variables.append(name)
+            return ("VAR_DECL", type_token, ("IDENTIFIER", name_token), value)
+        if kind is TokenType.IDENTIFIER:
+            name_token = self._advance()
+            assign_token = self._expect(TokenType.ASSIGN, "Esperado '='")
+            value = self._expression()
+            name = self.tokens[name_token].lexeme
+            if name not in self.variables:
+                self.variables.append(name)
+            return ("ASSIGN", assign_token, ("IDENTIFIER", name_token), value)
+        if kind is TokenType.PRINT:
+            print_token = self._advance()
+            self._expect(TokenType.LPAREN, "Esperado '('")
+            value = self._expression()
+            self._expect(TokenType.RPAREN, "Esperado ')'")
+            return ("PRINT", print_token, value)
+        if kind is TokenType.IF:
+            if_token = self._advance()
+            self._expect(TokenType.LPAREN, "Esperado '('")
+            condition = self._expression()
+            self._expect(TokenType.RPAREN, "Esperado ')'")
+            then_branch = self._statement()
+            # O else fica com o if mais próximo
+            if self._type() is TokenType.ELSE:
+                self._advance()
+                return ("IF", if_token, condition, then_branch, self._statement())
+            return ("IF", if_token, condition, then_branch)
+        self._fail("Declaração esperada")
+
+    # EXPRESSAO -> TERMO ( (+ | - | > | >= | < | <= | == | !=) TERMO )*
+    def _expression(self) -> tuple:
+        left = self._term()
+        while self._type() in ADDITIVE_TYPES:
+            operator = self._advance()
+            left = ("BINARY", operator, left, self._term())
+        return left
+
+    # TERMO -> FATOR ( (* | /) FATOR )*
+    def _term(self) -> tuple:
+        left = self._factor()
+        while self._type() in (TokenType.STAR, TokenType.SLASH):
+            operator = self._advance()
+            left = ("BINARY", operator, left, self._factor())
+        return left
+
+    # FATOR -> NUMBER | IDENTIFIER | ( EXPRESSAO )
+    def _factor(self) -> tuple:
+        kind = self._type()
+        if kind is TokenType.NUMBER:
+            return ("NUMBER", self._advance())
+        if kind is TokenType.IDENTIFIER:
+            index = self._advance()
+            name = self.tokens[index].lexeme
+            if name not in self.variables:
+                self._semantic_error(f"Variável '{name}' usada antes de ser declarada", index)
+            return ("IDENTIFIER", index)
+        if kind is TokenType.LPAREN:
+            self._advance()
+            value = self._expression()
+            self._expect(TokenType.RPAREN, "Esperado ')'")
+            return value
+        self._fail("Fator esperado")
+
+
+
+# Nó da árvore do Parser no formato da ReferenceParser
+def tree_shape(tree, node: int) -> tuple:
+    return (tree.kind(node).name, tree.token_index[node],
+            *(tree_shape(tree, child) for child in tree.children(node)))
+
+
+# Compara o Parser (tabela LL(1)) com a ReferenceParser
+def verify_parser(source: str) -> Optional[str]:
+    try:
+        tokens = TokenBuffer.from_scanner(Scanner.from_string(source))
+    except LexicalError:
+        # Com erro léxico não há análise sintática
+        return None
+    reference = ReferenceParser(list(tokens))
+    reference.parse()
+    parser = Parser.from_tokens(tokens, build_tree=True)
+    parser.parse()
+    errors = [(error.message, error.line, error.column) for error in parser.errors]
+    if errors != reference.errors:
+        return f"erros sintáticos: {errors[:3]} em vez de {reference.errors[:3]}"
+    semantic_errors = [(error.message, error.line, error.column) for error in parser.semantic_errors]
+    if semantic_errors != reference.semantic_errors:
+        return f"erros semânticos: {semantic_errors[:3]} em vez de {reference.semantic_errors[:3]}"
+    statements = [tree_shape(parser.tree, node) for node in parser.tree.children(0)]
+    for index, (got, expected) in enumerate(zip(statements, reference.statements)):
+        if got != expected:
+            return f"árvore da declaração {index}: {got} em vez de {expected}"
+    if len(statements) != len(reference.statements):
+        return f"{len(statements)} declarações na árvore em vez de {len(reference.statements)}"
+    return None
+
+
+# Tokens e erros da análise do texto inteiro (como o IncrementalDocument os mostra)
+def full_analysis(text: str) -> tuple:
+    try:
+        tokens = TokenBuffer.from_scanner(RegexScanner.from_string(text))
+    except LexicalError as error:
+        return None, [("léxico", error.message, error.line, error.column)]
+    parser = Parser.from_tokens(tokens)
+    parser.parse()
+    snapshot = [(token.type, token.lexeme, token.line, token.column) for token in tokens]
+    return snapshot, [("sintático", error.message, error.line, error.column) for error in parser.errors]
+
+
+# Aplica edições aleatórias a um documento e compara cada estado com a
+# análise do texto inteiro
+def verify_incremental(source: str, seed: int) -> Optional[str]:
+    rng = random.Random(seed)
+    document = IncrementalDocument(source)
+    edits = []
+    for _ in range(VERIFY_EDITS):
+        offset = rng.randint(0, len(document.text))
+        removed = rng.randint(0, min(8, len(document.text) - offset))
+        inserted = "".join(rng.choice(SOUP_PIECES) for _ in range(rng.randint(0, 3)))
+        edits.append((offset, removed, inserted))
+        document.edit(offset, removed, inserted)
+        tokens, errors = full_analysis(document.text)
+        got = [("léxico" if isinstance(error, LexicalError) else "sintático",
+                error.message, error.line, error.column) for error in document.diagnostics()]
+        if got != errors:
+            return f"erros depois das edições {edits}: {got[:3]} em vez de {errors[:3]}"
+        # Os tokens só valem sem erro léxico (a análise completa para nele)
+        if tokens is not None:
+            snapshot = [(token.type, token.lexeme, token.line, token.column) for token in document.tokens]
+            if snapshot != tokens:
+                return f"tokens diferentes depois das edições {edits}"
+    return None
+
+
+# Roda as três verificações em 'count' sementes (retorna as diferenças)
+def verify_engines(count: int, seed: int = 0) -> list[str]:
+    failures = []
+    checks = (("scanners", lambda source, _: verify_scanners(source)),
+              ("parser", lambda source, _: verify_parser(source)),
+              ("incremental", verify_incremental))
+    for name, check in checks:
+        compared = 0
+        start = time.perf_counter()
+        failure = None
+        for current in range(seed, seed + count):
+            for source in verification_sources(current):
+                failure = check(source, current)
+                compared += 1
+                if failure is not None:
+                    break
+            if failure is not None:
+                failures.append(f"{name} (semente {current}): {failure}\n    programa: {source[:300]!r}")
+                break
+        elapsed = time.perf_counter() - start
+        status = f"{Colors.GREEN}✅ iguais" if failure is None else f"{Colors.RED}❌ diferentes"
+        print(f"  {name:<12} {status}{Colors.ENDC} ({compared} programas, {elapsed:.1f} s)")
+    return failures
+
+
+# ============================================================================
+# SAÍDA
+# ============================================================================
+# Imprime a tabela de resultados
+def print_results(results: list[BenchmarkResult]) -> None:
+    print(f"\n{Colors.HEADER}{Colors.BOLD}⏱️  BENCHMARK{Colors.ENDC}")
+    print(f"{Colors.CYAN}{'─' * 80}{Colors.ENDC}")
+    print(f"  {'Caso':<12} {'Fase':<13} {'KB':>8} {'Tokens':>8} {'ms':>9} {'Tokens/s':>12} {'MB/s':>7} {'Pico MB':>8}")
+    for result in results:
+        print(f"  {result.case:<12} {result.phase:<13} {result.bytes / 1000:>8.1f} {result.tokens:>8} "
+              f"{result.seconds * 1000:>9.2f} {result.tokens_per_second:>12,.0f} "
+              f"{result.mb_per_second:>7.2f} {result.peak_memory_mb:>8.2f}")
+
+
+# Grava os resultados em JSON (com as opções da medição: motor, escala e
+# repetições)
+def save_results(path, results: list[BenchmarkResult], settings: dict) -> None:
+    data = {
+        "python": platform.python_version(),
+        **settings,
+        "results": [asdict(result) for result in results],
+    }
+    Path(path).write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+
+# Grava 'count' programas gerados numa pasta (ex: para o modo lote)
+def write_corpus(directory, count: int, size: int, depth: int, comment_density: float,
+                 broken_ratio: float, seed: int = 0) -> None:
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for index in range(count):
+        generator = ProgramGenerator(depth, comment_density, broken_ratio, seed + index)
+        (directory / f"gerado_{index:05d}.mc").write_text(generator.generate(size), encoding="utf-8")
+
+
+# Função principal do benchmark
+def main() -> None:
+    options, args = parse_options(sys.argv[1:])
+
+    # Compara os motores entre si (--verificar-motores), sem medir
+    if "verificar-motores" in options:
+        print(f"\n{Colors.HEADER}{Colors.BOLD}🔍 VERIFICAÇÃO DOS MOTORES{Colors.ENDC}")
+        failures = verify_engines(int(options.get("quantidade", 200)), int(options.get("semente", 0)))
+        for failure in failures:
+            print(f"{Colors.RED}  • {failure}{Colors.ENDC}")
+        sys.exit(1 if failures else 0)
+
+    engine = options.get("motor", "regex")
+    if engine not in SCANNER_ENGINES or engine == "mmap":
+        # O motor mmap lê arquivos (os programas gerados ficam na memória)
+        print(f"{Colors.RED}❌ Motor inválido para o benchmark: {engine} (opções: classico, regex){Colors.ENDC}")
+        sys.exit(1)
+
+    # Só gera programas (--gerar=pasta), sem medir
+    if "gerar" in options:
+        write_corpus(options["gerar"], int(options.get("quantidade", 100)),
+                     int(options.get("tamanho", 2000)), int(options.get("profundidade", 4)),
+                     float(options.get("comentarios", 0.1)), float(options.get("quebrados", 0.0)),
+                     int(options.get("semente", 0)))
+        print(f"{Colors.GREEN}✅ Programas gravados em {options['gerar']}{Colors.ENDC}")
+        return
+
+    # Mede todos os casos (ou só os pedidos como argumentos)
+    cases = [case for case in BENCHMARK_CASES if not args or case.name in args]
+    repeats = int(options.get("repeticoes", 3))
+    scale = float(options.get("escala", 1.0))
+    settings = {"engine": engine, "scale": scale, "repeats": repeats}
+
+    # Resultados gravados (--base=arquivo.json): conferidos antes de medir
+    baseline = None
+    if "base" in options:
+        baseline = json.loads(Path(options["base"]).read_text(encoding="utf-8"))
+        mismatches = settings_mismatch(baseline, settings)
+        if mismatches:
+            print(f"{Colors.RED}{Colors.BOLD}❌ Resultados de {options['base']} medidos com outras opções "
+                  f"(grave de novo com --salvar):{Colors.ENDC}")
+            for mismatch in mismatches:
+                print(f"{Colors.RED}  • {mismatch}{Colors.ENDC}")
+            sys.exit(1)
+
+    results = []
+    for case in cases:
+        results.extend(run_case(case, engine, repeats, scale))
+    print_results(results)
+
+    if "salvar" in options:
+        save_results(options["salvar"], results, settings)
+        print(f"\n{Colors.GREEN}💾 Resultados gravados em {options['salvar']}{Colors.ENDC}")
+
+    # Compara com os resultados gravados
+    if baseline is not None:
+        threshold = float(options.get("limite", DEFAULT_THRESHOLD))
+        regressions = find_regressions(results, baseline, threshold)
+        if regressions:
+            print(f"\n{Colors.RED}{Colors.BOLD}❌ {len(regressions)} pioras acima de {threshold:.0%}:{Colors.ENDC}")
+            for regression in regressions:
+                print(f"{Colors.RED}  • {regression}{Colors.ENDC}")
+            sys.exit(1)
+        print(f"\n{Colors.GREEN}{Colors.BOLD}✅ Nenhuma piora acima de {threshold:.0%}{Colors.ENDC}")
+
+
+# Se este arquivo foi executado diretamente (não importado)
+if __name__ == "__main__":
+    main()
@@ -15,17 +15,56 @@ Integrantes do Grupo:
 from __future__ import annotations
 # Importa sys para acessar argumentos da linha de comando e sair do programa
 import sys
+# Importa os para caminhos, variáveis de ambiente e número de núcleos
+import os
+# Importa re para o motor de varredura baseado em expressão regular
+import re
+# Importa codecs para decodificar UTF-8 aos poucos (modo fluxo)
+import codecs
+# Importa mmap para mapear arquivos grandes direto na memória
+import mmap
+# Importa time para medir o tempo de execução da máquina virtual
+import time
+# Importa isfinite (para não converter inf/nan em int na máquina virtual)
+from math import isfinite
+# Importa array para guardar tokens em vetores compactos (TokenBuffer)
+from array import array
+# Importa bisect para a busca binária no índice de linhas
+from bisect import bisect_left, bisect_right
+# Importa accumulate/repeat e add para calcular o início das linhas em C
+# (add, sub e mul também são as operações da otimização de constantes)
+# Importa compress para filtrar listas em C (edição incremental)
+from itertools import accumulate, compress, repeat
+from operator import add, mul, sub
 # Importa Path para trabalhar com caminhos de arquivos de forma mais fácil
 from pathlib import Path
-# Importa dataclass para criar classes de dados automaticamente
-from dataclasses import dataclass
+# Importa contextmanager e nullcontext para medir o tempo de cada fase
+from contextlib import contextmanager, nullcontext
 # Importa Enum e auto para criar enumerações (tipos de tokens)
 from enum import Enum, auto
 # Importa Optional para indicar valores que podem ser None
 # Importa Iterator para criar iteradores
-from typing import Optional, Iterator
+# Importa NamedTuple para criar classes de dados (como o dataclass, mas sem
+# carregar o módulo dataclasses, que importa o inspect, a cada execução)
+# Importa TYPE_CHECKING para as anotações que citam módulos importados sob demanda
+from typing import TYPE_CHECKING, NamedTuple, Optional, Iterator
 # Importa Counter para contar tokens e gerar estatísticas
-from collections import Counter
+# Importa deque para a janela de tokens do parser em fluxo
+# Importa OrderedDict para o cache de resultados em memória do daemon (LRU)
+from collections import Counter, OrderedDict, deque
+# Os módulos da biblioteca padrão usados só por alguns modos são importados
+# dentro das funções que os usam, na primeira vez (o Python guarda o módulo
+# já carregado): json (métricas, NDJSON, daemon, LSP, cache), hashlib e
+# tempfile (cache), glob e concurrent.futures (modo lote), socket,
+# socketserver e threading (daemon), asyncio (LSP). Só essas importações
+# ficam para depois: o resto deste arquivo (cores, impressão, REPL, LSP...)
+# é definido em toda execução, o que custa pouco perto de importar módulos.
+# Para os verificadores de tipo, os nomes usados nas anotações (este bloco
+# não roda durante a execução)
+if TYPE_CHECKING:
+    import asyncio
+    import socket
+    from concurrent.futures import ProcessPoolExecutor
 
 
 # ============================================================================
@@ -84,9 +123,8 @@ RESERVED_KEYWORDS = {
 #   - Token(ASSIGN, "=", linha=1, coluna=7)
 #   - Token(NUMBER, "10", linha=1, coluna=9)
 # ============================================================================
-# @dataclass cria automaticamente métodos __init__, __repr__, etc.
-@dataclass
-class Token:
+# NamedTuple cria automaticamente métodos __init__, __repr__, etc.
+class Token(NamedTuple):
     type: TokenType      # Tipo do token (INT, IDENTIFIER, NUMBER, etc.)
     lexeme: str          # O texto exato encontrado ("int", "x", "10", etc.)
     line: int            # Linha onde foi encontrado (começa em 1)
@@ -106,7 +144,7 @@ class Token:
 # ============================================================================
 class LexicalError(Exception):
     # Construtor da exceção de erro léxico
-    def __init__(self, message: str, line: int, column: int) -> None:
+    def __init__(self, message: str, line: int, column: int, offset: Optional[int] = None) -> None:
         # Chama o construtor da classe pai (Exception)
         super().__init__(message)
         # Armazena a mensagem de erro
@@ -115,6 +153,8 @@ class LexicalError(Exception):
         self.line = line
         # Armazena a coluna onde o erro ocorreu
         self.column = column
+        # Armazena a posição (índice no código) onde o erro ocorreu, se conhecida
+        self.offset = offset
 
     def __str__(self) -> str:
         # Retorna uma mensagem formatada com a posição do erro
@@ -122,6 +162,90 @@ class LexicalError(Exception):
         return f"Erro léxico na linha {self.line}, coluna {self.column}: {self.message}"
 
 
+# Mensagem do erro de comentário de bloco sem '*/' (o modo interativo usa
+# esta mensagem para saber que o comentário continua na próxima linha)
+UNCLOSED_COMMENT_MESSAGE = "Comentário de múltiplas linhas não finalizado (esperava '*/')"
+
+# Padrão que encontra bytes de continuação UTF-8 (10xxxxxx): cada caractere
+# não-ASCII tem 1 byte inicial + 1 a 3 bytes de continuação
+UTF8_CONTINUATION_PATTERN = re.compile(rb"[\x80-\xbf]")
+
+
+# ============================================================================
+# ÍNDICE DE LINHAS
+# ============================================================================
+# Os tokens guardam só a posição (índice) onde começam no código.
+# Linha e coluna são calculadas só quando alguém precisa delas (mensagem de
+# erro, listagem de tokens, editor), com uma busca binária no vetor com o
+# início de cada linha. O vetor é montado uma única vez por código fonte.
+# Exemplo: "int x\nprint(x)" -> line_starts = [0, 6]
+#          posição 6 -> linha 2, coluna 1
+# ============================================================================
+class SourceLineIndex:
+    # Construtor - recebe o código (str, bytes, mmap ou memoryview)
+    def __init__(self, source) -> None:
+        # Guarda o código fonte (usado para corrigir colunas em bytes)
+        self.source = source
+        # Indica se o código é texto (colunas já contam caracteres)
+        self.is_text = isinstance(source, str)
+        # Vetor com a posição onde cada linha começa (a linha 1 começa em 0)
+        self.line_starts = array("I", [0])
+        if isinstance(source, (str, bytes, bytearray)):
+            # Divide nas quebras de linha e acumula os tamanhos (+1 do '\n'),
+            # tudo feito em C: o início da linha k+1 é o fim da linha k + 1
+            parts = source.split("\n" if self.is_text else b"\n")
+            self.line_starts.extend(accumulate(map(add, map(len, parts[:-1]), repeat(1))))
+        else:
+            # mmap e memoryview não têm split: procura cada '\n' com regex
+            self.line_starts.extend(m.end() for m in re.finditer(rb"\n", source))
+
+    # Número de linhas do código
+    def line_count(self) -> int:
+        return len(self.line_starts)
+
+    # Converte uma posição (índice no código) em (linha, coluna), começando em 1
+    def position(self, offset: int) -> tuple:
+        # Busca binária: quantas linhas começam antes ou na posição
+        line = bisect_right(self.line_starts, offset)
+        # Posição onde essa linha começa
+        line_start = self.line_starts[line - 1]
+        # Coluna = distância até o início da linha + 1
+        column = offset - line_start + 1
+        # Em bytes, caracteres acentuados ocupam mais de um byte:
+        # desconta os bytes de continuação para a coluna contar caracteres
+        if not self.is_text and offset > line_start:
+            column -= len(UTF8_CONTINUATION_PATTERN.findall(self.source, line_start, offset))
+        # Retorna a linha e a coluna
+        return line, column
+
+    # Converte (linha, coluna) de volta para uma posição no código
+    # (usado por editores, que apontam posições por linha e coluna)
+    def offset(self, line: int, column: int) -> int:
+        # Posição onde a linha começa
+        line_start = self.line_starts[line - 1]
+        # Em texto, cada coluna é um caractere
+        if self.is_text:
+            return line_start + column - 1
+        # Em bytes, converte os primeiros caracteres da linha de volta para bytes
+        prefix = str(self.source[line_start:self.line_end(line)], "utf-8", "replace")[:column - 1]
+        return line_start + len(prefix.encode("utf-8"))
+
+    # Posição onde a linha termina (onde está o '\n', ou o fim do código)
+    def line_end(self, line: int) -> int:
+        # Se há uma linha seguinte, esta termina 1 antes do início dela
+        if line < len(self.line_starts):
+            return self.line_starts[line] - 1
+        # Senão, termina no fim do código
+        return len(self.source)
+
+    # Retorna o texto de uma linha (sem o '\n')
+    def line_text(self, line: int) -> str:
+        # Recorta a linha do código
+        text = self.source[self.line_starts[line - 1]:self.line_end(line)]
+        # Código em bytes é decodificado
+        return text if self.is_text else str(text, "utf-8", "replace")
+
+
 # ============================================================================
 # SCANNER (ANALISADOR LÉXICO)
 # ============================================================================
@@ -141,10 +265,10 @@ class Scanner:
         self.length: int = len(self.source)
         # Inicializa o índice na posição 0 (primeiro caractere)
         self.index: int = 0
-        # Inicializa a linha em 1 (primeira linha)
+        # Linha atual e posição onde ela começa (atualizadas a cada '\n'
+        # pulado: a coluna de um token é a distância até o início da linha)
         self.line: int = 1
-        # Inicializa a coluna em 1 (primeira coluna)
-        self.column: int = 1
+        self.line_start: int = 0
     
     # Método de classe que cria um Scanner a partir de uma string (não de arquivo)
     # Útil para modo interativo ou testes
@@ -158,13 +282,23 @@ class Scanner:
         scanner.length = len(source_code)
         # Inicializa o índice em 0
         scanner.index = 0
-        # Inicializa a linha em 1
+        # Começa na linha 1
         scanner.line = 1
-        # Inicializa a coluna em 1
-        scanner.column = 1
+        scanner.line_start = 0
         # Retorna o scanner criado
         return scanner
 
+    # Índice de linhas do código (montado só na primeira vez que é usado)
+    @property
+    def line_index(self) -> SourceLineIndex:
+        # Procura um índice já montado (from_string não chama __init__)
+        index = self.__dict__.get("_line_index")
+        # Se ainda não existe, monta e guarda
+        if index is None:
+            index = self._line_index = SourceLineIndex(self.source)
+        # Retorna o índice
+        return index
+
     # Método especial que permite usar o Scanner em loops 'for'
     # Exemplo: for token in scanner: ...
     def __iter__(self) -> Iterator[Token]:
@@ -185,6 +319,29 @@ class Scanner:
         Lê o próximo token do código.
         Retorna None quando chega ao fim do arquivo.
         """
+        # Lê o token na forma compacta (código, início, fim)
+        raw = self._next_raw()
+        # Se retornou None, chegou ao fim do arquivo
+        if raw is None:
+            return None
+        code, start, end = raw
+        # Só aqui o objeto Token é criado (com o texto, a linha e a coluna)
+        return Token(TOKEN_TYPES[code], self.source[start:end], self.line, start - self.line_start + 1)
+
+    # Percorre o código gerando tuplas compactas (usado pelo TokenBuffer)
+    def _scan_raw(self) -> Iterator[tuple]:
+        """Gera (código, início, fim) de cada token, sem criar objetos Token"""
+        # Guarda o método em variável local (acesso mais rápido dentro do loop)
+        next_raw = self._next_raw
+        # Lê até o fim do código
+        raw = next_raw()
+        while raw is not None:
+            yield raw
+            raw = next_raw()
+
+    # Lê o próximo token: retorna (código, início, fim), ou None no fim
+    # (nenhum objeto Token é criado, e nenhuma linha/coluna é calculada)
+    def _next_raw(self) -> Optional[tuple]:
         # Primeiro, pula espaços em branco e comentários (não geram tokens)
         self._skip_whitespace_and_comments()
         
@@ -192,9 +349,8 @@ class Scanner:
         if self._is_eof():
             return None
 
-        # Guarda a posição onde este token começa (linha e coluna)
-        # Isso é importante para reportar erros com a posição correta
-        start_line, start_col = self.line, self.column
+        # Guarda a posição (índice) onde este token começa
+        start = self.index
         
         # Lê o próximo caractere e avança o índice
         char = self._advance()
@@ -206,27 +362,21 @@ class Scanner:
         # Exemplo: "int", "x", "variavel123", "_temp"
         # ====================================================================
         if self._is_letter(char) or char == "_":
-            # Lista para construir o nome completo do identificador
-            lexeme = [char]
             # Continua lendo enquanto os próximos caracteres forem letra, dígito ou underscore
             while not self._is_eof():
                 # Olha o próximo caractere sem avançar
                 c = self._peek()
                 # Se é letra, dígito ou underscore, faz parte do identificador
                 if self._is_letter(c) or self._is_digit(c) or c == "_":
-                    # Adiciona o caractere à lista e avança
-                    lexeme.append(self._advance())
+                    # Avança (o caractere faz parte do nome)
+                    self._advance()
                 else:
                     # Se não é mais parte do identificador, para de ler
                     break
-            # Junta todos os caracteres em uma string
-            text = "".join(lexeme)
             # Verifica se é palavra reservada (int, float, print, if, else)
-            # Se estiver no dicionário RESERVED_KEYWORDS, retorna o tipo correspondente
-            # Se não estiver, é um identificador comum (TokenType.IDENTIFIER)
-            token_type = RESERVED_KEYWORDS.get(text, TokenType.IDENTIFIER)
-            # Retorna o token criado
-            return Token(token_type, text, start_line, start_col)
+            # Se estiver no dicionário KEYWORD_CODES, retorna o código correspondente
+            # Se não estiver, é um identificador comum (IDENTIFIER_CODE)
+            return KEYWORD_CODES.get(self.source[start:self.index], IDENTIFIER_CODE), start, self.index
 
         # ====================================================================
         # NÚMEROS
@@ -235,33 +385,33 @@ class Scanner:
         # Exemplo: "123", "3.14", ".456"
         # ====================================================================
         if char == "." or self._is_digit(char):
-            return self._number_token(start_line, start_col, char)
+            return self._number_token(start, char)
 
         # ====================================================================
         # PARÊNTESES
         # ====================================================================
         # Se é parêntese esquerdo, retorna token LPAREN
         if char == "(":
-            return Token(TokenType.LPAREN, "(", start_line, start_col)
+            return OPERATOR_CODES["("], start, self.index
         # Se é parêntese direito, retorna token RPAREN
         if char == ")":
-            return Token(TokenType.RPAREN, ")", start_line, start_col)
+            return OPERATOR_CODES[")"], start, self.index
 
         # ====================================================================
         # OPERADORES MATEMÁTICOS
         # ====================================================================
         # Se é '+', retorna token PLUS
         if char == "+":
-            return Token(TokenType.PLUS, "+", start_line, start_col)
+            return OPERATOR_CODES["+"], start, self.index
         # Se é '-', retorna token MINUS
         if char == "-":
-            return Token(TokenType.MINUS, "-", start_line, start_col)
+            return OPERATOR_CODES["-"], start, self.index
         # Se é '*', retorna token STAR
         if char == "*":
-            return Token(TokenType.STAR, "*", start_line, start_col)
+            return OPERATOR_CODES["*"], start, self.index
         # Se é '/', retorna token SLASH
         if char == "/":
-            return Token(TokenType.SLASH, "/", start_line, start_col)
+            return OPERATOR_CODES["/"], start, self.index
 
         # ====================================================================
         # OPERADOR DE ATRIBUIÇÃO E IGUALDADE
@@ -272,9 +422,9 @@ class Scanner:
             # Verifica se o próximo caractere também é "="
             if self._match("="):
                 # Se sim, é "==" (igualdade)
-                return Token(TokenType.EQUAL_EQUAL, "==", start_line, start_col)
+                return OPERATOR_CODES["=="], start, self.index
             # Se não, é apenas "=" (atribuição)
-            return Token(TokenType.ASSIGN, "=", start_line, start_col)
+            return OPERATOR_CODES["="], start, self.index
 
         # ====================================================================
         # OPERADORES RELACIONAIS
@@ -286,27 +436,27 @@ class Scanner:
             # Verifica se o próximo caractere é "="
             if self._match("="):
                 # Se sim, é ">=" (maior ou igual)
-                return Token(TokenType.GTE, ">=", start_line, start_col)
+                return OPERATOR_CODES[">="], start, self.index
             # Se não, é apenas ">" (maior que)
-            return Token(TokenType.GT, ">", start_line, start_col)
+            return OPERATOR_CODES[">"], start, self.index
 
         # Se é '<', verifica se é "<=" ou apenas "<"
         if char == "<":
             # Verifica se o próximo caractere é "="
             if self._match("="):
                 # Se sim, é "<=" (menor ou igual)
-                return Token(TokenType.LTE, "<=", start_line, start_col)
+                return OPERATOR_CODES["<="], start, self.index
             # Se não, é apenas "<" (menor que)
-            return Token(TokenType.LT, "<", start_line, start_col)
+            return OPERATOR_CODES["<"], start, self.index
 
         # Se é '!', deve ser seguido de "=" para formar "!="
         if char == "!":
             # Verifica se o próximo caractere é "="
             if self._match("="):
                 # Se sim, é "!=" (diferente)
-                return Token(TokenType.NOT_EQUAL, "!=", start_line, start_col)
+                return OPERATOR_CODES["!="], start, self.index
             # Se não, é um erro - "!" sozinho não é permitido
-            self._raise_error("'!' isolado não é permitido; esperava '!='", start_line, start_col)
+            self._raise_error("'!' isolado não é permitido; esperava '!='", start)
 
         # ====================================================================
         # SÍMBOLO INVÁLIDO
@@ -314,17 +464,15 @@ class Scanner:
         # Se chegou aqui, é um caractere que não reconhecemos
         # Exemplo: "@", "ç", "`", etc.
         # ====================================================================
-        self._raise_error(f"Símbolo inválido: '{char}'", start_line, start_col)
+        self._raise_error(f"Símbolo inválido: '{char}'", start)
 
     # Reconhece números com ponto decimal (ex: 123, 123.456, .456)
-    def _number_token(self, start_line: int, start_col: int, first_char: str) -> Optional[Token]:
+    def _number_token(self, start: int, first_char: str) -> tuple:
         """
         Reconhece números com ponto decimal.
         Válidos: 123, 123.456, .456
         Inválidos: 1., 12., 156. (não pode terminar em ponto sem dígitos)
         """
-        # Lista para construir o número completo
-        lexeme = [first_char]
         # Verifica se o primeiro caractere já é um ponto
         saw_dot = first_char == "."
         # Flag para verificar se há dígitos depois do ponto
@@ -341,15 +489,15 @@ class Scanner:
         if has_digits_before_dot:
             # Enquanto não chegou ao fim e o próximo caractere é dígito
             while not self._is_eof() and is_digit(self._peek()):
-                # Adiciona o dígito à lista e avança
-                lexeme.append(self._advance())
+                # Avança (o dígito faz parte do número)
+                self._advance()
 
         # Se ainda não viu o ponto e o próximo caractere é ponto
         if not saw_dot and not self._is_eof() and self._peek() == ".":
             # Marca que viu o ponto
             saw_dot = True
-            # Adiciona o ponto à lista e avança
-            lexeme.append(self._advance())
+            # Avança (o ponto faz parte do número)
+            self._advance()
 
         # Se viu o ponto (ou começou com ponto)
         if saw_dot:
@@ -357,18 +505,16 @@ class Scanner:
             while not self._is_eof() and is_digit(self._peek()):
                 # Marca que há dígitos depois do ponto
                 has_digits_after_dot = True
-                # Adiciona o dígito à lista e avança
-                lexeme.append(self._advance())
+                # Avança (o dígito faz parte do número)
+                self._advance()
 
             # Se não há dígitos depois do ponto, é um erro (ex: 1., 12.)
             if not has_digits_after_dot:
                 # Lança erro: número inválido
-                self._raise_error("Número inválido: faltam dígitos após o ponto", start_line, start_col)
+                self._raise_error("Número inválido: faltam dígitos após o ponto", start)
 
-        # Junta todos os caracteres em uma string
-        text = "".join(lexeme)
-        # Retorna um token NUMBER com o número encontrado
-        return Token(TokenType.NUMBER, text, start_line, start_col)
+        # Retorna o código NUMBER com o trecho do número encontrado
+        return NUMBER_CODE, start, self.index
 
     # Pula espaços em branco e comentários (não geram tokens)
     def _skip_whitespace_and_comments(self) -> None:
@@ -388,14 +534,13 @@ class Scanner:
                 # Continua o loop (pula para a próxima iteração)
                 continue
             
-            # Se é quebra de linha, pula e atualiza contadores
+            # Se é quebra de linha, pula e começa a linha seguinte
             if c == "\n":
                 # Avança para o próximo caractere
                 self._advance()
-                # Incrementa a linha
+                # A nova linha começa logo depois do '\n'
                 self.line += 1
-                # Reseta a coluna para 1 (início da nova linha)
-                self.column = 1
+                self.line_start = self.index
                 # Continua o loop
                 continue
 
@@ -417,22 +562,12 @@ class Scanner:
             # Se encontrou '/' e o próximo é '*', é início de comentário de bloco
             if c == "/" and self._peek_next() == "*":
                 # Guarda a posição onde o comentário começou (para reportar erro se não fechar)
-                comment_start_line, comment_start_col = self.line, self.column
+                comment_start = self.index
                 # Consome o '/' e o '*'
                 self._advance()  # Consome '/'
                 self._advance()  # Consome '*'
                 # Lê todos os caracteres até encontrar '*/'
                 while not self._is_eof():
-                    # Se encontrou quebra de linha, atualiza contadores
-                    if self._peek() == "\n":
-                        # Avança (consome a quebra de linha)
-                        self._advance()
-                        # Incrementa a linha
-                        self.line += 1
-                        # Reseta a coluna
-                        self.column = 1
-                        # Continua o loop interno
-                        continue
                     # Se encontrou '*' e o próximo é '/', fim do comentário
                     if self._peek() == "*" and self._peek_next() == "/":
                         # Consome '*' e '/'
@@ -440,12 +575,15 @@ class Scanner:
                         self._advance()  # Consome '/'
                         # Sai do loop (comentário foi fechado)
                         break
-                    # Avança (consome caractere do comentário)
-                    self._advance()
+                    # Avança (consome caractere do comentário); um '\n' dentro
+                    # do comentário também começa uma linha nova
+                    if self._advance() == "\n":
+                        self.line += 1
+                        self.line_start = self.index
                 else:
                     # Se chegou aqui, o loop terminou sem encontrar '*/'
                     # Isso significa que o comentário não foi fechado - é um erro
-                    self._raise_error("Comentário de múltiplas linhas não finalizado (esperava '*/')", comment_start_line, comment_start_col)
+                    self._raise_error(UNCLOSED_COMMENT_MESSAGE, comment_start)
                 # Continua o loop externo (comentário foi ignorado)
                 continue
 
@@ -458,8 +596,6 @@ class Scanner:
         ch = self.source[self.index]
         # Incrementa o índice para apontar para o próximo caractere
         self.index += 1
-        # Incrementa a coluna (estamos na mesma linha, mas coluna seguinte)
-        self.column += 1
         # Retorna o caractere que foi lido
         return ch
 
@@ -472,8 +608,6 @@ class Scanner:
         # Se chegou aqui, encontrou o caractere esperado
         # Avança o índice para o próximo caractere
         self.index += 1
-        # Avança a coluna
-        self.column += 1
         # Retorna True (encontrou e consumiu o caractere)
         return True
 
@@ -508,9 +642,755 @@ class Scanner:
         return "0" <= c <= "9"
 
     # Lança uma exceção de erro léxico
-    def _raise_error(self, message: str, start_line: int, start_col: int) -> None:
+    def _raise_error(self, message: str, start: int) -> None:
+        # Converte a posição em linha e coluna
+        line, column = self.line_index.position(start)
         # Cria e lança uma exceção LexicalError com a mensagem e posição
-        raise LexicalError(message, start_line, start_col)
+        raise LexicalError(message, line, column, start)
+
+
+# ============================================================================
+# PADRÃO MESTRE (MOTOR REGEX)
+# ============================================================================
+# Uma única expressão regular que reconhece TODOS os lexemas da linguagem.
+# Cada alternativa tem um nome (grupo nomeado) e o scanner só olha qual grupo
+# casou (m.lastgroup), sem chamar métodos para cada caractere.
+# A ordem das alternativas importa: a primeira que casar é a escolhida.
+# ============================================================================
+MASTER_PATTERN = re.compile(r"""
+    [ \t\r]*                                                    # Espaços da mesma linha antes do lexema
+    (?:
+        (?P<NAME>[A-Za-z_][A-Za-z0-9_]*)                        # Identificadores e palavras reservadas
+      | (?P<NUMBER>[0-9]+\.[0-9]+|[0-9]+(?![0-9.])|\.[0-9]+)    # 123, 123.456, .456
+      | (?P<OP>==|>=|<=|!=|[-+*=<>()]|/(?!\*))                  # Operadores e parênteses
+      | (?P<SKIP>\n[ \t\r\n]*|\#[^\r\n]*|/\*.*?\*/|\Z)          # Quebras de linha, comentários e fim do código
+      | (?P<OPEN_COMMENT>/\*)                                   # '/*' sem '*/' correspondente
+      | (?P<BAD_NUMBER>[0-9]*\.)                                # 1., 12., . (faltam dígitos após o ponto)
+      | (?P<BANG>!)                                             # '!' isolado
+      | (?P<BAD>.)                                              # Qualquer outro símbolo é inválido
+    )
+""", re.VERBOSE | re.DOTALL)
+
+# Tabela que mapeia cada operador para o seu tipo de token
+OPERATORS = {
+    "+": TokenType.PLUS,
+    "-": TokenType.MINUS,
+    "*": TokenType.STAR,
+    "/": TokenType.SLASH,
+    "=": TokenType.ASSIGN,
+    "==": TokenType.EQUAL_EQUAL,
+    ">": TokenType.GT,
+    ">=": TokenType.GTE,
+    "<": TokenType.LT,
+    "<=": TokenType.LTE,
+    "!=": TokenType.NOT_EQUAL,
+    "(": TokenType.LPAREN,
+    ")": TokenType.RPAREN,
+}
+
+# ============================================================================
+# CÓDIGOS NUMÉRICOS DOS TOKENS
+# ============================================================================
+# Cada tipo de token recebe um código pequeno (cabe em 1 byte), usado pelos
+# scanners rápidos e pelo TokenBuffer: TOKEN_TYPES[código] -> TokenType
+# ============================================================================
+TOKEN_TYPES = tuple(TokenType)
+# Código de cada tipo: TOKEN_CODES[TokenType.INT] -> 1
+TOKEN_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+# Códigos mais usados pelos scanners
+IDENTIFIER_CODE = TOKEN_CODES[TokenType.IDENTIFIER]
+NUMBER_CODE = TOKEN_CODES[TokenType.NUMBER]
+# Código de cada palavra reservada e de cada operador (busca pelo texto)
+KEYWORD_CODES = {text: TOKEN_CODES[token_type] for text, token_type in RESERVED_KEYWORDS.items()}
+OPERATOR_CODES = {text: TOKEN_CODES[token_type] for text, token_type in OPERATORS.items()}
+# Texto fixo de cada código (None para identificadores, números e EOF,
+# que precisam recortar o texto do código fonte)
+FIXED_LEXEMES = tuple(
+    next((text for text, t in (*RESERVED_KEYWORDS.items(), *OPERATORS.items()) if t is token_type), None)
+    for token_type in TOKEN_TYPES
+)
+
+
+# ============================================================================
+# SCANNER REGEX (MOTOR ALTERNATIVO)
+# ============================================================================
+# Mesmo resultado do Scanner acima (mesmos tokens, mesmos erros e posições),
+# mas usando o padrão mestre: o casamento é feito em C pelo módulo 're',
+# e o Python só trabalha uma vez por token (e não uma vez por caractere).
+# ============================================================================
+class RegexScanner(Scanner):
+    # Padrão mestre usado por este scanner (texto)
+    _pattern = MASTER_PATTERN
+    # Códigos das palavras reservadas e operadores, buscados pelo texto
+    _keywords = KEYWORD_CODES
+    _operators = OPERATOR_CODES
+
+    # Método especial que permite usar o Scanner em loops 'for'
+    def __iter__(self) -> Iterator[Token]:
+        # Devolve o gerador de tokens (o mesmo usado por next_token)
+        return self._token_stream()
+
+    # Lê o próximo token do código fonte
+    def next_token(self) -> Optional[Token]:
+        """
+        Lê o próximo token do código.
+        Retorna None quando chega ao fim do arquivo.
+        """
+        # Pega o próximo token do gerador (ou None se acabou)
+        return next(self._token_stream(), None)
+
+    # Retorna o gerador de tokens, criando-o na primeira chamada
+    def _token_stream(self) -> Iterator[Token]:
+        # Procura um gerador já criado (from_string não chama __init__)
+        stream = self.__dict__.get("_stream")
+        # Se ainda não existe, cria e guarda
+        if stream is None:
+            stream = self._stream = self._scan()
+        # Retorna o gerador
+        return stream
+
+    # Gera os tokens (objetos Token) a partir da varredura compacta
+    def _scan(self) -> Iterator[Token]:
+        """Gera os tokens casando o padrão mestre a partir da posição atual"""
+        # Guarda em variáveis locais (acesso mais rápido dentro do loop)
+        types = TOKEN_TYPES
+        fixed = FIXED_LEXEMES
+        text_at = self._text
+        position = self.line_index.position
+        # Para cada token (código, início, fim)
+        for code, start, end in self._scan_raw():
+            # Linha e coluna vêm do índice de linhas (busca binária)
+            line, column = position(start)
+            # Palavras reservadas e operadores têm texto fixo; os demais são recortados
+            yield Token(types[code], fixed[code] or text_at(start, end), line, column)
+
+    # Recorta o texto de um token do código fonte
+    def _text(self, start: int, end: int) -> str:
+        # Fatia da string entre o início e o fim do token
+        return self.source[start:end]
+
+    # Percorre o código com o padrão mestre e gera tuplas compactas
+    def _scan_raw(self) -> Iterator[tuple]:
+        """Gera (código, início, fim) de cada token, sem criar objetos Token"""
+        # Guarda em variáveis locais (acesso mais rápido dentro do loop)
+        keywords = self._keywords
+        operators = self._operators
+        identifier = IDENTIFIER_CODE
+        number = NUMBER_CODE
+
+        # Para cada trecho reconhecido pelo padrão mestre
+        for m in self._pattern.finditer(self.source, self.index):
+            # Nome do grupo que casou (NAME, NUMBER, OP, SKIP, ...)
+            kind = m.lastgroup
+
+            # Identificador ou palavra reservada
+            if kind == "NAME":
+                yield keywords.get(m.group(kind), identifier), m.start(kind), m.end()
+            # Número (inteiro ou com ponto decimal)
+            elif kind == "NUMBER":
+                yield number, m.start(kind), m.end()
+            # Operador ou parêntese
+            elif kind == "OP":
+                yield operators[m.group(kind)], m.start(kind), m.end()
+            # Quebras de linha e comentários não geram tokens (e as linhas
+            # não precisam ser contadas: isso fica com o índice de linhas)
+            elif kind == "SKIP":
+                continue
+            # Erros léxicos (mesmas mensagens do Scanner original)
+            elif kind == "BAD_NUMBER":
+                self._raise_error("Número inválido: faltam dígitos após o ponto", m.start(kind))
+            elif kind == "OPEN_COMMENT":
+                self._raise_error(UNCLOSED_COMMENT_MESSAGE, m.start(kind))
+            elif kind == "BANG":
+                self._raise_error("'!' isolado não é permitido; esperava '!='", m.start(kind))
+            else:
+                self._raise_error(f"Símbolo inválido: '{self._char_at(m.start(kind))}'", m.start(kind))
+
+        # Chegou ao fim: posiciona o scanner no fim do código
+        self.index = self.length
+
+    # Retorna o caractere que começa numa posição (para mensagens de erro)
+    def _char_at(self, index: int) -> str:
+        return self.source[index]
+
+# Tamanho padrão de cada bloco lido no modo fluxo (64 KiB)
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Padrão que encontra o fim de um comentário de linha ('\n' ou '\r')
+LINE_END_PATTERN = re.compile(r"[\r\n]")
+
+
+# ============================================================================
+# SCANNER EM FLUXO (STREAMING)
+# ============================================================================
+# Lê o código de um arquivo aberto (texto ou binário) em blocos de tamanho
+# fixo e gera os tokens aos poucos, sem nunca carregar o arquivo inteiro.
+# Tokens e comentários '/* ... */' que ficam cortados entre dois blocos são
+# continuados no bloco seguinte. A memória usada fica constante (um bloco +
+# o pedaço incompleto), não importa o tamanho do arquivo.
+# ============================================================================
+class StreamScanner(RegexScanner):
+    # Construtor - recebe um arquivo aberto (ou qualquer objeto com read())
+    def __init__(self, stream, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        # Guarda o arquivo de onde os blocos serão lidos
+        self.stream = stream
+        # Guarda o tamanho de cada bloco
+        self.chunk_size = chunk_size
+        # Posição (em caracteres) já consumida do fluxo
+        self.index: int = 0
+        # Inicializa a linha em 1 (primeira linha)
+        self.line: int = 1
+        # Inicializa a coluna em 1 (primeira coluna)
+        self.column: int = 1
+
+    # Método de classe que cria um StreamScanner a partir de uma string
+    @classmethod
+    def from_string(cls, source_code: str) -> 'StreamScanner':
+        # Importa StringIO para tratar a string como um arquivo
+        from io import StringIO
+        # Cria o scanner lendo da string como se fosse um arquivo
+        return cls(StringIO(source_code))
+
+    # O texto lido não fica guardado (só o bloco atual), então não há como
+    # recortar lexemas depois: não existe varredura compacta neste scanner
+    _scan_raw = None
+
+    # Lê os blocos do arquivo e gera os tokens
+    def _scan(self) -> Iterator[Token]:
+        """Gera os tokens lendo o arquivo bloco a bloco"""
+        # Guarda em variáveis locais (acesso mais rápido dentro do loop)
+        keywords = RESERVED_KEYWORDS
+        operators = OPERATORS
+        identifier = TokenType.IDENTIFIER
+        number = TokenType.NUMBER
+        # Decodificador incremental (só usado se o arquivo for binário)
+        decoder = None
+        # Texto ainda não consumido (pedaço incompleto + bloco atual)
+        buffer = ""
+        # Posição global (no arquivo todo) onde o buffer começa
+        base = 0
+        # Linha atual e posição global onde essa linha começa
+        line = 1
+        line_start = 0
+        # Posição (linha, coluna) de um '/*' ainda aberto (None se não há)
+        open_comment = None
+        # Indica se está no meio de um comentário de linha ('#')
+        in_line_comment = False
+        # Indica se o arquivo já chegou ao fim
+        eof = False
+
+        # Enquanto o arquivo não acabou
+        while not eof:
+            # Lê o próximo bloco
+            chunk = self.stream.read(self.chunk_size)
+            # Bloco vazio significa fim do arquivo
+            eof = not chunk
+            # Arquivo binário: decodifica os bytes (um caractere UTF-8 pode
+            # ficar dividido entre dois blocos, o decodificador cuida disso)
+            if isinstance(chunk, (bytes, bytearray)):
+                if decoder is None:
+                    decoder = codecs.getincrementaldecoder("utf-8")()
+                chunk = decoder.decode(chunk, final=eof)
+            # Junta o pedaço incompleto do bloco anterior com o bloco novo
+            buffer += chunk
+            # Tamanho do buffer e posição atual dentro dele
+            end = len(buffer)
+            pos = 0
+
+            # Processa o buffer até precisar de mais dados
+            while True:
+                # ------------------------------------------------------------
+                # Dentro de um comentário de bloco: procura o '*/'
+                # ------------------------------------------------------------
+                if open_comment is not None:
+                    close = buffer.find("*/", pos)
+                    # Se não fechou e o arquivo acabou, é erro (posição do '/*')
+                    if close < 0 and eof:
+                        raise LexicalError(UNCLOSED_COMMENT_MESSAGE, *open_comment)
+                    # Até onde o comentário pode ser descartado (se não achou
+                    # o fim, guarda o último caractere: pode ser o '*' de '*/')
+                    stop = close + 2 if close >= 0 else max(pos, end - 1)
+                    # Conta as quebras de linha do trecho descartado
+                    newlines = buffer.count("\n", pos, stop)
+                    if newlines:
+                        line += newlines
+                        line_start = base + buffer.rindex("\n", pos, stop) + 1
+                    # Avança até o fim do trecho descartado
+                    pos = stop
+                    # Se ainda não fechou, precisa do próximo bloco
+                    if close < 0:
+                        break
+                    # Comentário fechado
+                    open_comment = None
+
+                # ------------------------------------------------------------
+                # Dentro de um comentário de linha: procura o fim da linha
+                # ------------------------------------------------------------
+                if in_line_comment:
+                    m = LINE_END_PATTERN.search(buffer, pos)
+                    # Se a linha ainda não acabou, descarta tudo e lê mais
+                    if m is None:
+                        pos = end
+                        break
+                    # Linha acabou: continua a partir da quebra de linha
+                    pos = m.start()
+                    in_line_comment = False
+
+                # ------------------------------------------------------------
+                # Tokens: mesmo padrão mestre do RegexScanner
+                # ------------------------------------------------------------
+                for m in MASTER_PATTERN.finditer(buffer, pos):
+                    # Nome do grupo que casou e posição onde o lexema começa
+                    kind = m.lastgroup
+                    start = m.start(kind)
+                    stop = m.end()
+
+                    # Se o trecho encosta no fim do buffer e ainda há dados,
+                    # ele pode continuar no próximo bloco (ex: "vari|avel")
+                    if stop == end and not eof and kind != "BAD":
+                        if kind == "SKIP":
+                            # Espaços e quebras de linha podem ser consumidos;
+                            # um comentário de linha continua no próximo bloco
+                            if buffer.startswith("#", start):
+                                in_line_comment = True
+                        elif kind != "OPEN_COMMENT":
+                            # Token incompleto: guarda a partir do início dele
+                            pos = start
+                            break
+
+                    # '/*' sem '*/' neste buffer: pode fechar num bloco seguinte
+                    if kind == "OPEN_COMMENT" and not eof:
+                        # Guarda a posição do '/*' (para o erro, se não fechar)
+                        open_comment = (line, base + start - line_start + 1)
+                        # Continua depois do '/*'
+                        pos = start + 2
+                        break
+
+                    # Quebras de linha e comentários: só atualiza as linhas
+                    if kind == "SKIP":
+                        newlines = buffer.count("\n", start, stop)
+                        if newlines:
+                            line += newlines
+                            line_start = base + buffer.rindex("\n", start, stop) + 1
+                        pos = stop
+                        continue
+
+                    # Coluna onde o token começa (começa em 1)
+                    column = base + start - line_start + 1
+                    # Avança a posição para depois do token
+                    pos = stop
+
+                    # Identificador ou palavra reservada
+                    if kind == "NAME":
+                        text = m.group(kind)
+                        yield Token(keywords.get(text, identifier), text, line, column)
+                    # Número (inteiro ou com ponto decimal)
+                    elif kind == "NUMBER":
+                        yield Token(number, m.group(kind), line, column)
+                    # Operador ou parêntese
+                    elif kind == "OP":
+                        text = m.group(kind)
+                        yield Token(operators[text], text, line, column)
+                    # Erros léxicos (mesmas mensagens do Scanner original)
+                    elif kind == "BAD_NUMBER":
+                        raise LexicalError("Número inválido: faltam dígitos após o ponto", line, column)
+                    elif kind == "OPEN_COMMENT":
+                        raise LexicalError(UNCLOSED_COMMENT_MESSAGE, line, column)
+                    elif kind == "BANG":
+                        raise LexicalError("'!' isolado não é permitido; esperava '!='", line, column)
+                    else:
+                        raise LexicalError(f"Símbolo inválido: '{m.group(kind)}'", line, column)
+                else:
+                    # O loop 'for' terminou sem 'break': buffer todo consumido
+                    pos = end
+                    break
+
+                # Se saiu do 'for' por um '/*' aberto, volta para procurar o '*/'
+                if open_comment is not None:
+                    continue
+                # Senão, saiu por um token incompleto: precisa de mais dados
+                break
+
+            # Descarta o que já foi consumido e guarda só o pedaço incompleto
+            base += pos
+            buffer = buffer[pos:]
+            # Atualiza o estado público do scanner
+            self.index = base
+            self.line = line
+            self.column = base - line_start + 1
+
+
+# ============================================================================
+# PADRÃO MESTRE EM BYTES (MOTOR MMAP)
+# ============================================================================
+# A linguagem só usa caracteres ASCII, então o mesmo padrão mestre pode ser
+# aplicado direto nos bytes do arquivo, sem decodificar o texto para UTF-8.
+# ============================================================================
+BYTES_MASTER_PATTERN = re.compile(MASTER_PATTERN.pattern.encode("utf-8"), re.VERBOSE | re.DOTALL)
+
+# Códigos das palavras reservadas e dos operadores, buscados pelos bytes:
+# b"int" -> código de TokenType.INT (o texto "int" vem de FIXED_LEXEMES)
+BYTE_KEYWORD_CODES = {text.encode("ascii"): code for text, code in KEYWORD_CODES.items()}
+BYTE_OPERATOR_CODES = {text.encode("ascii"): code for text, code in OPERATOR_CODES.items()}
+
+
+# ============================================================================
+# SCANNER DE BYTES (MMAP)
+# ============================================================================
+# Varre o arquivo mapeado na memória (mmap) ou qualquer buffer de bytes
+# (bytes, bytearray, memoryview) sem decodificar o texto inteiro.
+# - Palavras reservadas e operadores usam textos prontos (nada é recortado)
+# - Só identificadores e números têm o lexema recortado e decodificado
+# - O mapeamento é somente leitura e compartilhado: vários processos
+#   analisando o mesmo arquivo usam as mesmas páginas do cache do sistema
+# As colunas continuam contadas em caracteres (como no Scanner original),
+# mesmo quando há acentos dentro de comentários (o SourceLineIndex desconta
+# os bytes extras de cada caractere acentuado).
+# ============================================================================
+class BytesScanner(RegexScanner):
+    # Construtor - recebe o caminho do arquivo e o mapeia na memória
+    def __init__(self, source_path: str) -> None:
+        # Abre o arquivo em modo binário
+        with open(source_path, "rb") as f:
+            try:
+                # Mapeia o arquivo inteiro, somente leitura (páginas compartilhadas)
+                self.source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Arquivo vazio não pode ser mapeado: usa um buffer vazio
+                self.source = b""
+        # Tamanho total do código (número de bytes)
+        self.length: int = len(self.source)
+        # Inicializa o índice na posição 0 (primeiro byte)
+        self.index: int = 0
+
+    # Cria um BytesScanner a partir de uma string (codifica em UTF-8)
+    @classmethod
+    def from_string(cls, source_code: str) -> 'BytesScanner':
+        # Usa o mesmo caminho de um buffer de bytes
+        return cls.from_buffer(source_code.encode("utf-8"))
+
+    # Cria um BytesScanner a partir de um buffer (bytes, memoryview, mmap...)
+    @classmethod
+    def from_buffer(cls, buffer) -> 'BytesScanner':
+        # Reaproveita o from_string do Scanner (só guarda o buffer e zera a posição)
+        return super().from_string(buffer)
+
+    # Libera o mapeamento do arquivo (se houver)
+    def close(self) -> None:
+        # Só objetos mmap precisam ser fechados
+        if isinstance(self.source, mmap.mmap):
+            self.source.close()
+
+    # Recorta e decodifica o texto de um token (só identificadores e números)
+    def _text(self, start: int, end: int) -> str:
+        # A linguagem é ASCII: a fatia de bytes vira texto diretamente
+        # (str(..., "ascii") aceita bytes, mmap e memoryview)
+        return str(self.source[start:end], "ascii")
+
+    # Padrão mestre usado por este scanner (bytes)
+    _pattern = BYTES_MASTER_PATTERN
+    # Códigos das palavras reservadas e operadores, buscados pelos bytes
+    _keywords = BYTE_KEYWORD_CODES
+    _operators = BYTE_OPERATOR_CODES
+
+    # Retorna o caractere que começa numa posição (para mensagens de erro)
+    def _char_at(self, index: int) -> str:
+        # Decodifica o caractere inteiro (até 4 bytes em UTF-8)
+        return bytes(self.source[index:index + 4]).decode("utf-8", "replace")[0]
+
+
+# Motores de varredura disponíveis (escolhidos com --motor=<nome>)
+SCANNER_ENGINES = {
+    "classico": Scanner,
+    "regex": RegexScanner,
+    "mmap": BytesScanner,
+}
+
+# ============================================================================
+# TOKEN BUFFER (TOKENS EM VETORES COMPACTOS)
+# ============================================================================
+# Guarda os tokens "por colunas" em vez de um objeto Token por token:
+#   types   -> código do tipo (1 byte)       starts  -> início no código (4 bytes)
+#   lengths -> tamanho do lexema (4 bytes)
+# Total: 9 bytes por token (um objeto Token passa de 200 bytes).
+# O lexema não é guardado: é recortado do código fonte só quando alguém
+# pede um Token (ex: print_token ou uma mensagem de erro). A linha e a
+# coluna também não: saem do início do token pelo SourceLineIndex.
+# Sem código fonte (StreamScanner), os lexemas vão para um texto próprio e
+# a linha e a coluna de cada token são guardadas em mais dois vetores.
+# ============================================================================
+class TokenBuffer:
+    # Construtor - recebe o código fonte de onde os lexemas serão recortados
+    def __init__(self, source="") -> None:
+        # Código fonte (str, bytes, mmap ou memoryview)
+        self.source = source
+        # Vetores paralelos (a posição i de cada um descreve o token i)
+        self.types = array("B")
+        self.starts = array("I")
+        self.lengths = array("I")
+        # Linha e coluna guardadas (só quando não há código fonte)
+        self.lines: Optional[array] = None
+        self.columns: Optional[array] = None
+        # Índice de linhas do código (montado só quando for usado)
+        self._line_index: Optional[SourceLineIndex] = None
+
+    # Método de classe que lê todos os tokens de um scanner para um buffer
+    @classmethod
+    def from_scanner(cls, scanner: Scanner) -> 'TokenBuffer':
+        # Varredura compacta (RegexScanner e BytesScanner): sem objetos Token
+        if getattr(scanner, "_scan_raw", None) is not None:
+            # Cria o buffer sobre o mesmo código fonte do scanner
+            buffer = cls(scanner.source)
+            # Guarda os métodos append em variáveis locais (loop mais rápido)
+            add_type = buffer.types.append
+            add_start = buffer.starts.append
+            add_length = buffer.lengths.append
+            # Para cada token (código, início, fim)
+            for code, start, end in scanner._scan_raw():
+                add_type(code)
+                add_start(start)
+                add_length(end - start)
+            # Reaproveita o índice de linhas do scanner, se ele já montou um
+            buffer._line_index = scanner.__dict__.get("_line_index")
+            # Retorna o buffer preenchido
+            return buffer
+        # Outros scanners: converte cada Token recebido
+        return cls.from_tokens(scanner, getattr(scanner, "source", None), scanner)
+
+    # Método de classe que monta um buffer a partir de objetos Token
+    @classmethod
+    def from_tokens(cls, tokens, source=None, scanner=None) -> 'TokenBuffer':
+        """
+        Monta o buffer a partir de Tokens. Se o código fonte não estiver
+        disponível (ex: StreamScanner), os lexemas variáveis são copiados
+        para um texto próprio do buffer.
+        """
+        # Partes do texto próprio (usado só quando não há código fonte)
+        pieces = [] if source is None else None
+        # Tamanho do texto próprio montado até agora
+        size = 0
+        # Cria o buffer (o código fonte é definido no fim, se for montado)
+        buffer = cls(source if source is not None else "")
+        # Sem código fonte, a linha e a coluna precisam ser guardadas
+        if pieces is not None:
+            buffer.lines = array("I")
+            buffer.columns = array("I")
+        # Para cada token recebido
+        for token in tokens:
+            # Código do tipo e tamanho do lexema
+            code = TOKEN_CODES[token.type]
+            length = len(token.lexeme)
+            # Descobre onde o lexema começa
+            if pieces is None:
+                # Scanner clássico: o índice dele está logo depois do token
+                start = scanner.index - length if scanner is not None else 0
+            elif FIXED_LEXEMES[code] is None:
+                # Sem código fonte: copia o lexema para o texto próprio
+                start = size
+                pieces.append(token.lexeme)
+                size += length
+            else:
+                # Lexema fixo: não precisa de texto (vem de FIXED_LEXEMES)
+                start = 0
+            # Guarda o token nos vetores
+            buffer.types.append(code)
+            buffer.starts.append(start)
+            buffer.lengths.append(length)
+            if pieces is not None:
+                buffer.lines.append(token.line)
+                buffer.columns.append(token.column)
+        # Se montou texto próprio, ele passa a ser o código fonte do buffer
+        if pieces is not None:
+            buffer.source = "".join(pieces)
+        # Senão, reaproveita o índice de linhas do scanner, se houver
+        elif scanner is not None:
+            buffer._line_index = scanner.__dict__.get("_line_index")
+        # Retorna o buffer preenchido
+        return buffer
+
+    # Número de tokens (permite usar len(buffer))
+    def __len__(self) -> int:
+        return len(self.types)
+
+    # Índice de linhas do código fonte (montado só na primeira vez que é usado)
+    @property
+    def line_index(self) -> SourceLineIndex:
+        # Se ainda não existe, monta e guarda
+        if self._line_index is None:
+            self._line_index = SourceLineIndex(self.source)
+        # Retorna o índice
+        return self._line_index
+
+    # Retorna a linha e a coluna do token i
+    def position(self, index: int) -> tuple:
+        # Sem código fonte: usa a linha e a coluna guardadas
+        if self.lines is not None:
+            return self.lines[index], self.columns[index]
+        # Com código fonte: calcula a partir do início do token
+        return self.line_index.position(self.starts[index])
+
+    # Retorna o token i como um objeto Token (criado só agora, sob demanda)
+    def __getitem__(self, index: int) -> Token:
+        # Calcula a posição (índices negativos também funcionam)
+        line, column = self.position(index)
+        # Monta o Token a partir dos vetores
+        return Token(TOKEN_TYPES[self.types[index]], self.lexeme(index), line, column)
+
+    # Permite percorrer o buffer em loops 'for' (gera Tokens sob demanda)
+    def __iter__(self) -> Iterator[Token]:
+        # Para cada posição, monta o Token correspondente
+        for index in range(len(self.types)):
+            yield self[index]
+
+    # Retorna o tipo do token i (sem criar o objeto Token)
+    def type_at(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.types[index]]
+
+    # Retorna o lexema do token i (recortado do código fonte)
+    def lexeme(self, index: int) -> str:
+        # Palavras reservadas e operadores têm texto fixo
+        text = FIXED_LEXEMES[self.types[index]]
+        if text is not None:
+            return text
+        # Identificadores e números: recorta do código fonte
+        start = self.starts[index]
+        text = self.source[start:start + self.lengths[index]]
+        # Fontes em bytes (mmap) são decodificados como ASCII
+        return text if isinstance(text, str) else str(text, "ascii")
+
+    # Gera os lexemas de todos os tokens, em ordem
+    def lexemes(self) -> Iterator[str]:
+        source = self.source
+        is_text = isinstance(source, str)
+        for code, start, length in zip(self.types, self.starts, self.lengths):
+            text = FIXED_LEXEMES[code]
+            if text is None:
+                text = source[start:start + length]
+                if not is_text:
+                    text = str(text, "ascii")
+            yield text
+
+    # Gera (linha, coluna) de todos os tokens, em ordem
+    # (os tokens estão em ordem no código: a linha só avança, sem a busca
+    # binária que position() faz para cada token)
+    def positions(self) -> Iterator[tuple]:
+        # Sem código fonte: linha e coluna guardadas
+        if self.lines is not None:
+            yield from zip(self.lines, self.columns)
+            return
+        index = self.line_index
+        # Bytes: a coluna precisa descontar os caracteres acentuados
+        if not index.is_text:
+            for start in self.starts:
+                yield index.position(start)
+            return
+        line_starts = index.line_starts
+        line_count = len(line_starts)
+        line = 1
+        line_start = 0
+        next_start = line_starts[1] if line_count > 1 else float("inf")
+        for start in self.starts:
+            # Avança até a linha onde o token começa
+            while start >= next_start:
+                line += 1
+                line_start = next_start
+                next_start = line_starts[line] if line < line_count else float("inf")
+            yield line, start - line_start + 1
+
+    # Conta quantos tokens há de cada tipo (usado nas estatísticas)
+    def count_types(self) -> Counter:
+        # Counter sobre o vetor de códigos (contagem feita em C) e
+        # converte os códigos de volta para TokenType, mantendo a ordem
+        return Counter({TOKEN_TYPES[code]: count for code, count in Counter(self.types).items()})
+
+    # Memória usada pelos vetores (em bytes)
+    def nbytes(self) -> int:
+        return sum(vector.itemsize * len(vector) for vector in
+                   (self.types, self.starts, self.lengths, self.lines, self.columns)
+                   if vector is not None)
+
+
+# ============================================================================
+# JANELA DE TOKENS (PARSER EM FLUXO)
+# ============================================================================
+# A gramática é LL(1): o parser só olha o token atual e, na recuperação de
+# erros, o token anterior. A janela guarda só esses tokens, lidos do scanner
+# quando o parser pede (em vez de ler o arquivo inteiro antes de começar).
+# Os tokens continuam numerados desde o início do arquivo (como no
+# TokenBuffer); os que já saíram da janela não podem mais ser consultados.
+# ============================================================================
+# Quantos tokens à frente do atual a gramática precisa olhar
+GRAMMAR_LOOKAHEAD = 1
+
+
+class TokenWindow:
+    # Construtor - recebe de onde os tokens vêm (ex: um Scanner)
+    def __init__(self, tokens, size: int = GRAMMAR_LOOKAHEAD + 1) -> None:
+        # Iterador que entrega os tokens um por vez
+        self._tokens = iter(tokens)
+        # Buffer circular: ao passar do tamanho, o token mais antigo sai
+        self.window: deque = deque(maxlen=size)
+        # Quantos tokens já foram lidos (número do próximo token a ler)
+        self.count = 0
+        # Indica se o scanner já chegou ao fim
+        self.exhausted = False
+
+    # Lê tokens até ter o token 'index' (ou até o fim) - True se ele existe
+    def _fill(self, index: int) -> bool:
+        # Enquanto o token pedido ainda não foi lido e há mais tokens
+        while self.count <= index and not self.exhausted:
+            # Lê o próximo token do scanner
+            token = next(self._tokens, None)
+            # Se não veio nada, o scanner chegou ao fim
+            if token is None:
+                self.exhausted = True
+            else:
+                # Senão, guarda na janela
+                self.window.append(token)
+                self.count += 1
+        # O token existe se já foi lido
+        return index < self.count
+
+    # Verifica se o token 'index' está depois do último token do arquivo
+    def at_end(self, index: int) -> bool:
+        return not self._fill(index)
+
+    # Retorna o token 'index' (None se ele não existe ou já saiu da janela)
+    def _get(self, index: int) -> Optional[Token]:
+        # Antes do primeiro token ou depois do último: não existe
+        if index < 0 or not self._fill(index):
+            return None
+        # Posição do token dentro da janela (0 = mais antigo guardado)
+        offset = index - (self.count - len(self.window))
+        # Retorna o token, se ele ainda está na janela
+        return self.window[offset] if offset >= 0 else None
+
+    # Retorna o tipo do token 'index' (None se não existe)
+    def type_at(self, index: int) -> Optional[TokenType]:
+        token = self._get(index)
+        return token.type if token is not None else None
+
+    # Retorna o token 'index' (ou um token EOF se ele não existe)
+    def __getitem__(self, index: int) -> Token:
+        token = self._get(index)
+        return token if token is not None else Token(TokenType.EOF, "", 0, 0)
+
+    # Número de tokens lidos até agora
+    def __len__(self) -> int:
+        return self.count
+
+
+# Códigos dos tipos dos tokens de uma TokenWindow (como TokenBuffer.types),
+# para o parser dirigido pela tabela: depois do último token, o código é EOF
+class WindowCodes:
+    # Construtor - recebe a janela de tokens
+    def __init__(self, window: TokenWindow) -> None:
+        self.window = window
+
+    # Retorna o código do tipo do token 'index' (lendo o token, se preciso)
+    def __getitem__(self, index: int) -> int:
+        token_type = self.window.type_at(index)
+        return TOKEN_CODES[token_type] if token_type is not None else EOF_CODE
 
 
 # ============================================================================
@@ -521,7 +1401,7 @@ class Scanner:
 # ============================================================================
 class SyntaxError(Exception):
     # Construtor da exceção de erro sintático
-    def __init__(self, message: str, line: int, column: int) -> None:
+    def __init__(self, message: str, line: int, column: int, index: Optional[int] = None) -> None:
         # Chama o construtor da classe pai (Exception)
         super().__init__(message)
         # Armazena a mensagem de erro
@@ -530,6 +1410,8 @@ class SyntaxError(Exception):
         self.line = line
         # Armazena a coluna onde o erro ocorreu
         self.column = column
+        # Armazena o número do token onde o erro ocorreu (None no fim dos tokens)
+        self.index = index
 
     def __str__(self) -> str:
         # Retorna uma mensagem formatada com a posição do erro
@@ -538,281 +1420,3693 @@ class SyntaxError(Exception):
 
 
 # ============================================================================
-# PARSER (ANALISADOR SINTÁTICO)
+# ERRO SEMÂNTICO
 # ============================================================================
-# Responsável por verificar se o código está escrito corretamente
-# Usa os tokens do Scanner para verificar se seguem as regras da gramática
-# Exemplo: verifica se "int x = 10" está correto (tipo, nome, =, valor)
+# Erro de quando o código está escrito corretamente, mas não faz sentido
+# (ex: usar uma variável antes de declarar, ou declarar a mesma duas vezes)
 # ============================================================================
-class Parser:
-    # Construtor do Parser - recebe um Scanner
-    def __init__(self, scanner: Scanner) -> None:
-        # Guarda a referência do scanner
-        self.scanner = scanner
-        # Converte o scanner em uma lista de tokens (lê todos os tokens de uma vez)
-        self.tokens: list[Token] = list(scanner)
-        # Inicializa o índice do token atual em 0 (primeiro token)
-        self.current = 0
-        # Inicializa a lista de erros sintáticos (começa vazia)
-        self.errors: list[SyntaxError] = []
-
-    # Método principal que analisa todo o programa sintaticamente
-    def parse(self) -> bool:
-        """Analisa o programa sintaticamente"""
-        # Enquanto não chegou ao fim dos tokens
-        while not self._is_at_end():
-            try:
-                # Tenta analisar uma declaração
-                self._declaration()
-            except SyntaxError:
-                # Se deu erro, tenta recuperar avançando até a próxima declaração
-                # Isso permite encontrar múltiplos erros em vez de parar no primeiro
-                self._synchronize()
-        # Retorna True se não há erros, False se há erros
-        return len(self.errors) == 0
-    
-    # Método de recuperação de erros - avança até encontrar um ponto seguro
-    def _synchronize(self) -> None:
-        """Recupera de erros sintáticos avançando até a próxima declaração"""
-        # Enquanto não chegou ao fim
-        while not self._is_at_end():
-            # Se o token anterior era um parêntese direito, já está em um ponto seguro
-            if self._previous().type == TokenType.RPAREN:
-                # Para a recuperação
-                return
-            # Se encontrou o início de uma nova declaração (int, float, print, if)
-            if self._check(TokenType.INT) or self._check(TokenType.FLOAT) or \
-               self._check(TokenType.PRINT) or self._check(TokenType.IF):
-                # Para a recuperação (encontrou um ponto seguro)
-                return
-            # Avança para o próximo token (pula tokens até encontrar algo reconhecível)
-            self._advance()
+class SemanticError(Exception):
+    # Construtor da exceção de erro semântico
+    def __init__(self, message: str, line: int, column: int) -> None:
+        # Chama o construtor da classe pai (Exception)
+        super().__init__(message)
+        # Armazena a mensagem de erro
+        self.message = message
+        # Armazena a linha onde o erro ocorreu
+        self.line = line
+        # Armazena a coluna onde o erro ocorreu
+        self.column = column
 
-    # Analisa uma declaração (pode ser declaração de variável, print, if, ou atribuição)
-    def _declaration(self) -> None:
-        """DECLARAÇÃO -> TIPO IDENTIFIER ASSIGN EXPRESSAO | print ( EXPRESSAO ) | if ( EXPRESSAO ) DECLARAÇÃO [else DECLARAÇÃO]"""
-        # Se o token atual é 'int' ou 'float', é uma declaração de variável com tipo
-        if self._check(TokenType.INT) or self._check(TokenType.FLOAT):
-            # Analisa declaração de variável com tipo (ex: int x = 10)
-            self._type_declaration()
-        # Se o token atual é 'print', é um comando de impressão
-        elif self._check(TokenType.PRINT):
-            # Analisa comando print (ex: print(x))
-            self._print_statement()
-        # Se o token atual é 'if', é uma estrutura condicional
-        elif self._check(TokenType.IF):
-            # Analisa estrutura if (ex: if (x > 5) print(x))
-            self._if_statement()
-        # Se o token atual é um identificador, é uma atribuição simples
-        elif self._check(TokenType.IDENTIFIER):
-            # Analisa atribuição (ex: x = 10)
-            self._assignment()
-        else:
-            # Se não é nenhum dos casos acima, é um erro
-            # Pega o token atual para reportar o erro
-            token = self._peek()
-            # Registra o erro
-            self._error(f"Declaração esperada, encontrado: '{token.lexeme}'", token)
-            # Lança exceção para parar a análise desta declaração
-            raise SyntaxError("Erro de declaração", token.line, token.column)
-
-    # Analisa declaração de variável com tipo (ex: int x = 10)
-    def _type_declaration(self) -> None:
-        """TIPO IDENTIFIER ASSIGN EXPRESSAO"""
-        # Verifica se o token atual é 'int' ou 'float' e consome se for
-        # Se não for nenhum dos dois, é um erro
-        if not (self._match(TokenType.INT) or self._match(TokenType.FLOAT)):
-            # Pega o token atual para reportar o erro
-            token = self._peek()
-            # Registra o erro
-            self._error("Esperado 'int' ou 'float'", token)
-        # Consome um identificador (nome da variável) - obrigatório
-        self._consume(TokenType.IDENTIFIER, "Esperado identificador")
-        # Consome o operador de atribuição '=' - obrigatório
-        self._consume(TokenType.ASSIGN, "Esperado '='")
-        # Analisa a expressão (valor que será atribuído)
-        self._expression()
-
-    # Analisa atribuição simples (ex: x = 10)
-    def _assignment(self) -> None:
-        """IDENTIFIER ASSIGN EXPRESSAO"""
-        # Consome um identificador (nome da variável) - obrigatório
-        self._consume(TokenType.IDENTIFIER, "Esperado identificador")
-        # Consome o operador de atribuição '=' - obrigatório
-        self._consume(TokenType.ASSIGN, "Esperado '='")
-        # Analisa a expressão (valor que será atribuído)
-        self._expression()
-
-    # Analisa comando print (ex: print(x))
-    def _print_statement(self) -> None:
-        """print ( EXPRESSAO )"""
-        # Consome a palavra reservada 'print' - obrigatório
-        self._consume(TokenType.PRINT, "Esperado 'print'")
-        # Consome o parêntese esquerdo '(' - obrigatório
-        self._consume(TokenType.LPAREN, "Esperado '('")
-        # Analisa a expressão que será impressa
-        self._expression()
-        # Consome o parêntese direito ')' - obrigatório
-        self._consume(TokenType.RPAREN, "Esperado ')'")
-
-    # Analisa estrutura condicional if (ex: if (x > 5) print(x) else print(y))
-    def _if_statement(self) -> None:
-        """if ( EXPRESSAO ) DECLARAÇÃO [else DECLARAÇÃO]"""
-        # Consome a palavra reservada 'if' - obrigatório
-        self._consume(TokenType.IF, "Esperado 'if'")
-        # Consome o parêntese esquerdo '(' - obrigatório
-        self._consume(TokenType.LPAREN, "Esperado '('")
-        # Analisa a expressão de condição (ex: x > 5)
-        self._expression()
-        # Consome o parêntese direito ')' - obrigatório
-        self._consume(TokenType.RPAREN, "Esperado ')'")
-        # Analisa a declaração que será executada se a condição for verdadeira
-        self._declaration()
-        # Verifica se há um 'else' (opcional)
-        if self._check(TokenType.ELSE):
-            # Consome o 'else'
-            self._advance()
-            # Analisa a declaração que será executada se a condição for falsa
-            self._declaration()
-
-    # Analisa expressão (pode ter operadores +, -, >, >=, <, <=, ==, !=)
-    def _expression(self) -> None:
-        """EXPRESSAO -> TERMO ( (PLUS|MINUS|GT|GTE|LT|LTE|EQUAL_EQUAL|NOT_EQUAL) TERMO )*"""
-        # Analisa o primeiro termo
-        self._term()
-        # Enquanto encontrar operadores de expressão (+, -, >, >=, <, <=, ==, !=)
-        while self._match(TokenType.PLUS, TokenType.MINUS, TokenType.GT, TokenType.GTE, 
-                          TokenType.LT, TokenType.LTE, TokenType.EQUAL_EQUAL, TokenType.NOT_EQUAL):
-            # Analisa o próximo termo (ex: x + y, x >= 5, x == y)
-            self._term()
-
-    # Analisa termo (pode ter operadores * e /)
-    def _term(self) -> None:
-        """TERMO -> FATOR ( (STAR|SLASH) FATOR )*"""
-        # Analisa o primeiro fator
-        self._factor()
-        # Enquanto encontrar operadores de multiplicação ou divisão (*, /)
-        while self._match(TokenType.STAR, TokenType.SLASH):
-            # Analisa o próximo fator (ex: x * y, x / 2)
-            self._factor()
-
-    # Analisa fator (número, identificador ou expressão entre parênteses)
-    def _factor(self) -> None:
-        """FATOR -> NUMBER | IDENTIFIER | ( EXPRESSAO )"""
-        # Se o token atual é um número, consome e retorna
-        if self._match(TokenType.NUMBER):
-            return
-        # Se o token atual é um identificador, consome e retorna
-        if self._match(TokenType.IDENTIFIER):
-            return
-        # Se o token atual é um parêntese esquerdo, é uma expressão entre parênteses
-        if self._match(TokenType.LPAREN):
-            # Analisa a expressão dentro dos parênteses
-            self._expression()
-            # Consome o parêntese direito ')' - obrigatório
-            self._consume(TokenType.RPAREN, "Esperado ')'")
-            return
-        # Se chegou aqui, não é nenhum fator válido - é um erro
-        token = self._peek()
-        # Registra o erro
-        self._error(f"Fator esperado, encontrado: '{token.lexeme}'", token)
-        # Lança exceção para parar a análise
-        raise SyntaxError("Erro de fator", token.line, token.column)
-
-    # Verifica se o token atual corresponde a algum dos tipos fornecidos
-    # Se corresponder, consome o token e retorna True
-    def _match(self, *types: TokenType) -> bool:
-        """Verifica se o token atual corresponde a algum dos tipos"""
-        # Para cada tipo fornecido
-        for token_type in types:
-            # Verifica se o token atual é deste tipo
-            if self._check(token_type):
-                # Se for, avança para o próximo token (consome o token)
-                self._advance()
-                # Retorna True (encontrou e consumiu)
-                return True
-        # Se nenhum tipo correspondeu, retorna False
-        return False
+    def __str__(self) -> str:
+        # Retorna uma mensagem formatada com a posição do erro
+        # Exemplo: "Erro semântico na linha 2, coluna 7: Variável 'w' usada antes de ser declarada"
+        return f"Erro semântico na linha {self.line}, coluna {self.column}: {self.message}"
 
-    # Verifica se o token atual é do tipo especificado (sem consumir o token)
-    def _check(self, token_type: TokenType) -> bool:
-        """Verifica se o token atual é do tipo especificado"""
-        # Se chegou ao fim dos tokens, retorna False
-        if self._is_at_end():
-            return False
-        # Retorna True se o tipo do token atual é igual ao tipo esperado
-        return self._peek().type == token_type
 
-    # Avança para o próximo token e retorna o token anterior
-    def _advance(self) -> Token:
-        """Avança para o próximo token"""
-        # Se não chegou ao fim
-        if not self._is_at_end():
-            # Incrementa o índice do token atual
-            self.current += 1
-        # Retorna o token anterior (o que estava antes de avançar)
-        return self._previous()
+# ============================================================================
+# TABELA DE SÍMBOLOS
+# ============================================================================
+# Guarda cada variável uma única vez: o nome (internado - o mesmo objeto
+# str para todos os usos) recebe um slot, um número denso (0, 1, 2, ...)
+# na ordem em que as variáveis aparecem. O parser resolve cada uso para o
+# slot; as fases seguintes acessam as variáveis por índice nos vetores.
+# - int/float x = ...: declara x com o tipo (erro se x já existe)
+# - x = ... com x novo: cria x sem tipo declarado
+# - x numa expressão: erro se x ainda não existe
+# ============================================================================
+class SymbolTable:
+    # Construtor - começa vazia
+    def __init__(self) -> None:
+        # Slot de cada nome
+        self.slots: dict[str, int] = {}
+        # Nome e tipo ("int", "float" ou None) de cada slot
+        self.names: list[str] = []
+        self.types: list[Optional[str]] = []
 
-    # Verifica se chegou ao fim da lista de tokens
-    def _is_at_end(self) -> bool:
-        """Verifica se chegou ao fim"""
-        # Retorna True se o índice atual é maior ou igual ao número de tokens
-        return self.current >= len(self.tokens)
+    # Número de variáveis (permite usar len(symbols))
+    def __len__(self) -> int:
+        return len(self.names)
 
-    # Retorna o token atual sem avançar (não consome o token)
-    def _peek(self) -> Token:
-        """Retorna o token atual"""
-        # Se chegou ao fim, retorna um token EOF (End Of File)
-        if self._is_at_end():
-            return Token(TokenType.EOF, "", 0, 0)
-        # Senão, retorna o token na posição atual
-        return self.tokens[self.current]
+    # Retorna o slot de um nome (-1 se a variável não existe)
+    def lookup(self, name: str) -> int:
+        return self.slots.get(name, -1)
 
-    # Retorna o token anterior (o que estava antes do token atual)
-    def _previous(self) -> Token:
-        """Retorna o token anterior"""
-        # Retorna o token na posição anterior ao índice atual
-        return self.tokens[self.current - 1]
-
-    # Consome um token do tipo esperado (obrigatório)
-    # Se não for do tipo esperado, lança erro
-    def _consume(self, token_type: TokenType, message: str) -> None:
-        """Consome um token do tipo esperado"""
-        # Verifica se o token atual é do tipo esperado
-        if self._check(token_type):
-            # Se for, avança para o próximo token (consome)
-            self._advance()
-        else:
-            # Se não for, é um erro
-            # Pega o token atual para reportar o erro
-            token = self._peek()
-            # Registra o erro com a mensagem fornecida
-            self._error(f"{message}, encontrado: '{token.lexeme}'", token)
-            # Lança exceção para parar a análise
-            raise SyntaxError(message, token.line, token.column)
+    # Cria uma variável e retorna o slot dela
+    def declare(self, name: str, type_name: Optional[str]) -> int:
+        slot = len(self.names)
+        name = sys.intern(name)
+        self.slots[name] = slot
+        self.names.append(name)
+        self.types.append(type_name)
+        return slot
 
-    # Registra um erro sintático na lista de erros
-    def _error(self, message: str, token: Token) -> None:
-        """Registra um erro sintático"""
-        # Cria uma exceção SyntaxError com a mensagem e posição
-        error = SyntaxError(message, token.line, token.column)
-        # Adiciona o erro na lista de erros
-        self.errors.append(error)
-        # Não levanta exceção aqui para permitir recuperação de erros
-        # (a exceção é lançada em _consume quando necessário)
+    # Descarta as variáveis criadas a partir do slot 'size' (declaração com erro)
+    def truncate(self, size: int) -> None:
+        for name in self.names[size:]:
+            del self.slots[name]
+        del self.names[size:]
+        del self.types[size:]
 
-    def get_errors(self) -> list[SyntaxError]:
-        """Retorna a lista de erros sintáticos"""
-        return self.errors
+    # Retorna (nome, tipo) das variáveis a partir do slot 'start'
+    def entries(self, start: int = 0) -> list[tuple]:
+        return list(zip(self.names[start:], self.types[start:]))
 
 
 # ============================================================================
-# CORES PARA TERMINAL
+# ÁRVORE SINTÁTICA (AST EM VETORES)
 # ============================================================================
-# Define códigos ANSI para colorir a saída do terminal
+# A árvore fica em vetores paralelos (uma "arena"), e não em um objeto por
+# nó: a posição i de cada vetor descreve o nó i.
+#   kinds        -> tipo do nó (1 byte)
+#   first_child  -> primeiro filho (-1 se não tem filhos)
+#   next_sibling -> próximo irmão (-1 se é o último filho)
+#   token_index  -> token que originou o nó (-1 se não há)
+#   slots        -> slot da variável em IDENTIFIER (-1 nos outros nós)
+# Total: 17 bytes por nó. O nó 0 é sempre o PROGRAM (raiz).
+# No parser, os filhos são criados antes do pai (cada declaração ocupa um
+# trecho contínuo dos vetores, já em pós-ordem).
+# Em CONSTANT (valor calculado por uma otimização, sem token no código),
+# token_index guarda a posição do valor na tabela constants da árvore.
+# Exemplo: "int x = 1 + 2" ->
+#   PROGRAM
+#     VAR_DECL 'int'
+#       IDENTIFIER 'x'
+#       BINARY '+'
+#         NUMBER '1'
+#         NUMBER '2'
 # ============================================================================
-class Colors:
-    HEADER = '\033[95m'    # Cor rosa/magenta para cabeçalhos
+class NodeKind(Enum):
+    PROGRAM = auto()         # Raiz: os filhos são as declarações
+    VAR_DECL = auto()        # int/float x = EXPRESSAO (filhos: IDENTIFIER, expressão)
+    ASSIGN = auto()          # x = EXPRESSAO (filhos: IDENTIFIER, expressão)
+    PRINT = auto()           # print(EXPRESSAO) (filho: expressão)
+    IF = auto()              # if (cond) DECL [else DECL] (filhos: cond, então, [senão])
+    BINARY = auto()          # Operação (token = operador; filhos: esquerda, direita)
+    NUMBER = auto()          # Número (folha)
+    IDENTIFIER = auto()      # Nome de variável (folha)
+    CONSTANT = auto()        # Valor calculado na compilação (folha, ver constants)
+    EMPTY = auto()           # Declaração vazia (ramo de if eliminado)
+
+
+# Código de cada tipo de nó: NODE_KINDS[código] -> NodeKind
+NODE_KINDS = tuple(NodeKind)
+NODE_CODES = {kind: code for code, kind in enumerate(NODE_KINDS)}
+
+
+class SyntaxTree:
+    # Construtor - recebe os tokens do programa (para ler os lexemas) e a
+    # tabela de símbolos a que os slots se referem
+    def __init__(self, tokens=None, symbols: Optional[SymbolTable] = None) -> None:
+        # Tokens de onde vêm os lexemas (None no parser em fluxo)
+        self.tokens = tokens
+        # Tabela de símbolos (nome e tipo de cada slot)
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        # Vetores paralelos (a posição i de cada um descreve o nó i)
+        self.kinds = array("B")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.token_index = array("i")
+        self.slots = array("i")
+        # Valores dos nós CONSTANT
+        self.constants: list = []
+        # Última declaração ligada à raiz (-1 se ainda não há nenhuma)
+        self._last_statement = -1
+        # Cria a raiz (nó 0)
+        self.add(NodeKind.PROGRAM, -1, ())
+
+    # Número de nós (permite usar len(tree))
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    # Cria um nó e liga os filhos a ele (retorna o número do nó)
+    def add(self, kind: NodeKind, token: int, children: tuple, slot: int = -1) -> int:
+        index = len(self.kinds)
+        self.kinds.append(NODE_CODES[kind])
+        self.token_index.append(token)
+        self.slots.append(slot)
+        self.next_sibling.append(-1)
+        # Primeiro filho e encadeamento dos irmãos
+        if children:
+            self.first_child.append(children[0])
+            for child, sibling in zip(children, children[1:]):
+                self.next_sibling[child] = sibling
+        else:
+            self.first_child.append(-1)
+        return index
+
+    # Cria um nó CONSTANT com um valor calculado (retorna o número do nó)
+    def add_constant(self, value) -> int:
+        self.constants.append(value)
+        return self.add(NodeKind.CONSTANT, len(self.constants) - 1, ())
+
+    # Liga uma declaração completa como último filho da raiz
+    def add_statement(self, node: int) -> None:
+        if self._last_statement < 0:
+            self.first_child[0] = node
+        else:
+            self.next_sibling[self._last_statement] = node
+        self._last_statement = node
+
+    # Descarta os nós criados a partir de 'size' (declaração com erro)
+    def truncate(self, size: int) -> None:
+        # Nenhum nó anterior aponta para eles: só a raiz liga declarações,
+        # e só depois que elas terminam sem erro
+        del self.kinds[size:]
+        del self.first_child[size:]
+        del self.next_sibling[size:]
+        del self.token_index[size:]
+        del self.slots[size:]
+
+    # Retorna o tipo do nó
+    def kind(self, node: int) -> NodeKind:
+        return NODE_KINDS[self.kinds[node]]
+
+    # Retorna o lexema do token do nó (None se não há token ou tokens)
+    def lexeme(self, node: int) -> Optional[str]:
+        token = self.token_index[node]
+        # Constante calculada: mostra o valor
+        if NODE_KINDS[self.kinds[node]] is NodeKind.CONSTANT:
+            return str(self.constants[token])
+        if token < 0 or self.tokens is None:
+            return None
+        return self.tokens.lexeme(token)
+
+    # Gera os filhos de um nó, em ordem
+    def children(self, node: int) -> Iterator[int]:
+        child = self.first_child[node]
+        while child >= 0:
+            yield child
+            child = self.next_sibling[child]
+
+    # Percorre a árvore em pré-ordem (pai antes dos filhos), sem recursão
+    def walk(self, node: int = 0) -> Iterator[tuple]:
+        """Gera (nó, profundidade) usando uma pilha explícita"""
+        stack = [(node, 0)]
+        while stack:
+            node, depth = stack.pop()
+            yield node, depth
+            # Empilha os filhos ao contrário (o primeiro sai primeiro)
+            stack.extend((child, depth + 1) for child in reversed(list(self.children(node))))
+
+    # Percorre a árvore em pós-ordem (filhos antes do pai), sem recursão
+    def postorder(self, node: int = 0) -> Iterator[int]:
+        """Gera os nós de uma subárvore, cada pai depois dos seus filhos"""
+        # Pilha de (nó, filhos já empilhados?)
+        stack = [(node, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                yield node
+                continue
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(list(self.children(node))))
+
+    # Memória usada pelos vetores (em bytes)
+    def nbytes(self) -> int:
+        return sum(vector.itemsize * len(vector) for vector in
+                   (self.kinds, self.first_child, self.next_sibling, self.token_index, self.slots))
+
+
+# ============================================================================
+# GRAMÁTICA (TABELA LL(1))
+# ============================================================================
+# A gramática fica escrita uma única vez, como dados (GRAMMAR): cada regra é
+# (não-terminal, sequência de símbolos). Um símbolo pode ser:
+#   TokenType      -> terminal (o token precisa ser desse tipo)
+#   str            -> não-terminal (outra regra)
+#   GrammarAction  -> ação do parser (cria um nó, verifica uma variável, ...),
+#                     executada quando a análise chega nela
+# Na carga do programa, a gramática é compilada (compile_grammar) para os
+# conjuntos FIRST e FOLLOW e para a tabela de decisão: para cada
+# não-terminal e cada tipo de token, qual regra usar (decisão O(1) por
+# token). O parser só executa a tabela, com uma pilha explícita (sem
+# recursão). Para mudar a linguagem, basta mudar GRAMMAR (e as ações).
+# - Uma regra vazia (ex: SENAO -> nada) é usada com qualquer token que não
+#   começa outra regra do mesmo não-terminal: o erro, se houver, aparece no
+#   próximo terminal esperado (ex: "Esperado ')'")
+# - Conflito entre uma regra vazia e outra (o "else pendente": em
+#   "if (a) if (b) x = 1 else x = 2", SENAO pode ser vazio ou "else ...")
+#   é resolvido pela regra não vazia: o else fica com o if mais próximo
+# - Conflito entre duas regras não vazias é erro na compilação da gramática
+# ============================================================================
+class GrammarAction(Enum):
+    MARK = auto()            # Guarda o número do token que acabou de ser consumido
+    NUMBER = auto()          # Cria o nó NUMBER
+    VARIABLE = auto()        # Cria o nó IDENTIFIER de um uso (erro se não declarada)
+    BINARY = auto()          # Cria o nó BINARY (esquerda, operador, direita)
+    TYPE = auto()            # Guarda o token e o nome do tipo (int/float)
+    DECLARED_NAME = auto()   # Nome numa declaração (erro se já declarada)
+    ASSIGNED_NAME = auto()   # Nome numa atribuição
+    VAR_DECL = auto()        # Cria o nó VAR_DECL (e a variável)
+    ASSIGN = auto()          # Cria o nó ASSIGN (e a variável, se é nova)
+    PRINT = auto()           # Cria o nó PRINT
+    IF = auto()              # Cria o nó IF sem else
+    IF_ELSE = auto()         # Cria o nó IF com else
+
+
+# Número de cada ação (a posição dela em GrammarAction)
+ACTION_CODES = {action: code for code, action in enumerate(GrammarAction)}
+
+# Operadores de cada nível de precedência (o último nível liga mais forte)
+ADDITIVE_OPERATORS = (TokenType.PLUS, TokenType.MINUS, TokenType.GT, TokenType.GTE,
+                      TokenType.LT, TokenType.LTE, TokenType.EQUAL_EQUAL, TokenType.NOT_EQUAL)
+MULTIPLICATIVE_OPERATORS = (TokenType.STAR, TokenType.SLASH)
+
+# Não-terminal inicial (o programa inteiro)
+START_SYMBOL = "PROGRAMA"
+
+GRAMMAR = (
+    # PROGRAMA -> DECLARAÇÃO* (o parser reconhece uma declaração de cada
+    # vez, para recuperar de erros entre uma e outra)
+    ("PROGRAMA", ("DECLARACAO", "PROGRAMA")),
+    ("PROGRAMA", ()),
+    # DECLARAÇÃO -> TIPO IDENTIFIER = EXPRESSAO | IDENTIFIER = EXPRESSAO
+    #             | print ( EXPRESSAO ) | if ( EXPRESSAO ) DECLARAÇÃO [else DECLARAÇÃO]
+    *(("DECLARACAO", (type_token, GrammarAction.TYPE, TokenType.IDENTIFIER, GrammarAction.DECLARED_NAME,
+                      TokenType.ASSIGN, "EXPRESSAO", GrammarAction.VAR_DECL))
+      for type_token in (TokenType.INT, TokenType.FLOAT)),
+    ("DECLARACAO", (TokenType.IDENTIFIER, GrammarAction.ASSIGNED_NAME, TokenType.ASSIGN, GrammarAction.MARK,
+                    "EXPRESSAO", GrammarAction.ASSIGN)),
+    ("DECLARACAO", (TokenType.PRINT, GrammarAction.MARK, TokenType.LPAREN, "EXPRESSAO", TokenType.RPAREN,
+                    GrammarAction.PRINT)),
+    ("DECLARACAO", (TokenType.IF, GrammarAction.MARK, TokenType.LPAREN, "EXPRESSAO", TokenType.RPAREN,
+                    "DECLARACAO", "SENAO")),
+    ("SENAO", (TokenType.ELSE, "DECLARACAO", GrammarAction.IF_ELSE)),
+    ("SENAO", (GrammarAction.IF,)),
+    # EXPRESSAO -> TERMO ( (+ | - | > | >= | < | <= | == | !=) TERMO )*
+    ("EXPRESSAO", ("TERMO", "EXPRESSAO_RESTO")),
+    *(("EXPRESSAO_RESTO", (operator, GrammarAction.MARK, "TERMO", GrammarAction.BINARY, "EXPRESSAO_RESTO"))
+      for operator in ADDITIVE_OPERATORS),
+    ("EXPRESSAO_RESTO", ()),
+    # TERMO -> FATOR ( (* | /) FATOR )*
+    ("TERMO", ("FATOR", "TERMO_RESTO")),
+    *(("TERMO_RESTO", (operator, GrammarAction.MARK, "FATOR", GrammarAction.BINARY, "TERMO_RESTO"))
+      for operator in MULTIPLICATIVE_OPERATORS),
+    ("TERMO_RESTO", ()),
+    # FATOR -> NUMBER | IDENTIFIER | ( EXPRESSAO )
+    ("FATOR", (TokenType.NUMBER, GrammarAction.NUMBER)),
+    ("FATOR", (TokenType.IDENTIFIER, GrammarAction.VARIABLE)),
+    ("FATOR", (TokenType.LPAREN, "EXPRESSAO", TokenType.RPAREN)),
+)
+
+# Mensagem de erro quando um símbolo não pode ser reconhecido
+# (a mensagem completa é "<mensagem>, encontrado: '<lexema>'")
+EXPECTED_MESSAGES = {
+    "DECLARACAO": "Declaração esperada",
+    "EXPRESSAO": "Fator esperado",
+    "TERMO": "Fator esperado",
+    "FATOR": "Fator esperado",
+    TokenType.IDENTIFIER: "Esperado identificador",
+    TokenType.ASSIGN: "Esperado '='",
+    TokenType.LPAREN: "Esperado '('",
+    TokenType.RPAREN: "Esperado ')'",
+}
+
+# Código do token de fim de arquivo (o "token" depois do último)
+EOF_CODE = TOKEN_CODES[TokenType.EOF]
+# Os símbolos viram números na tabela: terminais são os códigos dos tokens,
+# não-terminais começam em NONTERMINAL_BASE e ações em ACTION_BASE
+NONTERMINAL_BASE = 100
+ACTION_BASE = 200
+
+
+# Gramática compilada: conjuntos FIRST/FOLLOW e tabela de decisão
+class ParseTable(NamedTuple):
+    nonterminals: tuple      # Nomes dos não-terminais (na ordem dos números)
+    first: dict              # Não-terminal -> frozenset de TokenType
+    follow: dict             # Não-terminal -> frozenset de TokenType
+    nullable: frozenset      # Não-terminais que podem ser vazios
+    rows: list               # rows[não-terminal][código do token] -> símbolos a empilhar (ou None)
+    messages: dict           # Número do símbolo -> mensagem de erro
+
+    # Número de um não-terminal (ex: para começar a análise por ele)
+    def symbol(self, name: str) -> int:
+        return NONTERMINAL_BASE + self.nonterminals.index(name)
+
+
+# Compila a gramática: calcula FIRST e FOLLOW e monta a tabela de decisão
+def compile_grammar(grammar=GRAMMAR, start: str = START_SYMBOL,
+                    messages: Optional[dict] = None) -> ParseTable:
+    """Monta a tabela LL(1) (lança ValueError se a gramática tem conflito)"""
+    messages = EXPECTED_MESSAGES if messages is None else messages
+    # Não-terminais na ordem em que aparecem
+    nonterminals = tuple(dict.fromkeys(name for name, _ in grammar))
+    # Só terminais e não-terminais (as ações não consomem tokens)
+    def symbols(body):
+        return [symbol for symbol in body if not isinstance(symbol, GrammarAction)]
+
+    # FIRST e "pode ser vazio": repete até nenhum conjunto mudar
+    first = {name: set() for name in nonterminals}
+    nullable = set()
+    changed = True
+    while changed:
+        changed = False
+        for name, body in grammar:
+            before = (len(first[name]), name in nullable)
+            for symbol in symbols(body):
+                if isinstance(symbol, TokenType):
+                    first[name].add(symbol)
+                    break
+                first[name] |= first[symbol]
+                if symbol not in nullable:
+                    break
+            else:
+                nullable.add(name)
+            changed |= before != (len(first[name]), name in nullable)
+
+    # FIRST de uma sequência de símbolos (e se ela pode ser vazia)
+    def sequence_first(sequence) -> tuple:
+        result = set()
+        for symbol in sequence:
+            if isinstance(symbol, TokenType):
+                result.add(symbol)
+                return result, False
+            result |= first[symbol]
+            if symbol not in nullable:
+                return result, False
+        return result, True
+
+    # FOLLOW: o que pode vir depois de cada não-terminal
+    follow = {name: set() for name in nonterminals}
+    follow[start].add(TokenType.EOF)
+    changed = True
+    while changed:
+        changed = False
+        for name, body in grammar:
+            body = symbols(body)
+            for position, symbol in enumerate(body):
+                if isinstance(symbol, TokenType):
+                    continue
+                before = len(follow[symbol])
+                rest_first, rest_nullable = sequence_first(body[position + 1:])
+                follow[symbol] |= rest_first
+                if rest_nullable:
+                    follow[symbol] |= follow[name]
+                changed |= before != len(follow[symbol])
+
+    # Número de cada símbolo na tabela
+    def encode(symbol) -> int:
+        if isinstance(symbol, TokenType):
+            return TOKEN_CODES[symbol]
+        if isinstance(symbol, GrammarAction):
+            return ACTION_BASE + ACTION_CODES[symbol]
+        return NONTERMINAL_BASE + nonterminals.index(symbol)
+
+    # Tabela: para cada não-terminal, uma linha com uma entrada por código de token
+    rows = [[None] * len(TOKEN_TYPES) for _ in nonterminals]
+    empty_rules = {}
+    for name, body in grammar:
+        row = rows[nonterminals.index(name)]
+        # Os símbolos entram na pilha ao contrário (o primeiro sai primeiro)
+        stacked = tuple(encode(symbol) for symbol in reversed(body))
+        body_first, body_nullable = sequence_first(symbols(body))
+        for token_type in body_first:
+            code = TOKEN_CODES[token_type]
+            if row[code] is not None:
+                raise ValueError(f"Gramática não é LL(1): {name} tem duas regras para {token_type.name}")
+            row[code] = stacked
+        if body_nullable:
+            if name in empty_rules:
+                raise ValueError(f"Gramática não é LL(1): {name} tem duas regras vazias")
+            empty_rules[name] = stacked
+    # A regra vazia fica com todos os tokens que nenhuma outra regra usa
+    # (inclusive os do FOLLOW que outra regra já usa: ver "else pendente")
+    for name, stacked in empty_rules.items():
+        row = rows[nonterminals.index(name)]
+        for code, entry in enumerate(row):
+            if entry is None:
+                row[code] = stacked
+
+    # Mensagem padrão para os símbolos sem mensagem própria
+    all_messages = {}
+    for name, body in grammar:
+        for symbol in (name, *symbols(body)):
+            if isinstance(symbol, TokenType):
+                lexeme = FIXED_LEXEMES[TOKEN_CODES[symbol]]
+                default = f"Esperado '{lexeme}'" if lexeme is not None else f"Esperado {symbol.name}"
+            else:
+                default = f"{symbol} esperado"
+            all_messages[encode(symbol)] = messages.get(symbol, default)
+
+    return ParseTable(
+        nonterminals=nonterminals,
+        first={name: frozenset(first[name]) for name in nonterminals},
+        follow={name: frozenset(follow[name]) for name in nonterminals},
+        nullable=frozenset(nullable),
+        rows=rows,
+        messages=all_messages,
+    )
+
+
+# Gramática da linguagem compilada (feito uma vez, na carga do programa)
+PARSE_TABLE = compile_grammar()
+# Número do não-terminal de uma declaração de nível superior
+STATEMENT_SYMBOL = PARSE_TABLE.symbol("DECLARACAO")
+
+# Tokens onde a recuperação de erros recomeça a análise: os que começam uma
+# declaração e não aparecem no meio de uma (o identificador também começa
+# uma atribuição, mas aparece nas expressões). Ela também recomeça logo
+# depois de um ')'.
+RECOVERY_TOKENS = (TokenType.INT, TokenType.FLOAT, TokenType.PRINT, TokenType.IF)
+# Encontra, nos códigos dos tokens (TokenBuffer.types), a próxima posição
+# onde a recuperação pode parar: um token de RECOVERY_TOKENS ou o token
+# depois de um ')' (o lookbehind casa vazio nessa posição)
+RECOVERY_PATTERN = re.compile(
+    b"[" + b"".join(re.escape(bytes([TOKEN_CODES[token_type]])) for token_type in RECOVERY_TOKENS)
+    + b"]|(?<=" + re.escape(bytes([TOKEN_CODES[TokenType.RPAREN]])) + b")")
+
+
+# ============================================================================
+# PARSER (ANALISADOR SINTÁTICO)
+# ============================================================================
+# Responsável por verificar se o código está escrito corretamente
+# Usa os tokens do Scanner para verificar se seguem as regras da gramática
+# Exemplo: verifica se "int x = 10" está correto (tipo, nome, =, valor)
+# Cada declaração é reconhecida executando a tabela LL(1) (PARSE_TABLE) com
+# uma pilha explícita; as ações da gramática montam a árvore e verificam as
+# variáveis.
+# Erros não usam exceções: o erro é guardado em self.errors e a declaração
+# termina devolvendo None. A recuperação pula direto para o próximo ponto
+# seguro, procurado com RECOVERY_PATTERN no vetor de tipos dos tokens.
+# Com max_errors, a análise para quando o limite de erros é atingido (ex:
+# max_errors=1 para no primeiro erro), e um arquivo cheio de lixo é
+# rejeitado sem ser analisado até o fim.
+# ============================================================================
+class Parser:
+    # Construtor do Parser - recebe um Scanner
+    # (build_tree=True: monta também a árvore sintática em self.tree)
+    # (symbols: tabela de símbolos já existente, ex: a do modo interativo)
+    # (max_errors: para a análise depois de tantos erros; None = sem limite)
+    def __init__(self, scanner: Scanner, build_tree: bool = False,
+                 symbols: Optional[SymbolTable] = None, max_errors: Optional[int] = None) -> None:
+        # Guarda a referência do scanner
+        self.scanner = scanner
+        # Lê todos os tokens de uma vez para um buffer compacto (vetores),
+        # em vez de uma lista com um objeto Token por token
+        self.tokens: TokenBuffer = TokenBuffer.from_scanner(scanner)
+        # Inicializa o índice do token atual em 0 (primeiro token)
+        self.current = 0
+        # Inicializa a lista de erros sintáticos (começa vazia)
+        self.errors: list[SyntaxError] = []
+        # Tabela de símbolos e erros semânticos (verificados no mesmo passo)
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.semantic_errors: list[SemanticError] = []
+        # Árvore sintática (None se não foi pedida)
+        self.tree: Optional[SyntaxTree] = SyntaxTree(self.tokens, self.symbols) if build_tree else None
+        # Limite de erros e se a análise parou nele antes do fim dos tokens
+        self.max_errors = max_errors
+        self.stopped = False
+
+    # Método de classe que cria um Parser sobre tokens já lidos (sem scanner)
+    # Útil quando os tokens já foram usados em outra fase (ex: CompilationUnit)
+    @classmethod
+    def from_tokens(cls, tokens: TokenBuffer, build_tree: bool = False,
+                    symbols: Optional[SymbolTable] = None, max_errors: Optional[int] = None) -> 'Parser':
+        # Cria uma nova instância sem chamar __init__ (não lê o scanner de novo)
+        parser = cls.__new__(cls)
+        # Não há scanner: os tokens vieram prontos
+        parser.scanner = None
+        # Usa o buffer recebido
+        parser.tokens = tokens
+        # Inicializa o índice do token atual em 0 (primeiro token)
+        parser.current = 0
+        # Inicializa a lista de erros sintáticos (começa vazia)
+        parser.errors = []
+        # Tabela de símbolos e erros semânticos (verificados no mesmo passo)
+        parser.symbols = symbols if symbols is not None else SymbolTable()
+        parser.semantic_errors = []
+        # Árvore sintática (None se não foi pedida)
+        parser.tree = SyntaxTree(tokens, parser.symbols) if build_tree else None
+        # Limite de erros (como no construtor)
+        parser.max_errors = max_errors
+        parser.stopped = False
+        # Retorna o parser criado
+        return parser
+
+    # Método principal que analisa todo o programa sintaticamente
+    def parse(self) -> bool:
+        """Analisa o programa sintaticamente"""
+        # Percorre todos os erros (eles ficam guardados em self.errors)
+        for _ in self.iter_errors():
+            pass
+        # Retorna True se não há erros, False se há erros
+        return len(self.errors) == 0
+
+    # Analisa o programa devolvendo cada erro assim que ele é encontrado
+    def iter_errors(self) -> Iterator[SyntaxError]:
+        """Analisa o programa e gera os erros sintáticos à medida que aparecem"""
+        # Enquanto não chegou ao fim dos tokens
+        while not self._is_at_end():
+            # Analisa a próxima declaração e entrega os erros novos dela
+            yield from self.parse_statement()
+            # Limite de erros atingido: o resto dos tokens não é analisado
+            if self._limit_reached():
+                self.stopped = not self._is_at_end()
+                return
+
+    # Verifica se o limite de erros foi atingido (conta os erros que serão
+    # mostrados: os sintáticos ou, se não há nenhum, os semânticos)
+    def _limit_reached(self) -> bool:
+        if self.max_errors is None:
+            return False
+        # Uma declaração pode ter vários erros semânticos: fica só o limite
+        del self.semantic_errors[self.max_errors:]
+        return (len(self.errors) or len(self.semantic_errors)) >= self.max_errors
+
+    # Analisa uma única declaração de nível superior, a partir do token atual
+    def parse_statement(self) -> list[SyntaxError]:
+        """Analisa uma declaração (com recuperação) e retorna os erros novos"""
+        # Quantos erros já tinham sido encontrados antes desta declaração
+        reported = len(self.errors)
+        # Token onde a declaração começa
+        start = self.current
+        # Quantos nós a árvore tinha antes desta declaração
+        size = len(self.tree) if self.tree is not None else 0
+        # Quantas variáveis e erros semânticos havia antes dela
+        symbol_count = len(self.symbols)
+        semantic_count = len(self.semantic_errors)
+        # Tenta analisar uma declaração (None: ela tem um erro, já guardado)
+        node = self._run(STATEMENT_SYMBOL)
+        if node is not None:
+            # Se está montando a árvore, liga a declaração à raiz
+            if self.tree is not None:
+                self.tree.add_statement(node)
+        else:
+            # Descarta os nós da declaração com erro
+            if self.tree is not None:
+                self.tree.truncate(size)
+            # Descarta as variáveis e os erros semânticos dela (o erro
+            # sintático já basta, e a declaração não vale)
+            self.symbols.truncate(symbol_count)
+            del self.semantic_errors[semantic_count:]
+            # Se deu erro, tenta recuperar avançando até a próxima declaração
+            # Isso permite encontrar múltiplos erros em vez de parar no primeiro
+            self._synchronize()
+            # Se a recuperação parou no mesmo token (ex: ')' logo depois de
+            # outro ')'), pula esse token para a análise não ficar presa nele
+            if self.current == start:
+                self._advance()
+        # Retorna os erros novos desta declaração
+        return self.errors[reported:]
+    
+    # Método de recuperação de erros - avança até encontrar um ponto seguro
+    # (o início de uma declaração, ou logo depois de um ')')
+    def _synchronize(self) -> None:
+        """Recupera de erros sintáticos pulando para a próxima declaração"""
+        # Busca o próximo ponto seguro direto nos códigos dos tokens, a partir
+        # do token atual (a busca é feita em C, sem testar token por token)
+        match = RECOVERY_PATTERN.search(self.tokens.types, self.current)
+        # Nenhum ponto seguro adiante: vai para o fim dos tokens
+        self.current = match.start() if match is not None else len(self.tokens)
+
+    # Analisa um não-terminal executando a tabela LL(1) com uma pilha
+    # explícita (sem recursão) e retorna o nó criado (None se houve erro)
+    def _run(self, start: int) -> Optional[int]:
+        """Reconhece um não-terminal (ex: STATEMENT_SYMBOL) a partir do token atual"""
+        rows = PARSE_TABLE.rows
+        actions = self._actions
+        # Códigos dos tipos dos tokens (lidos direto do vetor, sem criar Tokens)
+        codes, count = self._token_codes()
+        # Símbolos que ainda faltam reconhecer (o topo é o próximo)
+        stack = [start]
+        pop = stack.pop
+        expand = stack.extend
+        # Valores das ações (nós criados e tokens guardados)
+        values: list = []
+        current = self.current
+        code = codes[current] if current < count else EOF_CODE
+        try:
+            while stack:
+                symbol = pop()
+                if symbol < NONTERMINAL_BASE:
+                    # Terminal: o token atual precisa ser deste tipo
+                    if symbol != code:
+                        self.current = current
+                        self._expected(symbol)
+                        return None
+                    current += 1
+                    code = codes[current] if current < count else EOF_CODE
+                elif symbol < ACTION_BASE:
+                    # Não-terminal: a tabela diz qual regra usar com este token
+                    body = rows[symbol - NONTERMINAL_BASE][code]
+                    if body is None:
+                        self.current = current
+                        self._expected(symbol)
+                        return None
+                    expand(body)
+                else:
+                    # Ação: recebe o número do último token consumido
+                    actions[symbol - ACTION_BASE](self, current - 1, values)
+        finally:
+            # Guarda a posição alcançada (também se o scanner parar a análise
+            # com um erro léxico no meio da declaração)
+            self.current = current
+        return values.pop()
+
+    # Retorna os códigos dos tipos dos tokens e quantos tokens há
+    def _token_codes(self) -> tuple:
+        return self.tokens.types, len(self.tokens)
+
+    # Registra o erro de um símbolo não reconhecido no token atual
+    # (quem chama para a análise da declaração)
+    def _expected(self, symbol: int) -> None:
+        # Pega o token atual para reportar o erro
+        token = self._peek()
+        message = PARSE_TABLE.messages[symbol]
+        # Registra o erro (ex: "Esperado ')', encontrado: 'x'")
+        self._error(f"{message}, encontrado: '{token.lexeme}'", token)
+
+    # ========================================================================
+    # AÇÕES DA GRAMÁTICA
+    # ========================================================================
+    # Cada ação recebe o número do último token consumido e a pilha de
+    # valores (nós e dados guardados pelas ações anteriores da mesma regra).
+    # Os lexemas são lidos na hora (o parser em fluxo só guarda o token
+    # anterior e o atual).
+    # ========================================================================
+    def _action_mark(self, index: int, values: list) -> None:
+        values.append(index)
+
+    def _action_number(self, index: int, values: list) -> None:
+        values.append(self._node(NodeKind.NUMBER, index))
+
+    # Uso de variável: resolve o nome para o slot (erro se não existe)
+    def _action_variable(self, index: int, values: list) -> None:
+        text = self._lexeme(index)
+        slot = self.symbols.lookup(text)
+        if slot < 0:
+            self._semantic_error(f"Variável '{text}' usada antes de ser declarada", index)
+        values.append(self._node(NodeKind.IDENTIFIER, index, slot=slot))
+
+    def _action_binary(self, index: int, values: list) -> None:
+        right = values.pop()
+        operator = values.pop()
+        left = values.pop()
+        values.append(self._node(NodeKind.BINARY, operator, left, right))
+
+    def _action_type(self, index: int, values: list) -> None:
+        values.append(index)
+        values.append(self._lexeme(index))
+
+    # Nome de uma declaração: erro se a variável já existe (a variável só é
+    # criada depois do valor, que não pode usá-la)
+    def _action_declared_name(self, index: int, values: list) -> None:
+        values.append(self._node(NodeKind.IDENTIFIER, index))
+        text = self._lexeme(index)
+        slot = self.symbols.lookup(text)
+        if slot >= 0:
+            self._semantic_error(f"Variável '{text}' já declarada", index)
+        values.append(text)
+        values.append(slot)
+
+    def _action_assigned_name(self, index: int, values: list) -> None:
+        values.append(self._node(NodeKind.IDENTIFIER, index))
+        values.append(self._lexeme(index))
+
+    def _action_var_decl(self, index: int, values: list) -> None:
+        value = values.pop()
+        slot = values.pop()
+        text = values.pop()
+        name = values.pop()
+        type_name = values.pop()
+        type_token = values.pop()
+        if slot < 0:
+            slot = self.symbols.declare(text, type_name)
+        self._resolve(name, slot)
+        values.append(self._node(NodeKind.VAR_DECL, type_token, name, value))
+
+    # Atribuição: um nome novo cria a variável (sem tipo declarado)
+    def _action_assign(self, index: int, values: list) -> None:
+        value = values.pop()
+        assign_token = values.pop()
+        text = values.pop()
+        name = values.pop()
+        slot = self.symbols.lookup(text)
+        if slot < 0:
+            slot = self.symbols.declare(text, None)
+        self._resolve(name, slot)
+        values.append(self._node(NodeKind.ASSIGN, assign_token, name, value))
+
+    def _action_print(self, index: int, values: list) -> None:
+        value = values.pop()
+        values.append(self._node(NodeKind.PRINT, values.pop(), value))
+
+    def _action_if(self, index: int, values: list) -> None:
+        then_branch = values.pop()
+        condition = values.pop()
+        values.append(self._node(NodeKind.IF, values.pop(), condition, then_branch))
+
+    def _action_if_else(self, index: int, values: list) -> None:
+        else_branch = values.pop()
+        then_branch = values.pop()
+        condition = values.pop()
+        values.append(self._node(NodeKind.IF, values.pop(), condition, then_branch, else_branch))
+
+    # Ação de cada GrammarAction (na mesma ordem do enum)
+    _actions = (_action_mark, _action_number, _action_variable, _action_binary, _action_type,
+                _action_declared_name, _action_assigned_name, _action_var_decl, _action_assign,
+                _action_print, _action_if, _action_if_else)
+
+    # Cria um nó da árvore sintática (retorna -1 se a árvore não foi pedida)
+    def _node(self, kind: NodeKind, token: int, *children: int, slot: int = -1) -> int:
+        """Cria um nó com o token que o originou e os filhos, em ordem"""
+        # Sem árvore, a análise só valida (nenhum nó é criado)
+        if self.tree is None:
+            return -1
+        return self.tree.add(kind, token, children, slot)
+
+    # Guarda o slot de um nó IDENTIFIER já criado (nome de declaração/atribuição)
+    def _resolve(self, node: int, slot: int) -> None:
+        if node >= 0:
+            self.tree.slots[node] = slot
+
+    # Retorna o lexema do token 'index' (ele ainda precisa estar disponível)
+    def _lexeme(self, index: int) -> str:
+        return self.tokens.lexeme(index)
+
+    # Registra um erro semântico no token 'index' (a análise continua)
+    def _semantic_error(self, message: str, index: int) -> None:
+        token = self.tokens[index]
+        self.semantic_errors.append(SemanticError(message, token.line, token.column))
+
+    # Avança para o próximo token
+    def _advance(self) -> None:
+        """Avança para o próximo token"""
+        # Se não chegou ao fim
+        if not self._is_at_end():
+            # Incrementa o índice do token atual
+            self.current += 1
+
+    # Verifica se chegou ao fim da lista de tokens
+    def _is_at_end(self) -> bool:
+        """Verifica se chegou ao fim"""
+        # Retorna True se o índice atual é maior ou igual ao número de tokens
+        return self.current >= len(self.tokens)
+
+    # Retorna o token atual sem avançar (não consome o token)
+    def _peek(self) -> Token:
+        """Retorna o token atual"""
+        # Se chegou ao fim, retorna um token EOF (End Of File)
+        if self._is_at_end():
+            return Token(TokenType.EOF, "", 0, 0)
+        # Senão, retorna o token na posição atual (montado a partir do buffer)
+        return self.tokens[self.current]
+
+    # Registra um erro sintático na lista de erros
+    def _error(self, message: str, token: Token) -> None:
+        """Registra um erro sintático"""
+        # Número do token com erro (o token é sempre o atual; EOF não tem número)
+        index = None if token.type == TokenType.EOF else self.current
+        # Cria uma exceção SyntaxError com a mensagem e posição
+        error = SyntaxError(message, token.line, token.column, index)
+        # Adiciona o erro na lista de erros
+        self.errors.append(error)
+        # Não levanta exceção: a declaração com erro termina em _run (que
+        # devolve None) e a análise continua depois da recuperação
+
+    def get_errors(self) -> list[SyntaxError]:
+        """Retorna a lista de erros sintáticos"""
+        return self.errors
+
+
+# ============================================================================
+# PARSER EM FLUXO
+# ============================================================================
+# Mesmo parser, mas os tokens são lidos do scanner só quando a análise
+# chega neles (através de uma TokenWindow), em vez de todos de uma vez.
+# - A memória não depende do tamanho do arquivo (só da profundidade de
+#   parênteses e ifs aninhados, que é o tamanho da pilha do parser)
+# - O primeiro erro aparece assim que o scanner chega nele
+# Erros léxicos aparecem durante parse(), quando o scanner chega neles.
+# ============================================================================
+class StreamingParser(Parser):
+    # Construtor - recebe um Scanner (de qualquer motor)
+    # (na árvore, os nós guardam o número do token, mas os lexemas não
+    # ficam disponíveis: os tokens não são guardados)
+    def __init__(self, scanner: Scanner, build_tree: bool = False,
+                 symbols: Optional[SymbolTable] = None, max_errors: Optional[int] = None) -> None:
+        # Guarda a referência do scanner
+        self.scanner = scanner
+        # Janela com o token anterior e o atual (lidos sob demanda)
+        self.tokens: TokenWindow = TokenWindow(scanner)
+        # Inicializa o índice do token atual em 0 (primeiro token)
+        self.current = 0
+        # Inicializa a lista de erros sintáticos (começa vazia)
+        self.errors: list[SyntaxError] = []
+        # Tabela de símbolos e erros semânticos (a tabela cresce com o
+        # número de variáveis, não com o tamanho do arquivo)
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.semantic_errors: list[SemanticError] = []
+        # Árvore sintática (None se não foi pedida)
+        self.tree: Optional[SyntaxTree] = SyntaxTree(None, self.symbols) if build_tree else None
+        # Limite de erros (com ele, o resto do arquivo nem chega a ser lido)
+        self.max_errors = max_errors
+        self.stopped = False
+
+    # Retorna o lexema do token 'index' (lido da janela)
+    def _lexeme(self, index: int) -> str:
+        return self.tokens[index].lexeme
+
+    # Verifica se chegou ao fim dos tokens (lendo o token atual, se preciso)
+    def _is_at_end(self) -> bool:
+        """Verifica se chegou ao fim"""
+        return self.tokens.at_end(self.current)
+
+    # Retorna os códigos dos tipos dos tokens, lidos sob demanda (o número
+    # de tokens não é conhecido antes do fim: WindowCodes já devolve EOF)
+    def _token_codes(self) -> tuple:
+        return WindowCodes(self.tokens), sys.maxsize
+
+    # Recuperação de erros sem índice (os tokens não ficam guardados):
+    # avança token por token até um ponto seguro
+    def _synchronize(self) -> None:
+        """Recupera de erros sintáticos avançando até a próxima declaração"""
+        tokens = self.tokens
+        # Tipo do token anterior (None antes do primeiro token)
+        previous = tokens.type_at(self.current - 1)
+        while not tokens.at_end(self.current):
+            token_type = tokens.type_at(self.current)
+            # Logo depois de um ')' ou no início de uma declaração: para
+            if previous is TokenType.RPAREN or token_type in RECOVERY_TOKENS:
+                return
+            previous = token_type
+            self.current += 1
+
+
+# ============================================================================
+# MÉTRICAS (TEMPO POR FASE E CONTADORES)
+# ============================================================================
+# Mede onde o tempo de uma análise é gasto, para acompanhar execuções em
+# produção (ex: o modo lote rodando num servidor de integração contínua):
+# - Tempo real (wall) e de CPU de cada fase: leitura do arquivo ("read"),
+#   varredura ("lex"), análise sintática ("parse"), saída ("report"), ...
+#   O tempo de uma fase não inclui o das fases que rodam dentro dela (ex: a
+#   varredura feita no meio da impressão conta como "lex", não "report")
+# - Contadores: arquivos, bytes, tokens por tipo e erros por tipo
+# O resultado sai em JSON ou no formato de texto do Prometheus.
+# Desligadas (NULL_METRICS, o padrão), as métricas não medem nada: cada fase
+# custa só a entrada num contexto vazio.
+# ============================================================================
+# Nome de cada fase da CompilationUnit nas métricas
+METRIC_PHASES = {
+    "summary": "read",
+    "tokens": "lex",
+    "parse": "parse",
+    "syntax_tree": "parse",
+    "cache_entry": "cache",
+    "types": "types",
+    "optimization": "optimize",
+    "bytecode": "compile",
+    "optimized_bytecode": "compile",
+}
+
+# Formatos de saída das métricas
+METRIC_FORMATS = ("json", "prometheus")
+
+
+class Metrics:
+    # Métricas ligadas
+    enabled = True
+
+    # Construtor - começa sem nada medido
+    def __init__(self) -> None:
+        # Tempo real e de CPU de cada fase (segundos)
+        self.wall_seconds: Counter = Counter()
+        self.cpu_seconds: Counter = Counter()
+        # Totais: arquivos e bytes lidos
+        self.totals: Counter = Counter()
+        # Tokens por tipo (nome do TokenType) e erros por tipo
+        self.token_types: Counter = Counter()
+        self.errors: Counter = Counter()
+        # Tempo das fases internas de cada fase aberta: [wall, cpu]
+        self._open: list[list] = []
+
+    # Mede uma fase (uso: with metrics.phase("lex"): ...)
+    @contextmanager
+    def phase(self, name: str):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        self._open.append([0.0, 0.0])
+        try:
+            yield
+        finally:
+            inner_wall, inner_cpu = self._open.pop()
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            # A fase fica só com o próprio tempo (sem o das fases internas)
+            self.wall_seconds[name] += wall - inner_wall
+            self.cpu_seconds[name] += cpu - inner_cpu
+            # E o tempo total dela não conta para a fase que a contém
+            if self._open:
+                self._open[-1][0] += wall
+                self._open[-1][1] += cpu
+
+    # Soma uma quantidade a um total (ex: "files", "bytes")
+    def count(self, name: str, amount: int = 1) -> None:
+        self.totals[name] += amount
+
+    # Soma a contagem de tokens por tipo (a mesma das estatísticas)
+    def count_tokens(self, counts: Counter) -> None:
+        for token_type, count in counts.items():
+            self.token_types[token_type.name] += count
+
+    # Soma erros de um tipo ("lexical", "syntax", "semantic", "type_warning", "read")
+    def count_errors(self, kind: str, amount: int = 1) -> None:
+        if amount:
+            self.errors[kind] += amount
+
+    # Soma as métricas de outra execução (ex: um processo do modo lote)
+    def merge(self, other: 'Metrics') -> None:
+        self.wall_seconds.update(other.wall_seconds)
+        self.cpu_seconds.update(other.cpu_seconds)
+        self.totals.update(other.totals)
+        self.token_types.update(other.token_types)
+        self.errors.update(other.errors)
+
+    # Retorna as métricas num dicionário (para o JSON)
+    def to_dict(self) -> dict:
+        return {
+            "phases": {name: {"wall_seconds": self.wall_seconds[name], "cpu_seconds": self.cpu_seconds[name]}
+                       for name in self.wall_seconds},
+            "files": self.totals["files"],
+            "bytes": self.totals["bytes"],
+            "tokens": sum(self.token_types.values()),
+            "tokens_by_type": dict(self.token_types),
+            "errors": dict(self.errors),
+        }
+
+    # Retorna as métricas em JSON
+    def to_json(self) -> str:
+        import json
+        return json.dumps(self.to_dict(), indent=2)
+
+    # Retorna as métricas no formato de texto do Prometheus
+    def to_prometheus(self) -> str:
+        lines = []
+
+        # Acrescenta uma métrica (com um valor por rótulo, se houver rótulo)
+        def metric(name: str, description: str, values, label: Optional[str] = None) -> None:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            if label is None:
+                lines.append(f"{name} {values}")
+                return
+            for key, value in sorted(values.items()):
+                lines.append(f'{name}{{{label}="{key}"}} {value}')
+
+        metric("compiler_phase_wall_seconds_total", "Tempo real gasto em cada fase", self.wall_seconds, "phase")
+        metric("compiler_phase_cpu_seconds_total", "Tempo de CPU gasto em cada fase", self.cpu_seconds, "phase")
+        metric("compiler_files_total", "Arquivos analisados", self.totals["files"])
+        metric("compiler_bytes_total", "Bytes lidos", self.totals["bytes"])
+        metric("compiler_tokens_total", "Tokens encontrados, por tipo", self.token_types, "type")
+        metric("compiler_errors_total", "Erros encontrados, por tipo", self.errors, "kind")
+        return "\n".join(lines) + "\n"
+
+    # Retorna as métricas no formato pedido ("json" ou "prometheus")
+    def render(self, format_name: str) -> str:
+        return self.to_json() + "\n" if format_name == "json" else self.to_prometheus()
+
+
+# Métricas desligadas: nada é medido nem contado
+class NullMetrics(Metrics):
+    enabled = False
+
+    # Não guarda nada (todas as operações são vazias)
+    def __init__(self) -> None:
+        pass
+
+    # Contexto vazio (reaproveitado: não cria nada a cada fase)
+    def phase(self, name: str):
+        return NULL_PHASE
+
+    def count(self, name: str, amount: int = 1) -> None:
+        pass
+
+    def count_tokens(self, counts: Counter) -> None:
+        pass
+
+    def count_errors(self, kind: str, amount: int = 1) -> None:
+        pass
+
+    def merge(self, other: 'Metrics') -> None:
+        pass
+
+
+# Contexto vazio das métricas desligadas
+NULL_PHASE = nullcontext()
+# Métricas desligadas (o padrão)
+NULL_METRICS = NullMetrics()
+
+
+# ============================================================================
+# CACHE DE ANÁLISE (EM DISCO)
+# ============================================================================
+# Guarda o resultado da análise de cada arquivo numa pasta (como o
+# __pycache__ do Python): os tokens, os erros (léxico, sintáticos e
+# semânticos), as variáveis e, se já foi montada, a árvore sintática.
+# Um arquivo que não mudou é analisado de novo sem Scanner nem Parser.
+# - Chave: hash dos bytes do arquivo + motor + versão do compilador (o hash
+#   do próprio main.py: qualquer mudança no compilador invalida o cache)
+# - Cada entrada é gravada num arquivo temporário e renomeada (os.replace é
+#   atômico): vários processos podem usar a mesma pasta ao mesmo tempo, e
+#   ninguém lê uma entrada pela metade
+# - Tamanho limitado: quando a pasta passa do limite, as entradas usadas há
+#   mais tempo são apagadas (LRU pela data de modificação, atualizada a cada
+#   uso da entrada)
+# - Formato só de dados (nada de pickle: a pasta pode ser compartilhada, e
+#   ler uma entrada nunca executa código): marca + cabeçalho JSON (versão,
+#   erros, variáveis, tamanho dos vetores) + bytes dos vetores. Uma entrada
+#   que não confere (outra versão, truncada, de outro programa) é tratada
+#   como ausente
+# ============================================================================
+# Pasta padrão do cache (na pasta atual)
+DEFAULT_CACHE_DIRECTORY = ".mccache"
+# Tamanho máximo padrão da pasta do cache (bytes)
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Ao passar do limite, apaga entradas até a pasta ficar com esta fração dele
+CACHE_EVICTION_TARGET = 0.9
+# Extensão dos arquivos das entradas
+CACHE_SUFFIX = ".analysis"
+# Marca do início de cada entrada (muda junto com o formato)
+CACHE_MAGIC = b"MCCACHE1"
+# Vetores de cada grupo da entrada (tipo de cada vetor, na ordem gravada)
+CACHE_ARRAYS = {"tokens": "BII", "tree": "Biiii"}
+
+
+# Versão do compilador: hash do código deste arquivo (qualquer mudança no
+# compilador muda a versão)
+def compiler_version() -> bytes:
+    import hashlib
+    return hashlib.blake2b(Path(__file__).read_bytes(), digest_size=16).digest()
+
+
+class AnalysisCache:
+    # Construtor - recebe a pasta do cache e o tamanho máximo (bytes)
+    def __init__(self, directory=DEFAULT_CACHE_DIRECTORY, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        # Pasta das entradas (criada na primeira gravação)
+        self.directory = Path(directory)
+        # Tamanho máximo da pasta
+        self.max_bytes = max_bytes
+        # Versão do compilador (hash do código deste arquivo)
+        self.version = compiler_version()
+        # Tamanho estimado da pasta (None: ainda não medido)
+        self._size: Optional[int] = None
+        # Estatísticas de uso
+        self.hits = 0
+        self.misses = 0
+
+    # Calcula a chave de um código (bytes, ou mmap) analisado com um motor
+    # (max_errors: limite de erros da análise, que muda o resultado guardado)
+    def key(self, data, engine: str, max_errors: Optional[int] = None) -> str:
+        import hashlib
+        digest = hashlib.blake2b(self.version, digest_size=20)
+        # O motor mmap guarda posições em bytes, os outros em caracteres
+        digest.update(engine.encode("ascii"))
+        digest.update(str(max_errors).encode("ascii"))
+        digest.update(data)
+        return digest.hexdigest()
+
+    # Caminho do arquivo de uma entrada
+    def _path(self, key: str) -> Path:
+        return self.directory / (key + CACHE_SUFFIX)
+
+    # Lê uma entrada (None se não existe ou não pôde ser lida)
+    def load(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            entry = decode_entry(path.read_bytes(), self.version)
+            # Marca a entrada como usada agora (para o LRU)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # Entrada corrompida, de outra versão ou apagada por outro
+            # processo no meio da leitura: é tratada como ausente (e
+            # regravada depois)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    # Grava uma entrada (substitui a anterior com a mesma chave)
+    def store(self, key: str, entry: dict) -> None:
+        import tempfile
+        data = encode_entry(entry, self.version)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Grava num temporário da mesma pasta e renomeia de uma vez
+            handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(handle, "wb") as f:
+                    f.write(data)
+                os.replace(temporary, self._path(key))
+            except BaseException:
+                os.unlink(temporary)
+                raise
+        except OSError:
+            # Sem permissão ou sem espaço: a análise continua sem cache
+            return
+        # Atualiza o tamanho estimado e, se passou do limite, libera espaço
+        if self._size is None:
+            self._size = self._measure()
+        else:
+            self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    # Lista as entradas da pasta: (data do último uso, tamanho, caminho)
+    def _entries(self) -> list[tuple]:
+        entries = []
+        for path in self.directory.glob("*" + CACHE_SUFFIX):
+            try:
+                info = path.stat()
+            except OSError:
+                # Apagada por outro processo durante a listagem
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+        return entries
+
+    # Mede o tamanho da pasta (soma das entradas)
+    def _measure(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    # Apaga as entradas usadas há mais tempo até a pasta ficar abaixo do limite
+    def evict(self) -> int:
+        """Aplica o limite de tamanho e retorna quantas entradas foram apagadas"""
+        entries = sorted(self._entries())
+        size = sum(size for _, size, _ in entries)
+        target = self.max_bytes * CACHE_EVICTION_TARGET
+        removed = 0
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                # Outro processo já apagou (ou está usando, no Windows)
+                pass
+            size -= entry_size
+        self._size = size
+        return removed
+
+    # Apaga todas as entradas
+    def clear(self) -> None:
+        for _, _, path in self._entries():
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        self._size = 0
+
+
+# Caches já abertos neste processo, por pasta (cada processo do modo lote
+# abre a pasta uma vez só, e não uma vez por grupo de arquivos)
+_OPEN_CACHES: dict = {}
+
+
+# Retorna o cache de uma pasta (None se não há pasta: cache desligado)
+def open_cache(directory) -> Optional[AnalysisCache]:
+    if directory is None:
+        return None
+    if directory not in _OPEN_CACHES:
+        _OPEN_CACHES[directory] = AnalysisCache(directory)
+    return _OPEN_CACHES[directory]
+
+
+# Monta a entrada do cache a partir do resultado da análise
+# (lexical_error: a varredura parou num erro léxico; parser: None nesse caso)
+def pack_analysis(tokens: Optional[TokenBuffer], parser: Optional[Parser],
+                  lexical_error: Optional[LexicalError] = None) -> dict:
+    entry = {"lexical": None, "tokens": None, "parse": None, "tree": None}
+    if lexical_error is not None:
+        entry["lexical"] = (lexical_error.message, lexical_error.line,
+                            lexical_error.column, lexical_error.offset)
+        return entry
+    # Tokens: só os vetores (os lexemas são recortados do código, que é lido
+    # de qualquer jeito para calcular a chave)
+    entry["tokens"] = (tokens.types, tokens.starts, tokens.lengths)
+    if parser is not None:
+        entry["parse"] = (
+            [(e.message, e.line, e.column, e.index) for e in parser.errors],
+            [(e.message, e.line, e.column) for e in parser.semantic_errors],
+            parser.symbols.names,
+            parser.symbols.types,
+            parser.stopped,
+        )
+        tree = parser.tree
+        if tree is not None:
+            entry["tree"] = (tree.kinds, tree.first_child, tree.next_sibling,
+                             tree.token_index, tree.slots)
+    return entry
+
+
+# Converte uma entrada do cache em bytes (ver o formato no início da seção)
+def encode_entry(entry: dict, version: bytes) -> bytes:
+    import json
+    header = {
+        "version": version.hex(),
+        # Os vetores são gravados na ordem de bytes da máquina
+        "byteorder": sys.byteorder,
+        "lexical": entry["lexical"],
+        "parse": entry["parse"],
+        # Tamanho de cada vetor (None: grupo ausente)
+        "sizes": {group: None if entry[group] is None else [len(vector) for vector in entry[group]]
+                  for group in CACHE_ARRAYS},
+    }
+    head = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    parts = [CACHE_MAGIC, len(head).to_bytes(4, "little"), head]
+    for group in CACHE_ARRAYS:
+        if entry[group] is not None:
+            parts.extend(vector.tobytes() for vector in entry[group])
+    return b"".join(parts)
+
+
+# Lê uma entrada gravada por encode_entry, conferindo a versão e o formato
+# de cada parte (ValueError se a entrada não serve)
+def decode_entry(data: bytes, version: bytes) -> dict:
+    import json
+    if not data.startswith(CACHE_MAGIC):
+        raise ValueError("Entrada sem a marca do cache")
+    position = len(CACHE_MAGIC) + 4
+    head_size = int.from_bytes(data[len(CACHE_MAGIC):position], "little")
+    header = json.loads(data[position:position + head_size])
+    position += head_size
+    if (not isinstance(header, dict) or header.get("version") != version.hex()
+            or header.get("byteorder") != sys.byteorder):
+        raise ValueError("Entrada de outra versão do compilador")
+    entry = {"lexical": header["lexical"], "parse": header["parse"]}
+    # Vetores: cada grupo tem vetores do mesmo tamanho, e os bytes precisam
+    # acabar junto com o último
+    view = memoryview(data)
+    for group, typecodes in CACHE_ARRAYS.items():
+        sizes = header["sizes"][group]
+        if sizes is None:
+            entry[group] = None
+            continue
+        if len(sizes) != len(typecodes) or len(set(sizes)) != 1:
+            raise ValueError(f"Vetores de '{group}' com tamanhos diferentes")
+        vectors = []
+        for typecode, size in zip(typecodes, sizes):
+            vector = array(typecode)
+            end = position + size * vector.itemsize
+            vector.frombytes(view[position:end])
+            if len(vector) != size:
+                raise ValueError("Entrada truncada")
+            vectors.append(vector)
+            position = end
+        entry[group] = tuple(vectors)
+    if position != len(data):
+        raise ValueError("Entrada com bytes sobrando")
+    # Erro léxico (sem tokens) ou tokens (sem erro léxico), nunca os dois
+    lexical = entry["lexical"]
+    if (lexical is None) == (entry["tokens"] is None) or (lexical is not None and len(lexical) != 4):
+        raise ValueError("Entrada com formato inválido")
+    if entry["parse"] is not None:
+        errors, semantic_errors, names, types, stopped = entry["parse"]
+        if (any(len(error) != 4 for error in errors) or any(len(error) != 3 for error in semantic_errors)
+                or len(names) != len(types) or not isinstance(stopped, bool)):
+            raise ValueError("Entrada com formato inválido")
+    return entry
+
+
+# Remonta o buffer de tokens de uma entrada sobre o código fonte
+def unpack_tokens(entry: dict, source) -> TokenBuffer:
+    # Arquivo com erro léxico: lança o mesmo erro da varredura original
+    if entry["lexical"] is not None:
+        raise LexicalError(*entry["lexical"])
+    buffer = TokenBuffer(source)
+    buffer.types, buffer.starts, buffer.lengths = entry["tokens"]
+    return buffer
+
+
+# Remonta um parser já executado a partir de uma entrada
+# (None se a entrada não tem a análise, ou não tem a árvore pedida)
+# (max_errors: o limite usado na análise, que faz parte da chave da entrada)
+def unpack_parser(entry: dict, tokens: TokenBuffer, build_tree: bool = False,
+                  max_errors: Optional[int] = None) -> Optional[Parser]:
+    if entry["parse"] is None or (build_tree and entry["tree"] is None):
+        return None
+    errors, semantic_errors, names, types, stopped = entry["parse"]
+    parser = Parser.from_tokens(tokens, build_tree=build_tree, max_errors=max_errors)
+    # O parser já chegou ao fim dos tokens (ou parou no limite de erros)
+    parser.current = len(tokens)
+    parser.stopped = stopped
+    parser.errors = [SyntaxError(*error) for error in errors]
+    parser.semantic_errors = [SemanticError(*error) for error in semantic_errors]
+    # Tabela de símbolos: mesmos nomes, slots e tipos
+    for name, type_name in zip(names, types):
+        parser.symbols.declare(name, type_name)
+    if build_tree:
+        tree = parser.tree
+        (tree.kinds, tree.first_child, tree.next_sibling,
+         tree.token_index, tree.slots) = entry["tree"]
+    return parser
+
+
+# ============================================================================
+# UNIDADE DE COMPILAÇÃO
+# ============================================================================
+# Guarda o código fonte de uma análise e o resultado de cada fase, para que
+# nenhuma fase precise ler o arquivo ou varrer o código de novo:
+#   summary()   -> (linhas, caracteres) para o resumo da entrada
+#   tokens()    -> TokenBuffer (usado na listagem, nas estatísticas e no parser)
+#   line_index() -> SourceLineIndex do código
+#   parse()     -> Parser já executado (erros sintáticos e semânticos)
+#   syntax_tree() -> SyntaxTree do programa (a mesma análise serve de parse())
+#   types()     -> TypeChecker com o tipo de cada expressão e variável
+#   bytecode()  -> Bytecode compilado a partir da árvore
+# Cada fase é calculada só na primeira vez que é pedida.
+# O arquivo é lido uma única vez (ou mapeado, no motor mmap).
+# Com um AnalysisCache, tokens(), parse() e syntax_tree() vêm do cache
+# quando o arquivo não mudou (e são gravados nele quando são calculados).
+# O tempo de cada fase vai para as métricas da unidade (ver Metrics).
+# ============================================================================
+# Padrão que encontra cada fim de linha em bytes ('\r\n', '\r' ou '\n')
+BYTES_LINE_END_PATTERN = re.compile(rb"\r\n?|\n")
+
+
+class CompilationUnit:
+    # Construtor - recebe o código (texto, ou bytes/mmap no motor mmap)
+    def __init__(self, source, path=None, engine: str = "classico") -> None:
+        # Código fonte da unidade
+        self.source = source
+        # Caminho do arquivo de origem (None para código digitado)
+        self.path = path
+        # Motor de varredura usado ("classico", "regex" ou "mmap")
+        self.engine = engine
+        # Bytes lidos do arquivo, ainda não decodificados (ver from_path)
+        self._data: Optional[bytes] = None
+        # Scanner que mantém o arquivo mapeado (só no motor mmap)
+        self._mapped: Optional[BytesScanner] = None
+        # Resultados já calculados, por fase
+        self._results: dict = {}
+        # Cache de análise e chave deste código nele (ver from_path)
+        self.cache: Optional[AnalysisCache] = None
+        self.cache_key: Optional[str] = None
+        # Métricas onde o tempo das fases é registrado (desligadas por padrão)
+        self.metrics: Metrics = NULL_METRICS
+        # Limite de erros do parser (None = analisa o código inteiro)
+        self.max_errors: Optional[int] = None
+
+    # Método de classe que cria a unidade a partir de um arquivo
+    # (cache: AnalysisCache onde procurar e guardar a análise do arquivo)
+    # (metrics: onde registrar o tempo das fases, os bytes e os tokens)
+    # (max_errors: o parser para depois de tantos erros)
+    @classmethod
+    def from_path(cls, source_path, engine: str = "classico",
+                  cache: Optional[AnalysisCache] = None,
+                  metrics: Metrics = NULL_METRICS,
+                  max_errors: Optional[int] = None) -> 'CompilationUnit':
+        with metrics.phase("read"):
+            unit = cls._read(source_path, engine)
+        # Bytes lidos (ainda não decodificados, ou o arquivo mapeado)
+        data = unit.source if unit._data is None else unit._data
+        unit.metrics = metrics
+        unit.max_errors = max_errors
+        metrics.count("files")
+        metrics.count("bytes", len(data))
+        # Chave do cache calculada sobre os bytes já lidos
+        if cache is not None:
+            unit.cache = cache
+            unit.cache_key = cache.key(data, engine, max_errors)
+        return unit
+
+    # Lê (ou mapeia) o arquivo e cria a unidade
+    @classmethod
+    def _read(cls, source_path, engine: str) -> 'CompilationUnit':
+        # Motor mmap: mapeia o arquivo (os bytes são varridos direto)
+        if engine == "mmap":
+            mapped = BytesScanner(source_path)
+            # Quebras '\r\n' ou '\r': converte para '\n' numa cópia (como o
+            # modo texto faz), para as posições baterem com os outros motores
+            if mapped.source.find(b"\r") != -1:
+                source = bytes(mapped.source).replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+                mapped.close()
+                return cls(source, source_path, engine)
+            unit = cls(mapped.source, source_path, engine)
+            unit._mapped = mapped
+            return unit
+        # Outros motores: lê os bytes uma única vez
+        return cls.from_bytes(Path(source_path).read_bytes(), source_path, engine)
+
+    # Método de classe que cria a unidade a partir dos bytes de um código
+    # (já lidos de um arquivo, ou recebidos pelo daemon)
+    @classmethod
+    def from_bytes(cls, data: bytes, path=None, engine: str = "classico") -> 'CompilationUnit':
+        # Motor mmap: varre os bytes direto (com as quebras convertidas para '\n')
+        if engine == "mmap":
+            if data.find(b"\r") != -1:
+                data = data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            return cls(data, path, engine)
+        # Outros motores: a decodificação fica para quando o texto for usado
+        # (como na leitura original)
+        unit = cls(None, path, engine)
+        unit._data = data
+        return unit
+
+    # Libera o mapeamento do arquivo (se houver)
+    def close(self) -> None:
+        if self._mapped is not None:
+            self._mapped.close()
+
+    # Guarda o resultado de uma fase (calcula só na primeira vez)
+    def _memoize(self, phase: str, compute):
+        # Se a fase ainda não foi calculada, calcula (medindo o tempo) e guarda
+        if phase not in self._results:
+            with self.metrics.phase(METRIC_PHASES.get(phase, phase)):
+                self._results[phase] = compute()
+        # Retorna o resultado guardado
+        return self._results[phase]
+
+    # Retorna o texto do código (decodifica os bytes lidos na primeira vez)
+    def text(self):
+        # Código já disponível (digitado, ou arquivo mapeado)
+        if self._data is None:
+            return self.source
+        # Decodifica como UTF-8 e converte '\r\n' e '\r' em '\n'
+        # (o mesmo que open(..., 'r') faz ao ler um arquivo em modo texto)
+        # A decodificação conta como leitura do arquivo nas métricas
+        with self.metrics.phase("read"):
+            text = self._data.decode("utf-8")
+            if "\r" in text:
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
+        # A partir daqui o texto é o código da unidade (os bytes são liberados)
+        self.source = text
+        self._data = None
+        return text
+
+    # Cria um scanner novo sobre o código da unidade
+    def scanner(self) -> Scanner:
+        source = self.text()
+        # Bytes (arquivo mapeado): varre o buffer direto
+        if not isinstance(source, str):
+            return BytesScanner.from_buffer(source)
+        # Texto: usa o motor escolhido
+        return SCANNER_ENGINES[self.engine].from_string(source)
+
+    # Fase: resumo da entrada (número de linhas e de caracteres)
+    def summary(self) -> tuple:
+        return self._memoize("summary", self._compute_summary)
+
+    # Calcula o resumo da mesma forma que a leitura linha a linha em modo texto
+    def _compute_summary(self) -> tuple:
+        source = self.text()
+        # Texto: '\r' já foi convertido, as linhas terminam em '\n'
+        if isinstance(source, str):
+            line_count = source.count("\n")
+            if source and not source.endswith("\n"):
+                line_count += 1
+            return line_count, len(source)
+        # Bytes (mmap não tem count: as contagens usam regex):
+        # '\r\n', '\r' e '\n' terminam uma linha; '\r\n' conta como um
+        # caractere só, e os bytes de continuação UTF-8 não contam
+        line_ends = BYTES_LINE_END_PATTERN.findall(source)
+        line_count = len(line_ends)
+        if len(source) and source[-1:] not in (b"\r", b"\n"):
+            line_count += 1
+        crlf = line_ends.count(b"\r\n")
+        char_count = len(source) - crlf - len(UTF8_CONTINUATION_PATTERN.findall(source))
+        return line_count, char_count
+
+    # Fase: índice de linhas do código
+    def line_index(self) -> SourceLineIndex:
+        # Se os tokens já foram lidos, usa o índice do buffer (o mesmo código)
+        if "tokens" in self._results:
+            return self._memoize("line_index", lambda: self._results["tokens"].line_index)
+        return self._memoize("line_index", lambda: SourceLineIndex(self.text()))
+
+    # Entrada do cache para este código (None sem cache ou se não há entrada)
+    def _cache_entry(self) -> Optional[dict]:
+        if self.cache is None:
+            return None
+        return self._memoize("cache_entry", lambda: self.cache.load(self.cache_key))
+
+    # Grava no cache o resultado de uma análise (se há cache)
+    def _cache_store(self, parser: Optional[Parser] = None,
+                     lexical_error: Optional[LexicalError] = None) -> None:
+        if self.cache is None:
+            return
+        tokens = self._results.get("tokens")
+        entry = pack_analysis(tokens, parser, lexical_error)
+        self.cache.store(self.cache_key, entry)
+        self._results["cache_entry"] = entry
+
+    # Retorna True se a análise deste código está no cache
+    def is_cached(self) -> bool:
+        return self._cache_entry() is not None
+
+    # Fase: tokens do código (lidos uma única vez)
+    def tokens(self) -> TokenBuffer:
+        return self._memoize("tokens", self._compute_tokens)
+
+    # Lê todos os tokens para um buffer compacto
+    def _compute_tokens(self) -> TokenBuffer:
+        # Arquivo que não mudou: os tokens vêm do cache (sem varredura)
+        entry = self._cache_entry()
+        if entry is not None:
+            buffer = unpack_tokens(entry, self.text())
+        else:
+            try:
+                buffer = TokenBuffer.from_scanner(self.scanner())
+            except LexicalError as e:
+                # O erro léxico também é guardado (a varredura não se repete)
+                self._cache_store(lexical_error=e)
+                raise
+        # Se o índice de linhas já foi montado, o buffer usa o mesmo
+        if "line_index" in self._results:
+            buffer._line_index = self._results["line_index"]
+        # Tokens por tipo nas métricas (só se estão ligadas)
+        if self.metrics.enabled:
+            self.metrics.count_tokens(buffer.count_types())
+        return buffer
+
+    # Fase: análise sintática sobre os tokens já lidos
+    def parse(self) -> Parser:
+        return self._memoize("parse", self._compute_parse)
+
+    # Executa o parser sobre o buffer de tokens da unidade
+    def _compute_parse(self) -> Parser:
+        tokens = self.tokens()
+        # Arquivo que não mudou: a análise vem do cache
+        entry = self._cache_entry()
+        parser = unpack_parser(entry, tokens, max_errors=self.max_errors) if entry is not None else None
+        if parser is None:
+            parser = Parser.from_tokens(tokens, max_errors=self.max_errors)
+            parser.parse()
+            self._cache_store(parser)
+        return parser
+
+    # Fase: árvore sintática do programa
+    def syntax_tree(self) -> SyntaxTree:
+        return self._memoize("syntax_tree", self._compute_syntax_tree)
+
+    # Executa o parser montando a árvore
+    def _compute_syntax_tree(self) -> SyntaxTree:
+        tokens = self.tokens()
+        # Arquivo que não mudou (e a árvore já foi guardada): vem do cache
+        entry = self._cache_entry()
+        parser = unpack_parser(entry, tokens, build_tree=True, max_errors=self.max_errors) if entry is not None else None
+        if parser is None:
+            parser = Parser.from_tokens(tokens, build_tree=True, max_errors=self.max_errors)
+            parser.parse()
+            self._cache_store(parser)
+        # A mesma análise serve como fase de análise sintática
+        self._results.setdefault("parse", parser)
+        return parser.tree
+
+    # Fase: otimização da árvore (dobramento de constantes e ramos mortos)
+    def optimization(self) -> ConstantFolder:
+        return self._memoize("optimization", self._compute_optimization)
+
+    # Otimiza a árvore sintática (a original continua disponível)
+    def _compute_optimization(self) -> ConstantFolder:
+        folder = ConstantFolder(self.syntax_tree(), self.types())
+        folder.fold()
+        return folder
+
+    # Fase: tipos (int/float) de cada expressão e de cada variável
+    def types(self) -> TypeChecker:
+        return self._memoize("types", lambda: TypeChecker(self.syntax_tree()).check())
+
+    # Fase: bytecode do programa (só para programas sem erros sintáticos)
+    # (optimize=True: compila a árvore otimizada)
+    def bytecode(self, optimize: bool = False) -> Bytecode:
+        # Erros semânticos (encontrados junto com a análise sintática) impedem
+        # a compilação: lança o primeiro
+        tree = self.syntax_tree()
+        errors = self.parse().semantic_errors
+        if errors:
+            raise errors[0]
+        if optimize:
+            return self._memoize("optimized_bytecode", self._compute_optimized_bytecode)
+        return self._memoize("bytecode", lambda: BytecodeCompiler(tree, self.types()).compile())
+
+    # Compila a árvore otimizada
+    def _compute_optimized_bytecode(self) -> Bytecode:
+        tree = self.optimization().tree
+        # Os tipos das variáveis são os do programa original (um ramo
+        # removido pode ter sido o que definiu o tipo de uma variável)
+        types = TypeChecker(tree, self.types().slot_types).check()
+        return BytecodeCompiler(tree, types).compile()
+
+
+# ============================================================================
+# MODO LOTE (MUITOS ARQUIVOS EM PARALELO)
+# ============================================================================
+# Verifica muitos arquivos .mc num único comando (em vez de iniciar o Python
+# uma vez por arquivo). Os arquivos são divididos em grupos e cada grupo é
+# analisado (scanner + parser) por um processo de um ProcessPoolExecutor,
+# com um processo por núcleo da CPU.
+# - Cada processo devolve só um resumo pequeno de cada arquivo (nenhum token
+#   ou árvore passa de um processo para outro)
+# - Os resumos chegam na ordem em que os grupos terminam
+# - Grupos pequenos o bastante para todos os processos terem trabalho até o
+#   fim, e grandes o bastante para a troca entre processos não pesar
+# ============================================================================
+# Número máximo de arquivos por grupo (tarefa do pool)
+BATCH_GROUP_SIZE = 32
+
+
+# Resultado da análise de um arquivo no modo lote
+class FileReport(NamedTuple):
+    path: str            # Caminho do arquivo
+    tokens: int          # Quantidade de tokens
+    errors: list[str]    # Mensagens dos erros (léxicos, sintáticos ou semânticos)
+    elapsed: float       # Tempo da análise do arquivo (segundos)
+    cached: bool = False # A análise veio do cache em disco?
+    stopped: bool = False  # A análise parou no limite de erros?
+    metrics: Optional[Metrics] = None  # Métricas do arquivo (se foram pedidas)
+
+
+# Encontra os arquivos a analisar: pastas (com subpastas), padrões glob
+# (ex: "exemplos/**/*.mc") ou arquivos
+def find_sources(patterns) -> list[Path]:
+    sources = []
+    # Cada arquivo entra uma vez só (mesmo se dois padrões o encontram)
+    seen = set()
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            found = sorted(path.rglob("*.mc"))
+        elif any(char in pattern for char in "*?["):
+            import glob
+            found = sorted(Path(name) for name in glob.glob(pattern, recursive=True))
+        else:
+            found = [path]
+        for source in found:
+            if source not in seen:
+                seen.add(source)
+                sources.append(source)
+    return sources
+
+
+# Analisa um arquivo (roda dentro de um processo do pool)
+# (cache_directory: pasta do cache de análise; None: sem cache)
+# (collect_metrics: devolve também as métricas do arquivo)
+# (max_errors: para a análise do arquivo depois de tantos erros)
+def check_file(path, engine: str = "regex", cache_directory=None,
+               collect_metrics: bool = False, max_errors: Optional[int] = None) -> FileReport:
+    start = time.perf_counter()
+    tokens = 0
+    errors: list[str] = []
+    cached = False
+    stopped = False
+    metrics = Metrics() if collect_metrics else NULL_METRICS
+    try:
+        unit = CompilationUnit.from_path(path, engine, open_cache(cache_directory), metrics, max_errors)
+        try:
+            cached = unit.is_cached()
+            tokens = len(unit.tokens())
+            parser = unit.parse()
+            stopped = parser.stopped
+            # Erros semânticos só valem para um código sem erros sintáticos
+            errors = [str(error) for error in parser.errors or parser.semantic_errors]
+            metrics.count_errors("syntax" if parser.errors else "semantic", len(errors))
+        finally:
+            unit.close()
+    except LexicalError as e:
+        errors = [str(e)]
+        metrics.count_errors("lexical")
+    except (OSError, UnicodeDecodeError) as e:
+        errors = [f"Erro ao ler arquivo: {e}"]
+        metrics.count_errors("read")
+    return FileReport(str(path), tokens, errors, time.perf_counter() - start, cached,
+                      stopped, metrics if collect_metrics else None)
+
+
+# Analisa um grupo de arquivos (uma tarefa do pool)
+def check_files(paths: list, engine: str = "regex", cache_directory=None,
+                collect_metrics: bool = False, max_errors: Optional[int] = None) -> list[FileReport]:
+    return [check_file(path, engine, cache_directory, collect_metrics, max_errors) for path in paths]
+
+
+# Analisa vários arquivos em paralelo, gerando cada resultado assim que o
+# grupo dele termina (workers=None: um processo por núcleo da CPU)
+def run_batch(paths: list, engine: str = "regex", workers: Optional[int] = None,
+              cache_directory=None, collect_metrics: bool = False,
+              max_errors: Optional[int] = None) -> Iterator[FileReport]:
+    """Distribui os arquivos entre os processos e gera os FileReport"""
+    workers = workers or os.cpu_count() or 1
+    # Tamanho dos grupos: uns 4 grupos por processo (divisão equilibrada)
+    size = max(1, min(BATCH_GROUP_SIZE, len(paths) // (workers * 4)))
+    groups = [paths[index:index + size] for index in range(0, len(paths), size)]
+    # Um processo só: analisa aqui mesmo (sem o custo de criar o pool)
+    if workers == 1 or len(groups) <= 1:
+        for group in groups:
+            yield from check_files(group, engine, cache_directory, collect_metrics, max_errors)
+        return
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=min(workers, len(groups))) as pool:
+        futures = [pool.submit(check_files, group, engine, cache_directory, collect_metrics, max_errors)
+                   for group in groups]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+# ============================================================================
+# DAEMON DE ANÁLISE (SOCKET UNIX)
+# ============================================================================
+# Cada "python3 main.py arquivo.mc" paga o início do Python e a importação do
+# compilador antes de analisar qualquer coisa. O daemon fica rodando com tudo
+# já carregado (tabela LL(1), expressões regulares, processos do pool) e
+# recebe pedidos de análise por um socket Unix; o cliente (--cliente) só
+# envia o pedido e imprime a resposta.
+# - Protocolo: uma linha JSON por pedido e uma por resposta (NDJSON), várias
+#   por conexão. Pedido: {"path": ...} ou {"source": ...}, com "engine",
+#   "max_errors", "version" e "id" opcionais; {"command": "status"} e
+#   {"command": "shutdown"} consultam e encerram o daemon
+# - Resposta: {"ok", "file", "tokens", "errors", "stopped", "cached",
+#   "elapsed"}; cada erro é um registro como os da saída NDJSON (fase,
+#   linha, coluna, mensagem). Pedido inválido: {"ok": false, "message"}
+# - Cada conexão é atendida numa thread; a análise roda num processo do pool
+#   (ProcessPoolExecutor, como no modo lote), então clientes simultâneos
+#   usam todos os núcleos
+# - Os resultados ficam num LRU em memória, pelo hash do conteúdo: um
+#   arquivo que não mudou é respondido sem passar pelo pool
+# - Um cliente de outra versão do compilador recebe um erro e analisa no
+#   próprio processo (o daemon antigo não serve resultados desatualizados)
+# ============================================================================
+# Número máximo de resultados no LRU em memória
+DAEMON_CACHE_ENTRIES = 4096
+# Tempo máximo de espera pela conexão com o daemon (segundos)
+DAEMON_CONNECT_TIMEOUT = 1.0
+# Programa analisado por cada processo do pool ao iniciar (deixa o processo
+# pronto antes do primeiro pedido)
+DAEMON_WARMUP_SOURCE = b"int x = 1\nfloat y = x * 2.5\nif (x > 0)\nprint(y)\n"
+# Classe de erro de cada fase (para remontar os erros recebidos do daemon)
+ERROR_PHASES = {"lexical": LexicalError, "syntax": SyntaxError, "semantic": SemanticError}
+
+
+# Caminho padrão do socket (um por usuário, na pasta temporária)
+def default_socket_path() -> str:
+    import tempfile
+    user = os.getuid() if hasattr(os, "getuid") else 0
+    return os.path.join(tempfile.gettempdir(), f"compiladorpy-{user}.sock")
+
+
+# Analisa um código (roda num processo do pool do daemon, ou no cliente
+# quando não há daemon) e monta a resposta, sem o caminho do arquivo
+# (os erros seguem as regras do modo lote: léxico; senão sintáticos; senão
+# semânticos)
+def check_source(data: bytes, engine: str = "regex", max_errors: Optional[int] = None) -> dict:
+    unit = CompilationUnit.from_bytes(data, None, engine)
+    unit.max_errors = max_errors
+    tokens = 0
+    errors: list[dict] = []
+    stopped = False
+    try:
+        tokens = len(unit.tokens())
+        parser = unit.parse()
+        stopped = parser.stopped
+        phase = "syntax" if parser.errors else "semantic"
+        errors = [error_record(phase, error) for error in parser.errors or parser.semantic_errors]
+    except LexicalError as e:
+        errors = [error_record("lexical", e)]
+    except UnicodeDecodeError as e:
+        return {"ok": False, "message": f"Erro ao ler arquivo: {e}"}
+    return {"ok": True, "tokens": tokens, "errors": errors, "stopped": stopped}
+
+
+# Retorna os bytes do código de um pedido: enviado no pedido, ou lido do
+# arquivo (o caminho é do ponto de vista de quem analisa)
+def request_source(request: dict) -> bytes:
+    if "source" in request:
+        if not isinstance(request["source"], str):
+            raise ValueError("'source' deve ser um texto")
+        return request["source"].encode("utf-8")
+    path = request.get("path")
+    if path is None:
+        raise ValueError("informe 'path' ou 'source'")
+    if not isinstance(path, str):
+        raise ValueError("'path' deve ser um texto")
+    return Path(path).read_bytes()
+
+
+# Cache dos resultados do daemon em memória (LRU pelo hash do conteúdo)
+class ResultCache:
+    # Construtor - recebe o número máximo de resultados guardados
+    def __init__(self, max_entries: int = DAEMON_CACHE_ENTRIES) -> None:
+        import threading
+        self.max_entries = max_entries
+        # Resultados na ordem de uso (o mais antigo primeiro)
+        self.entries: OrderedDict = OrderedDict()
+        # Várias threads (uma por conexão) usam o cache ao mesmo tempo
+        self.lock = threading.Lock()
+        # Estatísticas de uso
+        self.hits = 0
+        self.misses = 0
+
+    # Calcula a chave de um código analisado com um motor e um limite de erros
+    @staticmethod
+    def key(data: bytes, engine: str, max_errors: Optional[int]) -> bytes:
+        import hashlib
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{engine}:{max_errors}:".encode("ascii"))
+        digest.update(data)
+        return digest.digest()
+
+    # Retorna o resultado de uma chave (None se não está no cache)
+    def get(self, key: bytes) -> Optional[dict]:
+        with self.lock:
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            # Marca como usado agora
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    # Guarda um resultado (apaga o usado há mais tempo se passou do limite)
+    def put(self, key: bytes, result: dict) -> None:
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+# Daemon: um servidor do socketserver (uma thread por conexão) que passa
+# cada conexão para _handle
+class CompileDaemon:
+    # Construtor - recebe o caminho do socket e o número de processos do pool
+    def __init__(self, socket_path=None, workers: Optional[int] = None,
+                 max_entries: int = DAEMON_CACHE_ENTRIES) -> None:
+        import socketserver
+        self.socket_path = str(socket_path or default_socket_path())
+        self.workers = workers or os.cpu_count() or 1
+        # Resultados recentes, pelo hash do conteúdo
+        self.cache = ResultCache(max_entries)
+        # Versão do compilador (os clientes de outra versão são recusados)
+        self.version = compiler_version().hex()
+        # Pedidos de análise atendidos
+        self.requests = 0
+        # Pool de processos (um processo só: analisa na thread da conexão)
+        self.pool: Optional[ProcessPoolExecutor] = None
+        if self.workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            # Aquece os processos antes de aceitar conexões
+            warmup = [self.pool.submit(check_source, DAEMON_WARMUP_SOURCE) for _ in range(self.workers)]
+            for future in warmup:
+                future.result()
+        # O socketserver chama _handle com cada conexão aceita
+        self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, self._handle)
+        # As threads das conexões não impedem o daemon de encerrar
+        self.server.daemon_threads = True
+
+    # Atende uma conexão: lê um pedido por linha e responde cada um na hora
+    def _handle(self, connection, client_address, server) -> None:
+        import json
+        with connection.makefile("rb") as reader:
+            for line in reader:
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("o pedido deve ser um objeto JSON")
+                    response = self.respond(request)
+                except ValueError as e:
+                    response = {"ok": False, "message": f"Pedido inválido: {e}"}
+                except Exception as e:
+                    # Erro inesperado: o cliente recebe a resposta (em vez
+                    # de ficar esperando) e a conexão continua
+                    response = {"ok": False, "message": f"Erro interno: {e!r}"}
+                connection.sendall(ndjson_line(response).encode("utf-8"))
+
+    # Atende pedidos até shutdown() ser chamado
+    def serve_forever(self) -> None:
+        self.server.serve_forever()
+
+    # Para o laço de serve_forever (espera ele terminar)
+    def shutdown(self) -> None:
+        self.server.shutdown()
+
+    # Responde um pedido (já lido como dicionário)
+    def respond(self, request: dict) -> dict:
+        command = request.get("command", "analyze")
+        if command == "status":
+            return {"ok": True, "pid": os.getpid(), "workers": self.workers, "version": self.version,
+                    "requests": self.requests, "entries": len(self.cache.entries),
+                    "hits": self.cache.hits, "misses": self.cache.misses}
+        if command == "shutdown":
+            # shutdown() espera o laço do servidor terminar: roda em outra
+            # thread para a resposta sair na hora
+            import threading
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"ok": True}
+        if command != "analyze":
+            raise ValueError(f"comando desconhecido: {command}")
+        start = time.perf_counter()
+        version = request.get("version")
+        if version is not None and version != self.version:
+            return {"ok": False, "version": self.version, "message": "Daemon de outra versão do compilador"}
+        engine = request.get("engine", "regex")
+        if not isinstance(engine, str) or engine not in SCANNER_ENGINES:
+            raise ValueError(f"motor desconhecido: {engine}")
+        max_errors = request.get("max_errors")
+        # (bool também é int no Python: true/false não são limites)
+        if max_errors is not None and (type(max_errors) is not int or max_errors < 1):
+            raise ValueError("max_errors deve ser um número a partir de 1")
+        path = request.get("path")
+        try:
+            data = request_source(request)
+        except OSError as e:
+            return {"ok": False, "file": path, "message": f"Erro ao ler arquivo: {e}"}
+        # Resultado recente do mesmo conteúdo, ou uma análise nova
+        key = self.cache.key(data, engine, max_errors)
+        result = self.cache.get(key)
+        cached = result is not None
+        if result is None:
+            if self.pool is not None:
+                result = self.pool.submit(check_source, data, engine, max_errors).result()
+            else:
+                result = check_source(data, engine, max_errors)
+            self.cache.put(key, result)
+        with self.cache.lock:
+            self.requests += 1
+        response = dict(result, file=path or "", cached=cached, elapsed=time.perf_counter() - start)
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    # Fecha o socket, apaga o arquivo dele e encerra o pool
+    def server_close(self) -> None:
+        self.server.server_close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+# Conexão de um cliente com o daemon
+class DaemonClient:
+    # Construtor - recebe o socket já conectado
+    def __init__(self, connection: socket.socket) -> None:
+        self.connection = connection
+        self.reader = connection.makefile("rb")
+
+    # Conecta ao daemon (None se não há daemon rodando nesse caminho)
+    @classmethod
+    def connect(cls, socket_path=None) -> Optional['DaemonClient']:
+        import socket
+        if not hasattr(socket, "AF_UNIX"):
+            return None
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(DAEMON_CONNECT_TIMEOUT)
+        try:
+            connection.connect(str(socket_path or default_socket_path()))
+        except OSError:
+            # Sem arquivo do socket, ou arquivo de um daemon que já parou
+            connection.close()
+            return None
+        # Conectado: a análise pode demorar mais que a conexão
+        connection.settimeout(None)
+        return cls(connection)
+
+    # Envia um pedido e espera a resposta
+    def request(self, request: dict) -> dict:
+        import json
+        self.connection.sendall(ndjson_line(request).encode("utf-8"))
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("o daemon fechou a conexão")
+        return json.loads(line)
+
+    # Fecha a conexão
+    def close(self) -> None:
+        self.reader.close()
+        self.connection.close()
+
+
+# Cria o daemon (ainda sem atender pedidos: ver serve_forever)
+# (None se já há um daemon respondendo nesse caminho)
+def start_daemon(socket_path=None, workers: Optional[int] = None) -> Optional[CompileDaemon]:
+    socket_path = socket_path or default_socket_path()
+    client = DaemonClient.connect(socket_path)
+    if client is not None:
+        client.close()
+        return None
+    # Arquivo de um daemon que parou sem apagá-lo
+    try:
+        os.unlink(socket_path)
+    except OSError:
+        pass
+    return CompileDaemon(socket_path, workers)
+
+
+# ============================================================================
+# SESSÃO INTERATIVA (REPL)
+# ============================================================================
+# Guarda o estado do modo interativo entre uma linha e outra: os tokens de
+# cada comando já aceito, as variáveis declaradas e o comando que ainda está
+# sendo digitado. Cada linha nova é analisada sozinha (junto só com o
+# comando pendente), então o tempo de resposta não cresce com a sessão.
+# - Comando incompleto (ex: "print(x +"): espera a próxima linha ("...")
+# - Comentário de bloco aberto: espera até o '*/'
+# - Linha começando com 'else': é analisada junto com o último 'if'
+# - Linha vazia com um comando pendente: analisa o que foi digitado
+# ============================================================================
+# Padrão de uma linha que começa com a palavra reservada 'else'
+ELSE_LINE_PATTERN = re.compile(r"[ \t]*else(?![A-Za-z0-9_])")
+
+
+class ReplSession:
+    # Construtor - recebe o motor de varredura usado em cada linha
+    def __init__(self, engine: str = "classico") -> None:
+        # Motor de varredura ("classico", "regex" ou "mmap")
+        self.engine = engine
+        # Quantas linhas já foram recebidas na sessão
+        self.line_count = 0
+        # Linhas do comando que ainda não terminou
+        self.pending: list[str] = []
+        # Linha (da sessão) onde o comando pendente começa
+        self.pending_line = 1
+        # Comandos aceitos: (linha onde começa, TokenBuffer com os tokens,
+        # quantas variáveis existiam antes dele)
+        self.statements: list[tuple] = []
+        # Total de tokens aceitos na sessão
+        self.token_count = 0
+        # Variáveis da sessão (cada comando é verificado com a mesma tabela)
+        self.symbols = SymbolTable()
+        # Quantas variáveis existiam antes do comando pendente
+        self._symbol_mark = 0
+        # Variáveis do 'if' retirado para receber o 'else' (voltam se o
+        # comando for descartado)
+        self._reopened_symbols: list[tuple] = []
+        # Comando aceito nesta linha (None se nada terminou)
+        self.completed: Optional[TokenBuffer] = None
+        # Último comando aceito, se for um 'if' que ainda pode receber 'else':
+        # (linha onde começa, linhas do comando)
+        self._open_if: Optional[tuple] = None
+        # Comando 'if' retirado para ser analisado de novo junto com o 'else'
+        self._reopened: Optional[tuple] = None
+        # Indica se o comando pendente está dentro de um comentário de bloco
+        self._in_comment = False
+
+    # Indica se há um comando esperando a próxima linha
+    @property
+    def is_pending(self) -> bool:
+        return bool(self.pending)
+
+    # Variáveis da sessão: nome -> tipo ("int", "float" ou None sem declaração)
+    @property
+    def variables(self) -> dict:
+        return dict(self.symbols.entries())
+
+    # Recebe uma linha digitada e retorna os erros encontrados nela
+    def feed(self, line: str) -> list:
+        """Analisa uma linha (lista vazia se está ok ou se o comando continua)"""
+        # Conta a linha e limpa o comando aceito da linha anterior
+        self.line_count += 1
+        self.completed = None
+        # Linha vazia
+        if not line.strip():
+            # Sem comando pendente: só avança a contagem de linhas
+            # (um 'if' aceito continua podendo receber 'else')
+            if not self.pending:
+                if self._open_if is not None:
+                    self._open_if[1].append(line)
+                return []
+            # Comando pendente fora de comentário: analisa o que foi digitado
+            if not self._in_comment:
+                self.pending.append(line)
+                return self._analyze(force=True)
+        # Começo de um comando novo
+        if not self.pending:
+            self.pending_line = self.line_count
+            # 'else': retira o último 'if' para analisar os dois juntos
+            if self._open_if is not None and ELSE_LINE_PATTERN.match(line):
+                self.pending_line, lines = self._open_if
+                self.pending = list(lines)
+                self._reopened = self.statements.pop()
+                self.token_count -= len(self._reopened[1])
+                # As variáveis do 'if' serão criadas de novo na nova análise
+                self._reopened_symbols = self.symbols.entries(self._reopened[2])
+                self.symbols.truncate(self._reopened[2])
+        # Acrescenta a linha ao comando e analisa
+        self.pending.append(line)
+        return self._analyze()
+
+    # Analisa o comando pendente (force=True: não espera mais linhas)
+    def _analyze(self, force: bool = False) -> list:
+        # Código do comando pendente (só ele é varrido, não a sessão inteira)
+        text = "\n".join(self.pending)
+        # Variáveis criadas a partir daqui são deste comando
+        self._symbol_mark = len(self.symbols)
+        try:
+            # Lê os tokens do comando
+            tokens = TokenBuffer.from_scanner(SCANNER_ENGINES[self.engine].from_string(text))
+        except LexicalError as error:
+            # Comentário de bloco ainda aberto: espera as próximas linhas
+            if error.message == UNCLOSED_COMMENT_MESSAGE and not force:
+                self._in_comment = True
+                return []
+            # Outro erro léxico: descarta o comando
+            return self._reject([error])
+        self._in_comment = False
+        # Analisa as declarações do comando, lembrando onde a última começa
+        # (a tabela de símbolos é a da sessão: as variáveis continuam valendo)
+        parser = Parser.from_tokens(tokens, symbols=self.symbols)
+        errors = []
+        last_start = 0
+        while parser.current < len(tokens):
+            last_start = parser.current
+            errors.extend(parser.parse_statement())
+        # O primeiro erro no fim do comando (o token EOF tem posição 0:0)
+        # quer dizer que o comando só não terminou: espera a próxima linha
+        if errors and errors[0].line == 0 and not force:
+            self.symbols.truncate(self._symbol_mark)
+            return []
+        # Comando com erros (sintáticos ou semânticos): descarta
+        if errors or parser.semantic_errors:
+            return self._reject(errors or parser.semantic_errors)
+        # Comando aceito (só comentários não geram comando)
+        self.pending = []
+        self._reopened = None
+        if not tokens:
+            return []
+        self.statements.append((self.pending_line, tokens, self._symbol_mark))
+        self.token_count += len(tokens)
+        self.completed = tokens
+        # Se a última declaração é um 'if', ela ainda pode receber 'else'
+        if tokens.type_at(last_start) == TokenType.IF:
+            self._open_if = (self.pending_line, text.split("\n"))
+        else:
+            self._open_if = None
+        return []
+
+    # Gera os tokens do comando aceito nesta linha, com a linha da sessão
+    def completed_tokens(self) -> Iterator[Token]:
+        # Linha da sessão onde o comando começa
+        start_line = self.statements[-1][0]
+        # Os tokens do buffer contam as linhas a partir do início do comando
+        # (Token é imutável: sai uma cópia com a linha corrigida)
+        for token in self.completed:
+            yield token._replace(line=token.line + start_line - 1)
+
+    # Descarta o comando pendente e retorna os erros com a linha da sessão
+    def _reject(self, errors: list) -> list:
+        # As variáveis criadas pelo comando descartado deixam de existir
+        self.symbols.truncate(self._symbol_mark)
+        # Se um 'if' foi retirado para receber o 'else', ele volta como estava
+        if self._reopened is not None:
+            self.statements.append(self._reopened)
+            self.token_count += len(self._reopened[1])
+            for name, type_name in self._reopened_symbols:
+                self.symbols.declare(name, type_name)
+            self._reopened = None
+        else:
+            # Um comando inválido depois do 'if' impede o 'else' de se juntar a ele
+            self._open_if = None
+        # Converte a linha de cada erro (relativa ao comando) para a da sessão
+        for error in errors:
+            if error.line > 0:
+                error.line += self.pending_line - 1
+        # Limpa o comando pendente
+        self.pending = []
+        self._in_comment = False
+        return errors
+
+
+# ============================================================================
+# POSIÇÕES COM DESLOCAMENTO PENDENTE (EDIÇÃO INCREMENTAL)
+# ============================================================================
+# Vetor de posições em ordem crescente (início dos tokens, das linhas ou das
+# declarações). Depois de uma edição, todas as posições seguintes mudam de
+# um mesmo valor; em vez de corrigir o vetor inteiro, a correção fica
+# pendente: a partir de shift_from, cada valor guardado vale + shift.
+# Edições seguidas perto umas das outras só corrigem o trecho entre elas.
+# ============================================================================
+class ShiftedOffsets:
+    # Construtor - recebe o vetor de posições (array)
+    def __init__(self, values: array) -> None:
+        # Valores guardados (a partir de shift_from, falta somar shift)
+        self.values = values
+        # Primeira posição do vetor com o deslocamento pendente
+        self.shift_from = len(values)
+        # Deslocamento pendente
+        self.shift = 0
+
+    # Número de posições (permite usar len() e bisect)
+    def __len__(self) -> int:
+        return len(self.values)
+
+    # Retorna a posição i já com o deslocamento aplicado
+    def __getitem__(self, index: int) -> int:
+        # Índices negativos contam a partir do fim
+        if index < 0:
+            index += len(self.values)
+        value = self.values[index]
+        return value + self.shift if index >= self.shift_from else value
+
+    # Troca values[first:stop] por novas posições e soma 'delta' às seguintes
+    def splice(self, first: int, stop: int, values: array, delta: int) -> None:
+        """
+        Substitui as posições [first, stop) por 'values' (já corretas) e
+        desloca todas as posições depois de 'stop' por 'delta'.
+        Só o trecho entre a correção pendente e a edição é corrigido agora.
+        """
+        vector = self.values
+        typecode = vector.typecode
+        # Correção que começa depois do fim do vetor não está pendente
+        if self.shift_from >= len(vector):
+            self.shift = 0
+        if self.shift and self.shift_from <= stop:
+            # A correção pendente começa antes do fim da edição: aplica-a
+            # no trecho que fica antes da edição (o resto continua pendente)
+            if self.shift_from < first:
+                vector[self.shift_from:first] = array(typecode, map(self.shift.__add__, vector[self.shift_from:first]))
+            self.shift_from = stop
+        elif self.shift:
+            # A correção pendente começa depois da edição: o trecho entre as
+            # duas só recebe o deslocamento desta edição
+            vector[stop:self.shift_from] = array(typecode, map(delta.__add__, vector[stop:self.shift_from]))
+        else:
+            # Sem correção pendente: ela passa a começar no fim da edição
+            self.shift_from = stop
+        # O deslocamento desta edição se soma ao pendente
+        self.shift += delta
+        # Troca as posições editadas (o início da correção acompanha a troca)
+        vector[first:stop] = values
+        self.shift_from += len(values) - (stop - first)
+
+
+# ============================================================================
+# DOCUMENTO COM ANÁLISE INCREMENTAL
+# ============================================================================
+# Mantém o texto, os tokens e os erros de um código que é editado aos
+# poucos (ex: num editor, a cada tecla). Cada edição (posição, quantos
+# caracteres saíram, texto inserido) refaz só o trecho afetado:
+# - Análise léxica: volta ao fim do último token intacto antes da edição e
+#   varre até os tokens novos coincidirem de novo com os antigos
+#   (mesmo tipo, mesmo tamanho e mesma posição, já deslocada pela edição)
+# - Análise sintática: refaz a partir da declaração de nível superior que
+#   contém o token antes da edição, até uma declaração começar no mesmo
+#   token que começava antes
+# Erros são guardados relativos à declaração, então os que ficam depois da
+# edição não precisam ser recalculados. A varredura usa o motor regex
+# (mesmos tokens e erros do motor clássico).
+# ============================================================================
+class IncrementalDocument:
+    # Construtor - recebe o texto inicial (analisado por inteiro uma vez)
+    def __init__(self, text: str = "") -> None:
+        # Texto atual do documento
+        self.text = ""
+        # Tokens do documento (início de cada token com correção pendente)
+        self.tokens = TokenBuffer("")
+        self.tokens.starts = ShiftedOffsets(self.tokens.starts)
+        # Índice de linhas, atualizado a cada edição (não é montado de novo)
+        line_index = SourceLineIndex("")
+        line_index.line_starts = ShiftedOffsets(line_index.line_starts)
+        self.tokens._line_index = line_index
+        # Erro léxico atual: (mensagem, posição) ou None
+        # (os tokens param no erro, como na análise completa)
+        self._lexical_error: Optional[tuple] = None
+        # Token onde começa cada declaração de nível superior
+        self.statements = ShiftedOffsets(array("I"))
+        # Erros de cada declaração: lista de (mensagem, token relativo ao
+        # início da declaração, ou None se o erro é no fim dos tokens)
+        self.statement_errors: list[list] = []
+        # O texto inicial é uma edição que insere tudo num documento vazio
+        self.edit(0, 0, text)
+
+    # Índice de linhas do texto atual
+    @property
+    def line_index(self) -> SourceLineIndex:
+        return self.tokens.line_index
+
+    # Aplica uma edição e atualiza tokens e erros só no trecho afetado
+    def edit(self, offset: int, removed: int, inserted: str) -> tuple:
+        """
+        Troca 'removed' caracteres a partir de 'offset' por 'inserted'.
+        Retorna (primeiro, fim): os tokens novos ficam em tokens[primeiro:fim].
+        """
+        # A edição precisa estar dentro do texto
+        if offset < 0 or removed < 0 or offset + removed > len(self.text):
+            raise ValueError(f"Edição fora do texto: posição {offset}, {removed} caracteres removidos")
+        # Quanto o texto depois da edição andou
+        delta = len(inserted) - removed
+        # Atualiza o texto
+        self.text = self.text[:offset] + inserted + self.text[offset + removed:]
+        self.tokens.source = self.text
+        # Atualiza as linhas, os tokens e as declarações afetadas
+        self._update_lines(offset, removed, inserted, delta)
+        first, stop, count = self._relex(offset, removed, len(inserted), delta)
+        self._reparse(first, stop, count)
+        # Retorna onde estão os tokens novos
+        return first, first + count
+
+    # Atualiza o início das linhas que a edição tocou
+    def _update_lines(self, offset: int, removed: int, inserted: str, delta: int) -> None:
+        line_index = self.line_index
+        line_index.source = self.text
+        line_starts = line_index.line_starts
+        # Linhas que começavam dentro do trecho removido (depois de um '\n' dele)
+        first = bisect_right(line_starts, offset)
+        stop = bisect_right(line_starts, offset + removed)
+        # Linhas novas: uma depois de cada '\n' inserido
+        new_starts = array("I", (offset + m.end() for m in re.finditer("\n", inserted)))
+        line_starts.splice(first, stop, new_starts, delta)
+
+    # Varre de novo só os tokens afetados pela edição
+    def _relex(self, offset: int, removed: int, inserted: int, delta: int) -> tuple:
+        """Retorna (primeiro, fim antigo, quantidade nova) dos tokens trocados"""
+        tokens = self.tokens
+        types = tokens.types
+        starts = tokens.starts
+        lengths = tokens.lengths
+        count = len(types)
+        # Primeiro token afetado: o que termina na posição da edição ou depois
+        # (um token que encosta na edição pode crescer, ex: "x" + "y" -> "xy")
+        first = bisect_left(starts, offset)
+        if first > 0 and starts[first - 1] + lengths[first - 1] >= offset:
+            first -= 1
+        # A varredura recomeça logo depois do último token intacto
+        scanner = RegexScanner.from_string(self.text)
+        scanner.index = starts[first - 1] + lengths[first - 1] if first > 0 else 0
+        # Fim da edição no texto novo
+        edit_end = offset + inserted
+        # Tokens novos
+        new_types = array("B")
+        new_starts = array("I")
+        new_lengths = array("I")
+        # Próximo token antigo que pode coincidir com um novo
+        old = first
+        # Primeiro token antigo reaproveitado (count = nenhum)
+        stop = count
+        error = None
+        try:
+            for code, start, end in scanner._scan_raw():
+                # Depois da edição, procura o token antigo na mesma posição
+                if start >= edit_end:
+                    while old < count and starts[old] + delta < start:
+                        old += 1
+                    # Mesmo token de antes: daqui em diante nada muda
+                    if old < count and starts[old] + delta == start and \
+                       types[old] == code and lengths[old] == end - start:
+                        stop = old
+                        break
+                new_types.append(code)
+                new_starts.append(start)
+                new_lengths.append(end - start)
+        except LexicalError as e:
+            # Os tokens param no erro (como na análise completa)
+            error = e
+        if stop == count:
+            # Varreu até o fim: o erro léxico (se houver) é o encontrado agora
+            self._lexical_error = (error.message, error.offset) if error is not None else None
+        elif self._lexical_error is not None:
+            # Reaproveitou o fim: o erro antigo só muda de posição
+            message, error_offset = self._lexical_error
+            self._lexical_error = (message, error_offset + delta)
+        # Troca os tokens afetados pelos novos
+        types[first:stop] = new_types
+        lengths[first:stop] = new_lengths
+        starts.splice(first, stop, new_starts, delta)
+        return first, stop, len(new_types)
+
+    # Analisa de novo só as declarações afetadas pelos tokens trocados
+    def _reparse(self, first: int, stop: int, count: int) -> None:
+        statements = self.statements
+        total = len(statements)
+        # Quanto a numeração dos tokens depois da troca andou
+        token_delta = count - (stop - first)
+        # Declaração que contém o token antes da troca (ela pode continuar
+        # nos tokens novos, ex: um 'else' digitado depois de um 'if')
+        index = max(bisect_right(statements, first - 1) - 1, 0)
+        # Recomeça a análise no início dessa declaração
+        parser = Parser.from_tokens(self.tokens)
+        parser.current = statements[index] if total else 0
+        # Declarações novas e seus erros
+        new_starts = array("I")
+        new_errors = []
+        # Próxima declaração antiga que pode coincidir com uma nova
+        old = index
+        # Primeira declaração antiga reaproveitada (total = nenhuma)
+        resume = total
+        while not parser._is_at_end():
+            start = parser.current
+            # Depois dos tokens novos (inclusive o anterior, que a recuperação
+            # de erros consulta), procura a declaração antiga no mesmo token
+            if start > first + count:
+                while old < total and statements[old] + token_delta < start:
+                    old += 1
+                # Mesma declaração de antes: daqui em diante nada muda
+                if old < total and statements[old] + token_delta == start:
+                    resume = old
+                    break
+            # Analisa a declaração e guarda os erros relativos ao início dela
+            errors = parser.parse_statement()
+            new_starts.append(start)
+            new_errors.append([(error.message, None if error.index is None else error.index - start)
+                               for error in errors])
+        # Troca as declarações afetadas pelas novas
+        statements.splice(index, resume, new_starts, token_delta)
+        self.statement_errors[index:resume] = new_errors
+
+    # Retorna os erros atuais do documento (com linha e coluna atualizadas)
+    def diagnostics(self) -> list:
+        """Erro léxico (se houver, como na análise completa) ou erros sintáticos"""
+        # Com erro léxico, só ele é mostrado
+        if self._lexical_error is not None:
+            message, offset = self._lexical_error
+            line, column = self.line_index.position(offset)
+            return [LexicalError(message, line, column, offset)]
+        errors = []
+        # Só as declarações com erros (o filtro é feito em C)
+        for index in compress(range(len(self.statement_errors)), self.statement_errors):
+            start = self.statements[index]
+            for message, relative in self.statement_errors[index]:
+                # Erro no fim dos tokens: posição 0:0 (como o token EOF)
+                if relative is None:
+                    errors.append(SyntaxError(message, 0, 0))
+                else:
+                    token = start + relative
+                    line, column = self.tokens.position(token)
+                    errors.append(SyntaxError(message, line, column, token))
+        return errors
+
+
+# ============================================================================
+# SERVIDOR DE LINGUAGEM (LSP)
+# ============================================================================
+# Mostra os erros léxicos e sintáticos no editor enquanto o código é digitado
+# (Language Server Protocol, pela entrada e saída padrão, com asyncio).
+# - Cada documento aberto é um IncrementalDocument: as edições do editor
+#   (intervalo + texto novo) refazem só o trecho afetado
+# - Debounce: a análise só roda quando o editor fica LSP_DEBOUNCE segundos
+#   sem mandar edições; uma edição nova cancela a análise que ainda está
+#   esperando
+# - A análise roda num ThreadPoolExecutor (documentos grandes não travam o
+#   laço de eventos, que continua lendo mensagens). Uma análise que ficou
+#   velha (chegou uma versão mais nova do documento) não publica nada: se
+#   já há edições novas na fila, nem calcula os erros
+# - Uma troca do texto inteiro descarta as edições anteriores ainda na fila
+# - Posições: linha e caractere começando em 0; o caractere conta unidades
+#   UTF-16 (padrão do protocolo), ou caracteres se o editor aceitar "utf-32"
+# ============================================================================
+# Tempo sem edições antes de analisar (segundos)
+LSP_DEBOUNCE = 0.15
+# Threads de análise (documentos diferentes são analisados ao mesmo tempo)
+LSP_WORKERS = 2
+# Nome do servidor nos diagnósticos
+LSP_SOURCE = "compiladorpy"
+# Códigos de erro do JSON-RPC usados pelo servidor
+LSP_PARSE_ERROR = -32700
+LSP_INVALID_REQUEST = -32600
+LSP_METHOD_NOT_FOUND = -32601
+LSP_INVALID_PARAMS = -32602
+LSP_INTERNAL_ERROR = -32603
+
+
+# Lê uma mensagem (cabeçalho Content-Length + corpo JSON) de um fluxo de
+# bytes (None no fim da entrada, ou se o cabeçalho não diz o tamanho)
+def read_lsp_message(stream) -> Optional[dict]:
+    import json
+    length = None
+    header = False
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        # Linha vazia: fim do cabeçalho (as que vêm antes dele são ignoradas)
+        if not line:
+            if header:
+                break
+            continue
+        header = True
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = value.strip()
+    # Sem um tamanho válido não dá para saber onde o corpo termina: o resto
+    # da entrada não pode mais ser lido (erro fatal, a leitura acaba)
+    if length is None or not length.isdigit():
+        print(f"❌ LSP: cabeçalho sem Content-Length válido: {length!r}", file=sys.stderr)
+        return None
+    length = int(length)
+    body = stream.read(length)
+    if len(body) < length:
+        return None
+    return json.loads(body)
+
+
+# Escreve uma mensagem (cabeçalho + corpo JSON) num fluxo de bytes
+def write_lsp_message(stream, message: dict) -> None:
+    import json
+    body = json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    stream.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+    stream.flush()
+
+
+# Converte um caractere do editor (unidades UTF-16) numa coluna da linha
+# (o código da linguagem é ASCII: só comentários mudam a conta)
+def utf16_to_column(text: str, units: int) -> int:
+    if text.isascii():
+        return units
+    count = 0
+    for index, char in enumerate(text):
+        if count >= units:
+            return index
+        # Caracteres fora do plano básico ocupam duas unidades UTF-16
+        count += 2 if char > "\uffff" else 1
+    return len(text)
+
+
+# Converte uma coluna da linha em unidades UTF-16
+def column_to_utf16(text: str) -> int:
+    if text.isascii():
+        return len(text)
+    return len(text) + sum(char > "\uffff" for char in text)
+
+
+# Documento aberto no editor: versão, edições ainda não analisadas e o
+# IncrementalDocument (usado só pelas threads de análise, uma por vez)
+class LspDocument:
+    # Construtor - recebe o endereço, a versão e o texto inicial
+    def __init__(self, uri: str, version: int, text: str) -> None:
+        import threading
+        self.uri = uri
+        # Última versão recebida do editor
+        self.version = version
+        # Edições na fila: (versão, mudanças do editor); o texto inicial é
+        # uma troca do texto inteiro
+        self.changes: deque = deque([(version, [{"text": text}])])
+        # Análise incremental (criada pela primeira análise)
+        self.document: Optional[IncrementalDocument] = None
+        # Versão que o documento analisado tem agora
+        self.analyzed_version: Optional[int] = None
+        # Uma análise por vez (o IncrementalDocument não é compartilhado)
+        self.lock = threading.Lock()
+        # Análise agendada ou rodando (asyncio.Task)
+        self.task: Optional[asyncio.Task] = None
+
+    # Aplica as edições da fila e calcula os diagnósticos (roda numa thread)
+    # (retorna (versão, diagnósticos), ou None se a análise ficou velha)
+    def analyze(self, utf16: bool = True) -> Optional[tuple]:
+        with self.lock:
+            # Pega todas as edições da fila (o laço de eventos pode
+            # acrescentar outras enquanto isso)
+            pending = []
+            while self.changes:
+                self.analyzed_version, changes = self.changes.popleft()
+                pending.extend(changes)
+            # Só o que vem depois da última troca do texto inteiro importa
+            for index in range(len(pending) - 1, -1, -1):
+                if "range" not in pending[index]:
+                    self.document = IncrementalDocument(pending[index]["text"])
+                    pending = pending[index + 1:]
+                    break
+            for change in pending:
+                self._apply(change, utf16)
+            # Chegaram edições novas: os erros desta versão não servem mais
+            if self.changes:
+                return None
+            return self.analyzed_version, self._diagnostics(utf16)
+
+    # Recomeça a análise do zero com o texto atual (depois de uma edição
+    # que falhou: as estruturas incrementais podem ter ficado pela metade)
+    def reset(self) -> None:
+        with self.lock:
+            text = self.document.text if self.document is not None else ""
+            self.document = IncrementalDocument(text)
+
+    # Aplica uma edição de um intervalo do texto
+    def _apply(self, change: dict, utf16: bool) -> None:
+        start = self._offset(change["range"]["start"], utf16)
+        end = max(self._offset(change["range"]["end"], utf16), start)
+        self.document.edit(start, end - start, change["text"])
+
+    # Converte uma posição do editor em posição no texto (uma posição depois
+    # do fim da linha ou do texto vai para o fim, como pede o protocolo)
+    def _offset(self, position: dict, utf16: bool) -> int:
+        line_index = self.document.line_index
+        line = position["line"] + 1
+        if line > line_index.line_count():
+            return len(self.document.text)
+        start = line_index.line_starts[line - 1]
+        end = line_index.line_end(line)
+        character = position["character"]
+        if utf16:
+            character = utf16_to_column(self.document.text[start:end], character)
+        return min(start + character, end)
+
+    # Converte uma posição no texto em posição do editor
+    def _position(self, offset: int, utf16: bool) -> dict:
+        line_index = self.document.line_index
+        line, column = line_index.position(offset)
+        character = column - 1
+        if utf16:
+            start = line_index.line_starts[line - 1]
+            character = column_to_utf16(self.document.text[start:offset])
+        return {"line": line - 1, "character": character}
+
+    # Monta os diagnósticos do protocolo a partir dos erros do documento
+    def _diagnostics(self, utf16: bool) -> list[dict]:
+        tokens = self.document.tokens
+        diagnostics = []
+        for error in self.document.diagnostics():
+            # Intervalo marcado: o caractere do erro léxico, o token do erro
+            # sintático, ou o fim do texto (erro no fim dos tokens)
+            if isinstance(error, LexicalError):
+                start, end, code = error.offset, error.offset + 1, "lexical"
+            elif error.index is None:
+                start = end = len(self.document.text)
+                code = "syntax"
+            else:
+                start = tokens.starts[error.index]
+                end, code = start + tokens.lengths[error.index], "syntax"
+            end = min(end, len(self.document.text))
+            diagnostics.append({
+                "range": {"start": self._position(start, utf16), "end": self._position(end, utf16)},
+                "severity": 1,
+                "source": LSP_SOURCE,
+                "code": code,
+                "message": error.message,
+            })
+        return diagnostics
+
+
+# Servidor de linguagem: lê mensagens da entrada, responde e publica os
+# diagnósticos de cada documento aberto
+class LanguageServer:
+    # Construtor - recebe os fluxos de bytes de entrada e saída
+    def __init__(self, input_stream, output_stream, debounce: float = LSP_DEBOUNCE,
+                 workers: int = LSP_WORKERS) -> None:
+        from concurrent.futures import ThreadPoolExecutor
+        self.input = input_stream
+        self.output = output_stream
+        self.debounce = debounce
+        # Documentos abertos, por endereço (uri)
+        self.documents: dict[str, LspDocument] = {}
+        # Threads de análise
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        # O caractere das posições conta unidades UTF-16 (padrão do protocolo)
+        self.utf16 = True
+        # O editor pediu "shutdown" (o "exit" depois dele sai com código 0)
+        self.shutdown_requested = False
+
+    # Atende o editor até receber "exit" (ou a entrada acabar)
+    # (retorna o código de saída do processo)
+    async def serve(self) -> int:
+        import asyncio
+        import threading
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        # A leitura (que bloqueia) fica numa thread que entrega as mensagens
+        # ao laço de eventos; daemon: não impede o processo de sair
+        threading.Thread(target=self._read_messages, args=(loop, queue), daemon=True).start()
+        try:
+            while True:
+                message = await queue.get()
+                # Mensagem que não pôde ser lida: (código, texto) do erro
+                if isinstance(message, tuple):
+                    code, text = message
+                    self._respond(None, error={"code": code, "message": text})
+                    continue
+                if message is None or message.get("method") == "exit":
+                    return 0 if self.shutdown_requested else 1
+                # Uma mensagem com parâmetros errados não derruba o servidor
+                try:
+                    self.dispatch(message)
+                except Exception as error:
+                    self._reject(message, error)
+        finally:
+            for document in self.documents.values():
+                if document.task is not None:
+                    document.task.cancel()
+            self.executor.shutdown(wait=False)
+
+    # Lê as mensagens da entrada (roda numa thread)
+    def _read_messages(self, loop, queue: asyncio.Queue) -> None:
+        while True:
+            try:
+                message = read_lsp_message(self.input)
+            except ValueError as e:
+                # JSON inválido: responde o erro e continua
+                message = (LSP_PARSE_ERROR, str(e))
+            else:
+                # Só objetos são mensagens (ex: lotes em lista não são aceitos)
+                if message is not None and not isinstance(message, dict):
+                    message = (LSP_INVALID_REQUEST, "A mensagem precisa ser um objeto JSON")
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+            if message is None:
+                return
+
+    # Envia uma resposta a um pedido
+    def _respond(self, request_id, result=None, error: Optional[dict] = None) -> None:
+        message = {"jsonrpc": "2.0", "id": request_id}
+        if error is not None:
+            message["error"] = error
+        else:
+            message["result"] = result
+        write_lsp_message(self.output, message)
+
+    # Envia uma notificação (mensagem sem resposta)
+    def _notify(self, method: str, params: dict) -> None:
+        write_lsp_message(self.output, {"jsonrpc": "2.0", "method": method, "params": params})
+
+    # Trata o erro de uma mensagem que não pôde ser atendida: um pedido
+    # recebe a resposta de erro; uma notificação é descartada (com registro)
+    def _reject(self, message: dict, error: Exception) -> None:
+        if "id" not in message:
+            print(f"❌ LSP: '{message.get('method')}' descartada: {error!r}", file=sys.stderr)
+            return
+        # Campos faltando ou com tipo errado são culpa dos parâmetros
+        if isinstance(error, (KeyError, TypeError, AttributeError, ValueError)):
+            code = LSP_INVALID_PARAMS
+        else:
+            code = LSP_INTERNAL_ERROR
+        self._respond(message["id"], error={"code": code, "message": f"{type(error).__name__}: {error}"})
+
+    # Trata uma mensagem do editor
+    def dispatch(self, message: dict) -> None:
+        method = message.get("method")
+        params = message.get("params") or {}
+        # Respostas do editor (sem método): nada a fazer
+        if method is None:
+            return
+        if method == "initialize":
+            # Posições em caracteres, se o editor aceitar
+            encodings = params.get("capabilities", {}).get("general", {}).get("positionEncodings", [])
+            self.utf16 = "utf-32" not in encodings
+            self._respond(message.get("id"), {
+                "capabilities": {
+                    "positionEncoding": "utf-16" if self.utf16 else "utf-32",
+                    # Edições incrementais (só o intervalo que mudou)
+                    "textDocumentSync": {"openClose": True, "change": 2},
+                },
+                "serverInfo": {"name": LSP_SOURCE},
+            })
+        elif method == "shutdown":
+            self.shutdown_requested = True
+            self._respond(message.get("id"))
+        elif method == "textDocument/didOpen":
+            item = params["textDocument"]
+            if not isinstance(item["text"], str):
+                raise TypeError("textDocument.text precisa ser um texto")
+            document = LspDocument(item["uri"], item.get("version", 0), item["text"])
+            self.documents[document.uri] = document
+            # Documento recém-aberto: analisa sem esperar
+            self._schedule(document, 0)
+        elif method == "textDocument/didChange":
+            document = self.documents.get(params["textDocument"]["uri"])
+            if document is None:
+                return
+            changes = params["contentChanges"]
+            if not isinstance(changes, list):
+                raise TypeError("contentChanges precisa ser uma lista")
+            document.version = params["textDocument"].get("version", document.version + 1)
+            document.changes.append((document.version, changes))
+            self._schedule(document, self.debounce)
+        elif method == "textDocument/didClose":
+            document = self.documents.pop(params["textDocument"]["uri"], None)
+            if document is not None:
+                if document.task is not None:
+                    document.task.cancel()
+                # Apaga os diagnósticos do documento fechado
+                self._notify("textDocument/publishDiagnostics", {"uri": document.uri, "diagnostics": []})
+        elif "id" in message:
+            self._respond(message["id"], error={"code": LSP_METHOD_NOT_FOUND,
+                                                "message": f"Método não suportado: {method}"})
+
+    # Agenda a análise de um documento (cancela a que ainda não publicou)
+    def _schedule(self, document: LspDocument, delay: float) -> None:
+        import asyncio
+        if document.task is not None:
+            document.task.cancel()
+        document.task = asyncio.get_running_loop().create_task(self._analyze(document, delay))
+
+    # Espera o debounce, analisa numa thread e publica os diagnósticos
+    async def _analyze(self, document: LspDocument, delay: float) -> None:
+        import asyncio
+        # Uma edição nova durante a espera cancela esta análise
+        if delay:
+            await asyncio.sleep(delay)
+        loop = asyncio.get_running_loop()
+        # Se a análise falha (ex: edição com posição incompleta), registra o
+        # erro e tenta mais uma vez com o documento recomeçado do zero
+        for attempt in range(2):
+            try:
+                result = await loop.run_in_executor(self.executor, document.analyze, self.utf16)
+                break
+            except Exception as error:
+                print(f"❌ LSP: erro ao analisar {document.uri}: {error!r}", file=sys.stderr)
+                if attempt:
+                    return
+                document.reset()
+        # Análise velha (versão nova no editor) ou documento já fechado
+        if result is None or result[0] != document.version or self.documents.get(document.uri) is not document:
+            return
+        version, diagnostics = result
+        self._notify("textDocument/publishDiagnostics",
+                     {"uri": document.uri, "version": version, "diagnostics": diagnostics})
+
+
+# ============================================================================
+# INFERÊNCIA DE TIPOS
+# ============================================================================
+# Um passo só sobre a árvore (pós-ordem: cada nó é visto uma vez, então o
+# tempo é linear no tamanho do programa) que dá a cada expressão o tipo
+# int ou float:
+# - Número com ponto é float, sem ponto é int
+# - Variável: o tipo declarado; variável criada só por atribuição fica com
+#   o tipo do primeiro valor guardado nela (na ordem do código)
+# - +, -, * e /: int se os dois lados são int, senão float (o lado int é
+#   convertido para float antes da operação)
+# - Comparações: sempre int (1 ou 0)
+# Guardar um float numa variável int é permitido (a parte fracionária é
+# descartada), mas gera um aviso.
+# O compilador usa os tipos para escolher as instruções que dependem do
+# tipo (DIV_INT ou DIV_FLOAT, STORE_INT ou STORE_FLOAT), sem decidir o tipo
+# durante a execução.
+# ============================================================================
+# Tipos de valor: VALUE_TYPES[código] -> nome do tipo
+VALUE_TYPES = ("int", "float")
+INT_TYPE = 0
+FLOAT_TYPE = 1
+# Conversão para cada tipo de valor (pelo código)
+VALUE_CONVERSIONS = (int, float)
+
+# Operadores aritméticos (os outros operadores binários são comparações)
+ARITHMETIC_OPERATORS = frozenset({TokenType.PLUS, TokenType.MINUS, TokenType.STAR, TokenType.SLASH})
+
+
+# Aviso (não impede a execução) encontrado na inferência de tipos
+class TypeWarning(SemanticError):
+    def __str__(self) -> str:
+        # Exemplo: "Aviso de tipo na linha 3, coluna 5: Valor float guardado na variável int 'z' ..."
+        return f"Aviso de tipo na linha {self.line}, coluna {self.column}: {self.message}"
+
+
+class TypeChecker:
+    # Construtor - recebe a árvore (com a tabela de símbolos) e, se já são
+    # conhecidos, os tipos dos slots (códigos de VALUE_TYPES)
+    def __init__(self, tree: SyntaxTree, slot_types: Optional[list] = None) -> None:
+        self.tree = tree
+        # Tipo de cada slot (None: variável sem declaração que ainda não recebeu valor)
+        if slot_types is None:
+            slot_types = [None if name is None else VALUE_TYPES.index(name) for name in tree.symbols.types]
+        self.slot_types: list = list(slot_types)
+        # Tipo de cada nó (código de VALUE_TYPES; -1 nos nós que não são expressões)
+        self.node_types = array("b")
+        # 1 nos nós cujo valor é convertido para float antes da operação do pai
+        self.coercions = array("B")
+        # Avisos de conversão com perda (float guardado em variável int)
+        self.warnings: list[TypeWarning] = []
+
+    # Infere os tipos da árvore inteira (retorna o próprio checker)
+    def check(self) -> 'TypeChecker':
+        """Percorre a árvore em pós-ordem: os filhos já têm tipo quando o pai é visto"""
+        tree = self.tree
+        kinds = tree.kinds
+        first_child = tree.first_child
+        next_sibling = tree.next_sibling
+        token_index = tree.token_index
+        slots = tree.slots
+        tokens = tree.tokens
+        slot_types = self.slot_types
+        node_types = self.node_types = array("b", [-1]) * len(tree)
+        coercions = self.coercions = array("B", [0]) * len(tree)
+        # Na pós-ordem, as declarações aparecem na ordem do código (o ramo
+        # 'então' antes do 'senão'), cada uma depois da sua expressão
+        for node in tree.postorder(0):
+            kind = NODE_KINDS[kinds[node]]
+            if kind is NodeKind.NUMBER:
+                node_types[node] = FLOAT_TYPE if "." in tokens.lexeme(token_index[node]) else INT_TYPE
+            elif kind is NodeKind.IDENTIFIER:
+                slot_type = slot_types[slots[node]]
+                node_types[node] = slot_type if slot_type is not None else -1
+            elif kind is NodeKind.BINARY:
+                left = first_child[node]
+                right = next_sibling[left]
+                left_type = node_types[left]
+                right_type = node_types[right]
+                # Comparação: resultado int, os lados são comparados como estão
+                if tokens.type_at(token_index[node]) not in ARITHMETIC_OPERATORS:
+                    node_types[node] = INT_TYPE
+                elif left_type == right_type:
+                    node_types[node] = left_type
+                else:
+                    # Tipos misturados: o lado int vira float
+                    node_types[node] = FLOAT_TYPE
+                    coercions[left if left_type == INT_TYPE else right] = 1
+            elif kind is NodeKind.VAR_DECL or kind is NodeKind.ASSIGN:
+                name = first_child[node]
+                value_type = node_types[next_sibling[name]]
+                slot = slots[name]
+                # Primeiro valor de uma variável sem declaração: define o tipo
+                if slot_types[slot] is None:
+                    slot_types[slot] = value_type
+                elif slot_types[slot] == INT_TYPE and value_type == FLOAT_TYPE:
+                    self._narrowing(name)
+                node_types[name] = slot_types[slot]
+            elif kind is NodeKind.CONSTANT:
+                node_types[node] = FLOAT_TYPE if type(tree.constants[token_index[node]]) is float else INT_TYPE
+        return self
+
+    # Nome do tipo de cada slot ("int" ou "float")
+    def type_names(self) -> list:
+        # (variável que nunca recebeu valor fica int, o valor inicial 0)
+        return [VALUE_TYPES[INT_TYPE if slot_type is None else slot_type] for slot_type in self.slot_types]
+
+    # Registra o aviso de um float guardado numa variável int
+    def _narrowing(self, name: int) -> None:
+        tokens = self.tree.tokens
+        token = self.tree.token_index[name]
+        line, column = tokens.position(token)
+        self.warnings.append(TypeWarning(
+            f"Valor float guardado na variável int '{tokens.lexeme(token)}' "
+            f"(a parte fracionária é descartada)", line, column))
+
+
+# ============================================================================
+# SEMÂNTICA DOS VALORES
+# ============================================================================
+# Regras da linguagem para calcular valores, usadas pela otimização (a
+# máquina virtual faz as mesmas contas: as duas precisam chegar exatamente
+# no mesmo resultado).
+# ============================================================================
+# Maior inteiro (em bits) que a otimização calcula antes da execução
+FOLD_INT_BITS = 1000
+
+
+# Converte o texto de um número no valor: com ponto é float, senão é int
+def number_value(text: str):
+    return float(text) if "." in text else int(text)
+
+
+# Divide como a linguagem: entre inteiros, descarta a parte fracionária
+# (arredonda para zero, como em C); com algum float, divisão comum
+def divide(a, b):
+    if type(a) is int and type(b) is int:
+        quotient = abs(a) // abs(b)
+        return quotient if (a < 0) == (b < 0) else -quotient
+    return a / b
+
+
+# Operação de cada operador binário (comparações resultam em 1 ou 0)
+BINARY_FUNCTIONS = {
+    TokenType.PLUS: add,
+    TokenType.MINUS: sub,
+    TokenType.STAR: mul,
+    TokenType.SLASH: divide,
+    TokenType.GT: lambda a, b: 1 if a > b else 0,
+    TokenType.GTE: lambda a, b: 1 if a >= b else 0,
+    TokenType.LT: lambda a, b: 1 if a < b else 0,
+    TokenType.LTE: lambda a, b: 1 if a <= b else 0,
+    TokenType.EQUAL_EQUAL: lambda a, b: 1 if a == b else 0,
+    TokenType.NOT_EQUAL: lambda a, b: 1 if a != b else 0,
+}
+
+
+# ============================================================================
+# OTIMIZAÇÃO: DOBRAMENTO DE CONSTANTES E RAMOS MORTOS
+# ============================================================================
+# Passo entre o parser e o compilador: lê uma SyntaxTree e monta outra,
+# menor, com o mesmo comportamento.
+# - Operações entre valores conhecidos viram um nó CONSTANT
+#   (ex: "2 * 3 + 1" -> 7; a precedência já está na forma da árvore)
+# - Variáveis com valor conhecido (atribuído a partir de constantes) são
+#   trocadas pelo valor (ex: "int x = 10" ... "x >= 5" -> 1); os valores
+#   ficam por slot, o número resolvido pelo parser
+# - if com condição conhecida: fica só o ramo que será executado
+# Depois de um if com condição desconhecida, uma variável só continua
+# conhecida se os dois ramos terminam com o mesmo valor nela.
+# Divisões por zero não são calculadas (o erro continua na execução).
+# Expressões e ifs aninhados são percorridos com pilhas, sem recursão.
+# ============================================================================
+class ConstantFolder:
+    # Construtor - recebe a árvore original (com os tokens) e os tipos já
+    # inferidos para ela (inferidos aqui, se não vierem)
+    def __init__(self, tree: SyntaxTree, types: Optional[TypeChecker] = None) -> None:
+        # Árvore original e árvore otimizada (mesmos tokens e símbolos)
+        self.source = tree
+        self.tokens = tree.tokens
+        self.tree = SyntaxTree(tree.tokens, tree.symbols)
+        # Tipos da árvore original (os slots continuam com os mesmos tipos)
+        self.types = types if types is not None else TypeChecker(tree).check()
+        # Conversão feita ao guardar cada slot (pelo tipo da variável)
+        self.conversions = [VALUE_CONVERSIONS[VALUE_TYPES.index(name)] for name in self.types.type_names()]
+        # Valor conhecido de cada slot (slot ausente = desconhecido)
+        self.values: dict[int, object] = {}
+        # Alterações em self.values dentro do ramo atual: (slot, valor anterior)
+        self._journal: Optional[list] = None
+        # Estatísticas: operações calculadas, ifs resolvidos e nós removidos
+        self.folded = 0
+        self.dead_branches = 0
+        self.removed = 0
+
+    # Otimiza o programa inteiro e retorna a árvore nova
+    def fold(self) -> SyntaxTree:
+        """Monta a árvore otimizada e conta quantos nós foram removidos"""
+        for statement in self.source.children(0):
+            node = self._statement(statement)
+            # Declarações eliminadas (ex: if sempre falso sem else) somem
+            if node >= 0:
+                self.tree.add_statement(node)
+        self.removed = len(self.source) - len(self.tree)
+        return self.tree
+
+    # Otimiza uma declaração (retorna o nó novo, ou -1 se ela sumiu)
+    # (ifs aninhados usam uma pilha explícita, não recursão: a profundidade
+    # só é limitada pela memória)
+    def _statement(self, node: int) -> int:
+        # Ifs cujos ramos ainda estão sendo otimizados, do mais externo ao
+        # mais interno: [token, condição nova, ramo senão, diário de fora,
+        # nó novo do ramo então, valores do ramo então (None = ainda nele)]
+        pending: list = []
+        while True:
+            # Desce até uma declaração que não é um if com condição desconhecida
+            node = self._enter(node, pending)
+            result = self._simple_statement(node) if node >= 0 else -1
+            # Sobe entregando o resultado ao if que o esperava
+            while pending:
+                frame = pending[-1]
+                values = self._leave_branch(frame[3])
+                if frame[5] is None:
+                    # Terminou o ramo então: passa para o ramo senão
+                    frame[4], frame[5] = result, values
+                    frame[3] = self._enter_branch()
+                    node = frame[2]
+                    break
+                # Terminou o ramo senão: o if está pronto
+                pending.pop()
+                result = self._finish_if(frame, result, values)
+            else:
+                return result
+
+    # Desce pelos ifs a partir de 'node': um if com condição conhecida é
+    # trocado pelo ramo executado, e um com condição desconhecida é empilhado
+    # em 'pending' (a descida continua no ramo então). Retorna a primeira
+    # declaração que não é um if (-1 se o ramo executado não existe)
+    def _enter(self, node: int, pending: list) -> int:
+        source = self.source
+        while node >= 0 and source.kind(node) is NodeKind.IF:
+            condition, then_branch, *else_branch = source.children(node)
+            else_branch = else_branch[0] if else_branch else -1
+            size = len(self.tree)
+            new_condition, constant = self._expression(condition)
+            # Condição conhecida: só o ramo executado fica (os slots e tipos das
+            # variáveis do ramo morto continuam na tabela de símbolos)
+            if constant is not None:
+                self.dead_branches += 1
+                # Descarta os nós criados para a condição
+                self.tree.truncate(size)
+                node = then_branch if constant else else_branch
+                continue
+            # Condição desconhecida: otimiza cada ramo separadamente
+            token = source.token_index[node]
+            pending.append([token, new_condition, else_branch, self._enter_branch(), -1, None])
+            node = then_branch
+        return node
+
+    # Otimiza uma declaração que não é um if
+    def _simple_statement(self, node: int) -> int:
+        source = self.source
+        kind = source.kind(node)
+        token = source.token_index[node]
+        if kind is NodeKind.VAR_DECL or kind is NodeKind.ASSIGN:
+            name, value = source.children(node)
+            slot = source.slots[name]
+            new_value, constant = self._expression(value)
+            # Valor guardado (convertido para o tipo da variável)
+            if constant is not None:
+                try:
+                    constant = self.conversions[slot](constant)
+                except (OverflowError, ValueError):
+                    # Ex: int(inf) - fica para a execução
+                    constant = None
+            self._assign(slot, constant)
+            new_name = self.tree.add(NodeKind.IDENTIFIER, source.token_index[name], (), slot)
+            return self.tree.add(kind, token, (new_name, new_value))
+        if kind is NodeKind.PRINT:
+            value, _ = self._expression(source.first_child[node])
+            return self.tree.add(kind, token, (value,))
+        # Declaração vazia (árvore já otimizada antes)
+        return -1
+
+    # Cria o if depois dos dois ramos otimizados
+    def _finish_if(self, frame: list, new_else: int, else_values: dict) -> int:
+        token, new_condition, _, _, new_then, then_values = frame
+        # Depois do if, só continua conhecido o que os dois ramos concordam
+        for slot in then_values.keys() | else_values.keys():
+            before = self.values.get(slot)
+            first = then_values.get(slot, before)
+            second = else_values.get(slot, before)
+            # (repr distingue 0.0 de -0.0, que são == mas imprimem diferente)
+            same = first is not None and type(first) is type(second) and repr(first) == repr(second)
+            self._assign(slot, first if same else None)
+        # Um if precisa de um ramo 'então' (vazio, se ele foi eliminado)
+        if new_then < 0:
+            new_then = self.tree.add(NodeKind.EMPTY, -1, ())
+        children = (new_condition, new_then) if new_else < 0 else (new_condition, new_then, new_else)
+        return self.tree.add(NodeKind.IF, token, children)
+
+    # Começa um ramo de if: guarda o diário do ramo de fora e começa um novo
+    # (retorna o diário de fora, para _leave_branch)
+    def _enter_branch(self) -> Optional[list]:
+        outer = self._journal
+        self._journal = []
+        return outer
+
+    # Termina um ramo de if: desfaz o que ele mudou nos valores conhecidos e
+    # retorna os valores dos slots alterados no fim do ramo
+    def _leave_branch(self, outer: Optional[list]) -> dict:
+        journal = self._journal
+        # Valores no fim do ramo (dos slots que ele alterou)
+        values = {slot: self.values.get(slot) for slot, _ in journal}
+        # Desfaz as alterações (da última para a primeira)
+        for slot, previous in reversed(journal):
+            if previous is None:
+                self.values.pop(slot, None)
+            else:
+                self.values[slot] = previous
+        self._journal = outer
+        return values
+
+    # Atualiza o valor conhecido de um slot (None = desconhecido)
+    def _assign(self, slot: int, value) -> None:
+        # Dentro de um ramo, anota o valor anterior (para desfazer depois)
+        if self._journal is not None:
+            self._journal.append((slot, self.values.get(slot)))
+        if value is None:
+            self.values.pop(slot, None)
+        else:
+            self.values[slot] = value
+
+    # Otimiza uma expressão: retorna (nó novo, valor) - se o valor é
+    # conhecido, o nó ainda não foi criado (-1) e quem usa decide
+    def _expression(self, node: int) -> tuple:
+        source = self.source
+        kinds = source.kinds
+        token_index = source.token_index
+        slots = source.slots
+        tokens = self.tokens
+        tree = self.tree
+        # Pilha de (nó novo, valor conhecido, token do número original)
+        stack = []
+        for child in source.postorder(node):
+            kind = NODE_KINDS[kinds[child]]
+            token = token_index[child]
+            if kind is NodeKind.NUMBER:
+                try:
+                    stack.append((-1, number_value(tokens.lexeme(token)), token))
+                except ValueError:
+                    # Número com dígitos demais: fica como está (a
+                    # compilação dá o erro, com a posição)
+                    stack.append((tree.add(NodeKind.NUMBER, token, ()), None, -1))
+            elif kind is NodeKind.CONSTANT:
+                stack.append((-1, source.constants[token], -1))
+            elif kind is NodeKind.IDENTIFIER:
+                slot = slots[child]
+                value = self.values.get(slot)
+                if value is not None:
+                    stack.append((-1, value, -1))
+                else:
+                    stack.append((tree.add(NodeKind.IDENTIFIER, token, (), slot), None, -1))
+            else:
+                right = stack.pop()
+                left = stack.pop()
+                # Os dois lados conhecidos: calcula agora
+                if left[1] is not None and right[1] is not None:
+                    value = self._evaluate(tokens.type_at(token), left[1], right[1])
+                    if value is not None:
+                        self.folded += 1
+                        stack.append((-1, value, -1))
+                        continue
+                # Senão, cria a operação com os dois lados
+                operation = tree.add(NodeKind.BINARY, token, (self._materialize(left), self._materialize(right)))
+                stack.append((operation, None, -1))
+        node, value, token = stack.pop()
+        if value is None:
+            return node, None
+        return self._materialize((node, value, token)), value
+
+    # Calcula uma operação entre dois valores (None se não pode ser calculada)
+    def _evaluate(self, operator: TokenType, a, b):
+        # Divisão por zero fica para a execução (que dá o erro)
+        if operator is TokenType.SLASH and b == 0:
+            return None
+        try:
+            value = BINARY_FUNCTIONS[operator](a, b)
+        except OverflowError:
+            return None
+        # Inteiro grande demais fica para a execução (não caberia num float
+        # nem poderia ser impresso pela tabela de constantes)
+        if type(value) is int and value.bit_length() > FOLD_INT_BITS:
+            return None
+        return value
+
+    # Cria o nó de um valor conhecido (o número original, se não mudou)
+    def _materialize(self, item: tuple) -> int:
+        node, value, token = item
+        if node >= 0:
+            return node
+        if token >= 0:
+            return self.tree.add(NodeKind.NUMBER, token, ())
+        return self.tree.add_constant(value)
+
+
+# ============================================================================
+# ERRO DE EXECUÇÃO
+# ============================================================================
+# Exceção lançada pela máquina virtual (ex: divisão por zero)
+# ============================================================================
+class ExecutionError(Exception):
+    def __str__(self) -> str:
+        # Exemplo: "Erro de execução: Divisão por zero"
+        return f"Erro de execução: {self.args[0]}"
+
+
+# ============================================================================
+# INSTRUÇÕES DA MÁQUINA VIRTUAL (BYTECODE)
+# ============================================================================
+# A máquina é de pilha: os operandos são empilhados e cada operação usa os
+# do topo. Toda instrução ocupa 2 posições no vetor de código: o código da
+# instrução e o argumento (0 quando não usa).
+# Só a divisão é especializada pelo tipo do resultado (já inferido pelo
+# TypeChecker): a divisão int descarta a parte fracionária. Soma, subtração
+# e multiplicação fazem o mesmo nos dois tipos (numa operação float com um
+# lado int, a conversão desse lado é a que o próprio Python faz), então têm
+# uma instrução só. Guardar converte só quando o tipo do valor não é o da
+# variável (STORE_INT/STORE_FLOAT); senão é um STORE direto.
+# Exemplo: "float z = x + 1" (x int) ->
+#   LOAD_VAR 0        (empilha x)
+#   LOAD_CONST 0      (empilha 1)
+#   ADD               (desempilha os dois e empilha a soma)
+#   STORE_FLOAT 1     (desempilha, converte para float e guarda em z)
+# ============================================================================
+class OpCode(Enum):
+    LOAD_CONST = auto()      # Empilha constants[arg]
+    LOAD_VAR = auto()        # Empilha a variável do slot arg
+    STORE = auto()           # Guarda o topo no slot arg (já com o tipo da variável)
+    STORE_INT = auto()       # Guarda o topo no slot arg convertido para int
+    STORE_FLOAT = auto()     # Guarda o topo no slot arg convertido para float
+    ADD = auto()             # a + b
+    SUB = auto()             # a - b
+    MUL = auto()             # a * b
+    DIV_INT = auto()         # a / b (int: descarta a parte fracionária)
+    DIV_FLOAT = auto()       # a / b (float)
+    GT = auto()              # a > b  (1 ou 0)
+    GTE = auto()             # a >= b
+    LT = auto()              # a < b
+    LTE = auto()             # a <= b
+    EQ = auto()              # a == b
+    NE = auto()              # a != b
+    PRINT = auto()           # Imprime o topo
+    JUMP_IF_FALSE = auto()   # Desempilha; se for 0, pula para a posição arg
+    JUMP = auto()            # Pula para a posição arg
+    HALT = auto()            # Fim do programa
+
+
+# Código de cada instrução: OPCODES[código] -> OpCode
+OPCODES = tuple(OpCode)
+OPCODE_CODES = {op: code for code, op in enumerate(OPCODES)}
+
+# Instrução de cada operador binário: (tipo do token, tipo do resultado)
+# (comparações sempre resultam em int e servem para os dois tipos)
+BINARY_OPCODES = {
+    (TokenType.PLUS, INT_TYPE): OpCode.ADD,
+    (TokenType.PLUS, FLOAT_TYPE): OpCode.ADD,
+    (TokenType.MINUS, INT_TYPE): OpCode.SUB,
+    (TokenType.MINUS, FLOAT_TYPE): OpCode.SUB,
+    (TokenType.STAR, INT_TYPE): OpCode.MUL,
+    (TokenType.STAR, FLOAT_TYPE): OpCode.MUL,
+    (TokenType.SLASH, INT_TYPE): OpCode.DIV_INT,
+    (TokenType.SLASH, FLOAT_TYPE): OpCode.DIV_FLOAT,
+    (TokenType.GT, INT_TYPE): OpCode.GT,
+    (TokenType.GTE, INT_TYPE): OpCode.GTE,
+    (TokenType.LT, INT_TYPE): OpCode.LT,
+    (TokenType.LTE, INT_TYPE): OpCode.LTE,
+    (TokenType.EQUAL_EQUAL, INT_TYPE): OpCode.EQ,
+    (TokenType.NOT_EQUAL, INT_TYPE): OpCode.NE,
+}
+
+# Instrução que guarda convertendo para cada tipo (pelo código do tipo)
+CONVERSION_OPCODES = (OpCode.STORE_INT, OpCode.STORE_FLOAT)
+
+
+# ============================================================================
+# BYTECODE (PROGRAMA COMPILADO)
+# ============================================================================
+# Resultado da compilação:
+#   code       -> vetor de inteiros (instrução, argumento, instrução, ...)
+#   constants  -> valores dos números do programa (cada valor aparece uma vez)
+#   slot_names -> nome da variável de cada slot (as variáveis viram índices)
+#   slot_types -> tipo declarado de cada slot ("int", "float" ou None)
+# ============================================================================
+class Bytecode:
+    # Construtor - começa vazio (preenchido pelo BytecodeCompiler)
+    def __init__(self) -> None:
+        self.code = array("i")
+        self.constants: list = []
+        self.slot_names: list[str] = []
+        self.slot_types: list[Optional[str]] = []
+
+    # Número de instruções
+    def __len__(self) -> int:
+        return len(self.code) // 2
+
+    # Gera uma linha de texto por instrução (para depuração)
+    def disassemble(self) -> Iterator[str]:
+        code = self.code
+        for pc in range(0, len(code), 2):
+            op = OPCODES[code[pc]]
+            arg = code[pc + 1]
+            # Mostra o que o argumento significa (constante, variável, destino)
+            if op is OpCode.LOAD_CONST:
+                detail = f"{arg} ({self.constants[arg]!r})"
+            elif op in (OpCode.LOAD_VAR, OpCode.STORE, OpCode.STORE_INT, OpCode.STORE_FLOAT):
+                detail = f"{arg} ({self.slot_names[arg]})"
+            elif op in (OpCode.JUMP, OpCode.JUMP_IF_FALSE):
+                detail = f"-> {arg // 2}"
+            else:
+                detail = ""
+            yield f"{pc // 2:4d}  {op.name:<14} {detail}".rstrip()
+
+
+# ============================================================================
+# COMPILADOR PARA BYTECODE
+# ============================================================================
+# Percorre a árvore sintática (SyntaxTree) e gera o bytecode.
+# - Expressões: a pós-ordem da árvore (filhos antes do pai) já é a ordem
+#   de uma máquina de pilha (operandos antes da operação)
+# - Declarações: uma pilha de tarefas substitui a recursão (um if dentro de
+#   outro if não aumenta a pilha do Python)
+# - Variáveis: o slot de cada uma já vem resolvido pelo parser (tabela de
+#   símbolos da árvore); o compilador só copia o número
+# - Tipos: cada operação usa a instrução do tipo inferido (TypeChecker), e
+#   só os valores guardados com outro tipo usam um STORE que converte
+# ============================================================================
+class BytecodeCompiler:
+    # Construtor - recebe a árvore (com os tokens, para ler os lexemas) e
+    # os tipos inferidos para ela (inferidos aqui, se não vierem)
+    def __init__(self, tree: SyntaxTree, types: Optional[TypeChecker] = None) -> None:
+        self.tree = tree
+        self.tokens = tree.tokens
+        self.types = types if types is not None else TypeChecker(tree).check()
+        self.bytecode = Bytecode()
+        # Nome de cada slot vem da tabela de símbolos; o tipo, da inferência
+        self.bytecode.slot_names = list(tree.symbols.names)
+        self.bytecode.slot_types = self.types.type_names()
+        # Posição de cada constante: (tipo, valor) -> índice
+        self._constants: dict = {}
+
+    # Compila o programa inteiro e retorna o bytecode
+    def compile(self) -> Bytecode:
+        """Gera o bytecode de todas as declarações da árvore"""
+        tree = self.tree
+        kinds = tree.kinds
+        # Pilha de tarefas: um número é uma declaração a compilar; uma tupla é
+        # um ajuste de salto a fazer quando chegar a vez dela
+        tasks: list = list(reversed(list(tree.children(0))))
+        while tasks:
+            task = tasks.pop()
+            # Ajuste de salto pendente (fim de um ramo do if)
+            if isinstance(task, tuple):
+                self._finish_branch(task, tasks)
+                continue
+            kind = NODE_KINDS[kinds[task]]
+            if kind is NodeKind.VAR_DECL or kind is NodeKind.ASSIGN:
+                name, value = tree.children(task)
+                self._expression(value)
+                self._store(name, value)
+            elif kind is NodeKind.PRINT:
+                self._expression(tree.first_child[task])
+                self._emit(OpCode.PRINT)
+            elif kind is NodeKind.EMPTY:
+                # Declaração vazia (ramo eliminado): não gera instruções
+                continue
+            elif kind is NodeKind.IF:
+                condition, then_branch, *else_branch = tree.children(task)
+                self._expression(condition)
+                # Salto para depois do ramo 'então' (o destino é ajustado depois)
+                jump = self._emit(OpCode.JUMP_IF_FALSE)
+                # Depois do ramo 'então', ajusta os saltos (ver _finish_branch)
+                tasks.append(("then", jump, else_branch[0] if else_branch else -1))
+                tasks.append(then_branch)
+        self._emit(OpCode.HALT)
+        return self.bytecode
+
+    # Ajusta os saltos de um if quando um dos ramos termina
+    def _finish_branch(self, task: tuple, tasks: list) -> None:
+        step, jump, else_branch = task
+        code = self.bytecode.code
+        # Fim do ramo 'então' de um if com 'else': pula o ramo 'senão'
+        if step == "then" and else_branch >= 0:
+            skip = self._emit(OpCode.JUMP)
+            code[jump + 1] = len(code)
+            tasks.append(("else", skip, -1))
+            tasks.append(else_branch)
+        else:
+            # O salto pendente vem para cá (fim do if)
+            code[jump + 1] = len(code)
+
+    # Compila uma expressão (operandos antes da operação)
+    def _expression(self, node: int) -> None:
+        tree = self.tree
+        kinds = tree.kinds
+        token_index = tree.token_index
+        tokens = self.tokens
+        node_types = self.types.node_types
+        coercions = self.types.coercions
+        for child in tree.postorder(node):
+            kind = NODE_KINDS[kinds[child]]
+            if kind is NodeKind.NUMBER or kind is NodeKind.CONSTANT:
+                if kind is NodeKind.NUMBER:
+                    value = self._number(token_index[child], coercions[child])
+                else:
+                    value = tree.constants[token_index[child]]
+                    # Constante que vai virar float: já entra na tabela como float
+                    if coercions[child]:
+                        value = float(value)
+                self._emit(OpCode.LOAD_CONST, self._constant(value))
+            elif kind is NodeKind.IDENTIFIER:
+                self._emit(OpCode.LOAD_VAR, self._slot(child))
+            else:
+                # (o lado int de uma operação float é convertido pela própria
+                # operação do Python, do mesmo jeito que float() faria)
+                self._emit(BINARY_OPCODES[tokens.type_at(token_index[child]), node_types[child]])
+
+    # Guarda o valor do topo da pilha na variável da declaração/atribuição
+    # (convertendo, se o valor não tem o tipo da variável)
+    def _store(self, name: int, value: int) -> None:
+        slot = self._slot(name)
+        slot_type = self.types.slot_types[slot]
+        if self.types.node_types[value] != slot_type:
+            self._emit(CONVERSION_OPCODES[slot_type], slot)
+        else:
+            self._emit(OpCode.STORE, slot)
+
+    # Retorna o valor de um número do código (convertido para float, se
+    # coerce) - erro semântico se o Python não consegue converter
+    def _number(self, token: int, coerce: bool):
+        lexeme = self.tokens.lexeme(token)
+        try:
+            value = number_value(lexeme)
+            return float(value) if coerce else value
+        except (OverflowError, ValueError):
+            # Ex: inteiro com milhares de dígitos, ou grande demais para float
+            line, column = self.tokens.position(token)
+            shown = lexeme if len(lexeme) <= 20 else lexeme[:20] + "..."
+            raise SemanticError(f"Número '{shown}' grande demais", line, column) from None
+
+    # Retorna o slot de uma variável (resolvido pelo parser)
+    def _slot(self, node: int) -> int:
+        slot = self.tree.slots[node]
+        # Uso antes da declaração (o parser já registrou o erro semântico)
+        if slot < 0:
+            token = self.tree.token_index[node]
+            line, column = self.tokens.position(token)
+            raise SemanticError(f"Variável '{self.tokens.lexeme(token)}' usada antes de ser declarada",
+                                line, column)
+        return slot
+
+    # Retorna a posição de um valor na tabela de constantes
+    def _constant(self, value) -> int:
+        # (o tipo faz parte da chave: 1 e 1.0 são constantes diferentes; e o
+        # texto também: 0.0 e -0.0 são iguais com ==, mas imprimem diferente)
+        key = (type(value), repr(value))
+        index = self._constants.get(key)
+        if index is None:
+            index = self._constants[key] = len(self.bytecode.constants)
+            self.bytecode.constants.append(value)
+        return index
+
+    # Acrescenta uma instrução e retorna a posição dela no vetor de código
+    def _emit(self, op: OpCode, arg: int = 0) -> int:
+        code = self.bytecode.code
+        position = len(code)
+        code.append(OPCODE_CODES[op])
+        code.append(arg)
+        return position
+
+
+# ============================================================================
+# MÁQUINA VIRTUAL
+# ============================================================================
+# Executa o bytecode com um laço de despacho: lê a instrução, executa e
+# passa para a próxima. Os valores ficam numa pilha (lista do Python) e as
+# variáveis num vetor de slots (acesso por índice, sem buscar nomes).
+# ============================================================================
+class VirtualMachine:
+    # Construtor - recebe o bytecode e onde o print escreve
+    def __init__(self, bytecode: Bytecode, output=None) -> None:
+        self.bytecode = bytecode
+        self.output = output if output is not None else sys.stdout
+        # Valor inicial de cada variável (0 ou 0.0, pelo tipo da variável)
+        self.slots = [0.0 if slot_type == "float" else 0 for slot_type in bytecode.slot_types]
+        # Quantas instruções foram executadas na última execução
+        self.executed = 0
+
+    # Executa o programa e retorna quantas instruções foram executadas
+    def run(self) -> int:
+        """Laço de despacho: uma iteração por instrução"""
+        # Guarda tudo em variáveis locais (acesso mais rápido dentro do laço)
+        code = self.bytecode.code
+        constants = self.bytecode.constants
+        slots = self.slots
+        write = self.output.write
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        codes = OPCODE_CODES
+        LOAD_CONST = codes[OpCode.LOAD_CONST]
+        LOAD_VAR = codes[OpCode.LOAD_VAR]
+        STORE = codes[OpCode.STORE]
+        STORE_INT = codes[OpCode.STORE_INT]
+        STORE_FLOAT = codes[OpCode.STORE_FLOAT]
+        ADD = codes[OpCode.ADD]
+        SUB = codes[OpCode.SUB]
+        MUL = codes[OpCode.MUL]
+        DIV_INT = codes[OpCode.DIV_INT]
+        DIV_FLOAT = codes[OpCode.DIV_FLOAT]
+        GT = codes[OpCode.GT]
+        GTE = codes[OpCode.GTE]
+        LT = codes[OpCode.LT]
+        LTE = codes[OpCode.LTE]
+        EQ = codes[OpCode.EQ]
+        NE = codes[OpCode.NE]
+        PRINT = codes[OpCode.PRINT]
+        JUMP_IF_FALSE = codes[OpCode.JUMP_IF_FALSE]
+        JUMP = codes[OpCode.JUMP]
+        HALT = codes[OpCode.HALT]
+
+        pc = 0
+        executed = 0
+        try:
+            while True:
+                op = code[pc]
+                executed += 1
+                # As instruções mais comuns são testadas primeiro
+                if op == LOAD_VAR:
+                    push(slots[code[pc + 1]])
+                elif op == LOAD_CONST:
+                    push(constants[code[pc + 1]])
+                elif op == STORE:
+                    slots[code[pc + 1]] = pop()
+                # Aritmética: o tipo já foi decidido na compilação (nenhuma
+                # instrução testa o tipo dos operandos)
+                elif op == ADD:
+                    b = pop()
+                    stack[-1] += b
+                elif op == SUB:
+                    b = pop()
+                    stack[-1] -= b
+                elif op == MUL:
+                    b = pop()
+                    stack[-1] *= b
+                elif op == DIV_INT:
+                    b = pop()
+                    if not b:
+                        raise ExecutionError("Divisão por zero")
+                    # Arredonda para zero (o // do Python arredonda para baixo)
+                    a = stack[-1]
+                    quotient = abs(a) // abs(b)
+                    stack[-1] = quotient if (a < 0) == (b < 0) else -quotient
+                elif op == DIV_FLOAT:
+                    b = pop()
+                    if not b:
+                        raise ExecutionError("Divisão por zero")
+                    stack[-1] /= b
+                elif op == STORE_INT:
+                    value = pop()
+                    # int(inf) e int(nan) não existem
+                    if not isfinite(value):
+                        raise ExecutionError(f"Valor {value} não pode ser guardado num int")
+                    slots[code[pc + 1]] = int(value)
+                elif op == STORE_FLOAT:
+                    slots[code[pc + 1]] = float(pop())
+                elif op == JUMP_IF_FALSE:
+                    if not pop():
+                        pc = code[pc + 1]
+                        continue
+                elif op == JUMP:
+                    pc = code[pc + 1]
+                    continue
+                elif op == PRINT:
+                    write(f"{pop()}\n")
+                elif op == GT:
+                    b = pop()
+                    stack[-1] = 1 if stack[-1] > b else 0
+                elif op == GTE:
+                    b = pop()
+                    stack[-1] = 1 if stack[-1] >= b else 0
+                elif op == LT:
+                    b = pop()
+                    stack[-1] = 1 if stack[-1] < b else 0
+                elif op == LTE:
+                    b = pop()
+                    stack[-1] = 1 if stack[-1] <= b else 0
+                elif op == EQ:
+                    b = pop()
+                    stack[-1] = 1 if stack[-1] == b else 0
+                elif op == NE:
+                    b = pop()
+                    stack[-1] = 1 if stack[-1] != b else 0
+                elif op == HALT:
+                    break
+                pc += 2
+        except (OverflowError, ValueError) as error:
+            # Valor que o Python não consegue converter (ex: inteiro grande
+            # demais para virar float ou para ser impresso)
+            raise ExecutionError(f"Valor fora do limite ({error})") from None
+        self.executed = executed
+        return executed
+
+
+# ============================================================================
+# CORES PARA TERMINAL
+# ============================================================================
+# Define códigos ANSI para colorir a saída do terminal
+# ============================================================================
+class Colors:
+    HEADER = '\033[95m'    # Cor rosa/magenta para cabeçalhos
     BLUE = '\033[94m'      # Cor azul
     CYAN = '\033[96m'      # Cor ciano
     GREEN = '\033[92m'     # Cor verde
@@ -870,7 +5164,10 @@ def print_token(token, index):
 # Imprime estatísticas dos tokens encontrados
 def print_statistics(tokens):
     # Conta quantos tokens de cada tipo foram encontrados
-    token_counts = Counter(token.type for token in tokens)
+    # (aceita também um Counter já pronto, usado no modo fluxo)
+    token_counts = tokens if isinstance(tokens, Counter) else Counter(token.type for token in tokens)
+    # Total de tokens (soma das contagens)
+    total = sum(token_counts.values())
     
     # Imprime cabeçalho das estatísticas
     print(f"\n{Colors.HEADER}{Colors.BOLD}📊 ESTATÍSTICAS DOS TOKENS{Colors.ENDC}")
@@ -880,18 +5177,19 @@ def print_statistics(tokens):
     # Para cada tipo de token, ordenado por quantidade (mais comum primeiro)
     for token_type, count in token_counts.most_common():
         # Calcula a porcentagem deste tipo em relação ao total
-        percentage = (count / len(tokens)) * 100
+        percentage = (count / total) * 100
         # Cria uma barra visual (cada 2% = 1 caractere █)
         bar = "█" * int(percentage / 2)
         # Imprime: nome do tipo, quantidade, porcentagem e barra visual
         print(f"  {token_type.name:<12} {count:3d} tokens ({percentage:5.1f}%) {bar}")
     
     # Imprime o total de tokens encontrados
-    print(f"\n{Colors.GREEN}{Colors.BOLD}Total: {len(tokens)} tokens encontrados{Colors.ENDC}")
+    print(f"\n{Colors.GREEN}{Colors.BOLD}Total: {total} tokens encontrados{Colors.ENDC}")
 
 
 # Imprime resumo do arquivo ou entrada interativa
-def print_summary(source_path=None, is_interactive=False):
+# (com uma CompilationUnit, usa o resumo dela em vez de ler o arquivo)
+def print_summary(source_path=None, is_interactive=False, unit=None):
     # Imprime cabeçalho do resumo
     print(f"\n{Colors.HEADER}{Colors.BOLD}📄 ENTRADA ANALISADA{Colors.ENDC}")
     # Imprime linha de separação
@@ -905,73 +5203,79 @@ def print_summary(source_path=None, is_interactive=False):
         # Se é arquivo, imprime o nome do arquivo
         print(f"  Arquivo: {Colors.WARNING}{source_path}{Colors.ENDC}")
         try:
-            # Tenta abrir o arquivo para ler informações
-            with open(source_path, 'r', encoding='utf-8') as f:
-                # Lê todas as linhas do arquivo
-                lines = f.readlines()
+            # Se o arquivo já foi lido para uma unidade, usa o resumo dela
+            if unit is not None:
+                line_count, char_count = unit.summary()
+            else:
+                # Senão, abre o arquivo para ler informações
+                with open(source_path, 'r', encoding='utf-8') as f:
+                    # Conta linhas e caracteres lendo uma linha por vez
+                    # (não guarda o arquivo inteiro na memória)
+                    line_count = 0
+                    char_count = 0
+                    for line in f:
+                        line_count += 1
+                        char_count += len(line)
             # Imprime o número de linhas
-            print(f"  Linhas: {Colors.GREEN}{len(lines)}{Colors.ENDC}")
+            print(f"  Linhas: {Colors.GREEN}{line_count}{Colors.ENDC}")
             # Imprime o tamanho total (soma do tamanho de todas as linhas)
-            print(f"  Tamanho: {Colors.GREEN}{sum(len(line) for line in lines)} caracteres{Colors.ENDC}")
+            print(f"  Tamanho: {Colors.GREEN}{char_count} caracteres{Colors.ENDC}")
         except:
             # Se der erro ao ler o arquivo, ignora (não quebra o programa)
             pass
 
 
-# Obtém entrada do usuário no modo interativo
-def get_user_input():
-    # Imprime instruções para o usuário
-    print(f"\n{Colors.CYAN}{Colors.BOLD}💬 Digite seu código (ou cole um trecho):{Colors.ENDC}")
-    # Imprime dicas de uso
-    print(f"{Colors.WARNING}💡 Dicas:{Colors.ENDC}")
-    print(f"  • Digite 'SAIR' para encerrar")
-    print(f"  • Digite 'AJUDA' para ver exemplos de sintaxe")
-    print(f"  • Use Ctrl+C para sair a qualquer momento")
-    # Imprime linha de separação
-    print(f"{Colors.CYAN}{'─' * 60}{Colors.ENDC}")
-    
-    # Lista para armazenar as linhas digitadas
-    lines = []
-    # Imprime prompt (>>>) e não quebra linha (end="")
-    print(f"{Colors.GREEN}>>> {Colors.ENDC}", end="", flush=True)
-    
+# Imprime a árvore sintática (um nó por linha, com recuo pela profundidade)
+def print_tree(tree):
+    # Imprime cabeçalho da árvore
+    print(f"\n{Colors.HEADER}{Colors.BOLD}🌳 ÁRVORE SINTÁTICA{Colors.ENDC}")
+    print(f"{Colors.CYAN}{'─' * 80}{Colors.ENDC}")
+    # Percorre em pré-ordem (sem recursão)
+    for node, depth in tree.walk():
+        # Lexema do token do nó (a raiz não tem)
+        lexeme = tree.lexeme(node)
+        text = f" {Colors.WARNING}'{lexeme}'{Colors.ENDC}" if lexeme is not None else ""
+        print(f"  {'  ' * depth}{Colors.GREEN}{tree.kind(node).name}{Colors.ENDC}{text}")
+    # Imprime o total de nós
+    print(f"\n{Colors.GREEN}{Colors.BOLD}Total: {len(tree)} nós ({tree.nbytes()} bytes){Colors.ENDC}")
+
+
+# Compila e executa o programa, imprimindo a saída e o desempenho da máquina virtual
+# (optimize=True: otimiza a árvore antes de compilar e mostra o ganho)
+def print_execution(unit, show_bytecode=False, optimize=False):
+    # Imprime cabeçalho da execução
+    print(f"\n{Colors.HEADER}{Colors.BOLD}▶️  EXECUÇÃO{Colors.ENDC}")
+    print(f"{Colors.CYAN}{'─' * 80}{Colors.ENDC}")
     try:
-        # Loop infinito para ler linhas
-        while True:
-            # Lê uma linha do usuário
-            line = input()
-            # Se digitou 'SAIR' (ignorando maiúsculas/minúsculas e espaços)
-            if line.strip().upper() == "SAIR":
-                # Se já digitou código, retorna o código digitado
-                if lines:
-                    # Junta todas as linhas com quebra de linha
-                    return "\n".join(lines)
-                # Se não digitou nada, retorna None (sai do programa)
-                return None
-            # Se digitou 'AJUDA'
-            elif line.strip().upper() == "AJUDA":
-                # Mostra a ajuda com exemplos
-                print_help()
-                # Imprime o prompt novamente
-                print(f"{Colors.GREEN}>>> {Colors.ENDC}", end="", flush=True)
-                # Continua o loop (não adiciona 'AJUDA' ao código)
-                continue
-            # Se digitou linha vazia, termina a entrada
-            elif line.strip() == "":
-                # Sai do loop
-                break
-            else:
-                # Se digitou código normal, adiciona à lista
-                lines.append(line)
-                # Imprime o prompt novamente para a próxima linha
-                print(f"{Colors.GREEN}>>> {Colors.ENDC}", end="", flush=True)
-    except KeyboardInterrupt:
-        # Se o usuário pressionou Ctrl+C, sai graciosamente
-        print(f"\n{Colors.YELLOW}👋 Saindo...{Colors.ENDC}")
-        return None
-    
-    # Se chegou aqui, junta todas as linhas e retorna (ou None se não digitou nada)
-    return "\n".join(lines) if lines else None
+        # Compila a árvore para bytecode
+        bytecode = unit.bytecode(optimize)
+        # Se otimizou, compara com o bytecode sem otimização
+        if optimize:
+            folder = unit.optimization()
+            before = len(unit.bytecode().code) // 2
+            print(f"  {Colors.YELLOW}Otimização: {folder.folded} operações calculadas, "
+                  f"{folder.dead_branches} ifs resolvidos, {folder.removed} nós removidos; "
+                  f"{before} -> {len(bytecode.code) // 2} instruções{Colors.ENDC}")
+            print(f"{Colors.CYAN}{'─' * 80}{Colors.ENDC}")
+        # Se pediu, mostra as instruções geradas
+        if show_bytecode:
+            for line in bytecode.disassemble():
+                print(f"  {Colors.BLUE}{line}{Colors.ENDC}")
+            print(f"{Colors.CYAN}{'─' * 80}{Colors.ENDC}")
+        # Executa medindo o tempo (a saída dos prints vai direto para o terminal)
+        sys.stdout.flush()
+        start = time.perf_counter()
+        with unit.metrics.phase("run"):
+            executed = VirtualMachine(bytecode).run()
+        elapsed = time.perf_counter() - start
+    except (SemanticError, ExecutionError) as e:
+        # Se deu erro na compilação ou na execução, imprime o erro
+        print(f"{Colors.RED}{Colors.BOLD}❌ {str(e)}{Colors.ENDC}")
+        return
+    # Imprime quantas instruções foram executadas e a velocidade
+    rate = executed / elapsed if elapsed > 0 else 0
+    print(f"\n{Colors.GREEN}{Colors.BOLD}✅ {executed} instruções em {elapsed * 1000:.3f} ms "
+          f"({rate:,.0f} instruções/s){Colors.ENDC}")
 
 
 # Imprime ajuda com exemplos de sintaxe
@@ -1002,18 +5306,78 @@ def print_help():
         print(f"  {Colors.GREEN}{example}{Colors.ENDC}")
 
 
+# Imprime o resultado da análise sintática a partir dos erros encontrados
+# (pode receber parser.iter_errors(): cada erro é impresso assim que aparece)
+def print_parse_result(errors):
+    # Imprime cabeçalho da análise sintática
+    print(f"\n{Colors.HEADER}{Colors.BOLD}📐 ANÁLISE SINTÁTICA{Colors.ENDC}")
+    print(f"{Colors.CYAN}{'─' * 80}{Colors.ENDC}")
+
+    # Quantidade de erros impressos
+    error_count = 0
+    try:
+        # Para cada erro, na ordem em que foi encontrado
+        for error in errors:
+            # No primeiro erro, imprime o cabeçalho de erros
+            if error_count == 0:
+                print(f"{Colors.RED}{Colors.BOLD}❌ ERROS SINTÁTICOS ENCONTRADOS:{Colors.ENDC}")
+            error_count += 1
+            # Imprime a mensagem do erro
+            print(f"{Colors.RED}  {str(error)}{Colors.ENDC}")
+        # Se a análise foi bem-sucedida (sem erros)
+        if error_count == 0:
+            # Imprime mensagem de sucesso
+            print(f"{Colors.GREEN}{Colors.BOLD}✅ Análise sintática concluída com sucesso!{Colors.ENDC}")
+    except SyntaxError as e:
+        # Se lançou exceção de erro sintático, imprime o erro
+        print(f"{Colors.RED}{Colors.BOLD}❌ ERRO SINTÁTICO:{Colors.ENDC}")
+        print(f"{Colors.RED}{str(e)}{Colors.ENDC}")
+
+
+# Imprime o aviso de que a análise parou no limite de erros (--max-erros)
+def print_error_limit(parser):
+    if parser.stopped:
+        print(f"{Colors.YELLOW}⚠️  Análise interrompida no limite de erros (--max-erros={parser.max_errors}): "
+              f"o resto do código não foi analisado{Colors.ENDC}")
+
+
+# Imprime o resultado da análise semântica (feita junto com a sintática)
+# (warnings: avisos da inferência de tipos, que não impedem a execução)
+def print_semantic_result(errors, warnings=()):
+    # Imprime cabeçalho da análise semântica
+    print(f"\n{Colors.HEADER}{Colors.BOLD}🧠 ANÁLISE SEMÂNTICA{Colors.ENDC}")
+    print(f"{Colors.CYAN}{'─' * 80}{Colors.ENDC}")
+    # Se não há erros, imprime os avisos e a mensagem de sucesso
+    if not errors:
+        for warning in warnings:
+            print(f"{Colors.YELLOW}  ⚠️  {str(warning)}{Colors.ENDC}")
+        print(f"{Colors.GREEN}{Colors.BOLD}✅ Análise semântica concluída com sucesso!{Colors.ENDC}")
+        return
+    # Senão, imprime cada erro
+    print(f"{Colors.RED}{Colors.BOLD}❌ ERROS SEMÂNTICOS ENCONTRADOS:{Colors.ENDC}")
+    for error in errors:
+        print(f"{Colors.RED}  {str(error)}{Colors.ENDC}")
+
+
 # Analisa o código fonte (análise léxica e sintática)
-def analyze_code(source_code, is_interactive=False, show_tokens=True):
+# (pode receber uma CompilationUnit pronta, ex: de um arquivo já lido)
+# (show_tree=True: imprime também a árvore sintática, se não houver erros)
+# (run=True: compila e executa o programa, se não houver erros)
+# (optimize=True: otimiza antes de compilar; a árvore mostrada é a otimizada)
+def analyze_code(source_code, is_interactive=False, show_tokens=True, engine="classico", unit=None,
+                 show_tree=False, run=False, show_bytecode=False, optimize=False):
+    # Cria a unidade de compilação sobre o código, se não veio uma pronta
+    if unit is None:
+        unit = CompilationUnit(source_code, engine=engine)
     # Se deve mostrar os tokens, imprime cabeçalho
     if show_tokens:
         print(f"\n{Colors.HEADER}{Colors.BOLD}🔤 TOKENS ENCONTRADOS{Colors.ENDC}")
         print(f"{Colors.CYAN}{'─' * 80}{Colors.ENDC}")
 
     try:
-        # Cria um scanner a partir da string de código
-        scanner = Scanner.from_string(source_code)
-        # Converte o scanner em lista de tokens (lê todos os tokens)
-        tokens = list(scanner)
+        # Lê todos os tokens uma única vez para um buffer compacto (os objetos
+        # Token só são criados na hora de imprimir cada um)
+        tokens = unit.tokens()
         
         # Se não encontrou nenhum token
         if not tokens:
@@ -1027,103 +5391,654 @@ def analyze_code(source_code, is_interactive=False, show_tokens=True):
             for i, token in enumerate(tokens, 1):
                 # i começa em 1 (primeiro token é 1, não 0)
                 print_token(token, i)
-            # Imprime estatísticas dos tokens
-            print_statistics(tokens)
+            # Imprime estatísticas dos tokens (contagem feita direto nos códigos)
+            print_statistics(tokens.count_types())
         
         # ====================================================================
         # ANÁLISE SINTÁTICA
         # ====================================================================
-        # Imprime cabeçalho da análise sintática
-        print(f"\n{Colors.HEADER}{Colors.BOLD}📐 ANÁLISE SINTÁTICA{Colors.ENDC}")
-        print(f"{Colors.CYAN}{'─' * 80}{Colors.ENDC}")
+        # O parser usa o mesmo buffer de tokens (o código não é varrido de novo)
+        # A árvore (e a inferência de tipos sobre ela) só é montada se alguma
+        # opção precisa dela; a análise que monta a árvore já serve de parse()
+        build_tree = show_tree or run or show_bytecode or optimize
+        if build_tree:
+            unit.syntax_tree()
+        parser = unit.parse()
+        print_parse_result(parser.errors)
+        unit.metrics.count_errors("syntax", len(parser.errors))
+        # Sem erros sintáticos, mostra os erros semânticos (mesmo passo) e,
+        # sem erros semânticos, os avisos da inferência de tipos (se há árvore)
+        if not parser.errors:
+            warnings = unit.types().warnings if build_tree and not parser.semantic_errors else ()
+            print_semantic_result(parser.semantic_errors, warnings)
+            unit.metrics.count_errors("semantic", len(parser.semantic_errors))
+            unit.metrics.count_errors("type_warning", len(warnings))
+        print_error_limit(parser)
+        # Se pediu a árvore e o código está correto, imprime a árvore
+        if show_tree and not parser.errors:
+            print_tree(unit.optimization().tree if optimize else unit.syntax_tree())
+        # Se pediu a execução e o código está correto, compila e executa
+        if (run or show_bytecode or optimize) and not parser.errors and not parser.semantic_errors:
+            print_execution(unit, show_bytecode, optimize)
         
-        # Cria um novo scanner (precisa criar novamente porque o anterior foi consumido)
-        scanner = Scanner.from_string(source_code)
-        # Cria um parser com o scanner
-        parser = Parser(scanner)
+        # Se deve mostrar tokens, imprime mensagem de sucesso da análise léxica
+        if show_tokens:
+            print(f"\n{Colors.GREEN}{Colors.BOLD}✅ Análise léxica concluída com sucesso!{Colors.ENDC}")
         
+    except LexicalError as e:
+        # Se lançou exceção de erro léxico, imprime o erro
+        print(f"\n{Colors.RED}{Colors.BOLD}❌ ERRO LÉXICO:{Colors.ENDC}")
+        print(f"{Colors.RED}{str(e)}{Colors.ENDC}")
+        unit.metrics.count_errors("lexical")
+
+
+# ============================================================================
+# SAÍDA PARA OUTROS PROGRAMAS (NDJSON / TSV)
+# ============================================================================
+# Em vez do texto colorido para o terminal, escreve um registro por linha,
+# sem códigos de cor, num buffer grande (poucas escritas no terminal ou no
+# pipe). Os tokens saem direto dos vetores do TokenBuffer (sem criar objetos
+# Token). Registros:
+#   token       -> número, tipo, lexema, linha, coluna
+#   error       -> fase (lexical, syntax, semantic, type_warning), linha, coluna, mensagem
+#   statistics  -> tipo, quantidade (TSV: uma linha por tipo)
+#   summary     -> arquivo, tokens, erros, se parou no limite de erros
+# Exemplo (TSV): "token\t1\tINT\tint\t1\t1"
+# ============================================================================
+# Formatos da saída para outros programas
+MACHINE_FORMATS = ("ndjson", "tsv")
+# Tamanho do buffer de escrita (bytes)
+MACHINE_OUTPUT_BUFFER = 1 << 20
+# Opções da linha de comando que montam a árvore (com elas também saem os
+# avisos de tipo; sem elas, a análise só valida)
+TREE_OPTIONS = frozenset({"arvore", "ast", "executar", "run", "bytecode", "otimizar", "optimize"})
+
+
+# Converte um registro para uma linha NDJSON (JSON compacto, como o dos tokens)
+def ndjson_line(record: dict) -> str:
+    import json
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+# Gera as linhas dos tokens no formato pedido
+def machine_token_lines(tokens: TokenBuffer, format_name: str) -> Iterator[str]:
+    names = [token_type.name for token_type in TOKEN_TYPES]
+    records = zip(range(1, len(tokens) + 1), tokens.types, tokens.lexemes(), tokens.positions())
+    # Os lexemas são palavras, números e operadores: nunca precisam de escape
+    if format_name == "ndjson":
+        for index, code, lexeme, (line, column) in records:
+            yield (f'{{"kind":"token","index":{index},"type":"{names[code]}",'
+                   f'"lexeme":"{lexeme}","line":{line},"column":{column}}}\n')
+    else:
+        for index, code, lexeme, (line, column) in records:
+            yield f"token\t{index}\t{names[code]}\t{lexeme}\t{line}\t{column}\n"
+
+
+# Registro de um erro (fase, linha, coluna, mensagem), como nas linhas
+# NDJSON e nas respostas do daemon
+def error_record(phase: str, error) -> dict:
+    return {"phase": phase, "line": error.line, "column": error.column, "message": error.message}
+
+
+# Gera a linha de um erro no formato pedido
+def machine_error_line(phase: str, error, format_name: str) -> str:
+    if format_name == "ndjson":
+        return ndjson_line({"kind": "error", **error_record(phase, error)})
+    # Tabulação ou quebra de linha na mensagem estragaria as colunas
+    message = error.message.replace("\t", " ").replace("\n", " ")
+    return f"error\t{phase}\t{error.line}\t{error.column}\t{message}\n"
+
+
+# Gera a linha do resumo de um arquivo no formato pedido
+def machine_summary_line(path: str, tokens: int, errors: int, stopped: bool, format_name: str) -> str:
+    if format_name == "ndjson":
+        return ndjson_line({"kind": "summary", "file": path, "tokens": tokens,
+                            "errors": errors, "stopped": stopped})
+    return f"summary\t{path}\t{tokens}\t{errors}\t{int(stopped)}\n"
+
+
+# Escreve a análise de uma unidade para outros programas (NDJSON ou TSV)
+# (show_tokens / show_statistics: False pula a listagem ou as estatísticas)
+# (check_types: monta a árvore e escreve também os avisos de tipo)
+def write_machine_output(unit, format_name="ndjson", show_tokens=True, show_statistics=True, stream=None,
+                         check_types=False):
+    # Saída padrão com um buffer grande (o terminal não recebe uma escrita por linha)
+    own_stream = stream is None
+    if own_stream:
+        sys.stdout.flush()
+        stream = open(sys.stdout.fileno(), "w", encoding="utf-8",
+                      buffering=MACHINE_OUTPUT_BUFFER, closefd=False)
+    token_count = 0
+    error_count = 0
+    stopped = False
+    try:
         try:
-            # Executa a análise sintática
-            success = parser.parse()
-            # Se a análise foi bem-sucedida (sem erros)
-            if success:
-                # Imprime mensagem de sucesso
-                print(f"{Colors.GREEN}{Colors.BOLD}✅ Análise sintática concluída com sucesso!{Colors.ENDC}")
+            tokens = unit.tokens()
+        except LexicalError as e:
+            # A varredura parou: só o erro léxico é escrito
+            stream.write(machine_error_line("lexical", e, format_name))
+            unit.metrics.count_errors("lexical")
+            error_count = 1
+            tokens = None
+        if tokens is not None:
+            token_count = len(tokens)
+            if show_tokens:
+                stream.writelines(machine_token_lines(tokens, format_name))
+            # Erros na mesma ordem do modo normal: sintáticos; sem eles, os
+            # semânticos; sem esses, os avisos de tipo (check_types: só eles
+            # precisam da árvore)
+            if check_types:
+                unit.syntax_tree()
+            parser = unit.parse()
+            stopped = parser.stopped
+            diagnostics = [("syntax", parser.errors)]
+            if not parser.errors:
+                diagnostics.append(("semantic", parser.semantic_errors))
+                if check_types and not parser.semantic_errors:
+                    diagnostics.append(("type_warning", unit.types().warnings))
+            for phase, errors in diagnostics:
+                stream.writelines(machine_error_line(phase, error, format_name) for error in errors)
+                unit.metrics.count_errors(phase, len(errors))
+                if phase != "type_warning":
+                    error_count += len(errors)
+            if show_statistics:
+                counts = tokens.count_types().most_common()
+                if format_name == "ndjson":
+                    stream.write(ndjson_line({"kind": "statistics", "total": token_count,
+                                              "counts": {token_type.name: count for token_type, count in counts}}))
+                else:
+                    stream.writelines(f"statistics\t{token_type.name}\t{count}\n" for token_type, count in counts)
+        # Resumo
+        path = str(unit.path) if unit.path is not None else ""
+        stream.write(machine_summary_line(path, token_count, error_count, stopped, format_name))
+    finally:
+        # Esvazia o buffer (sem fechar a saída padrão)
+        if own_stream:
+            stream.close()
+        else:
+            stream.flush()
+
+
+# Analisa um arquivo em modo fluxo: lê em blocos de tamanho fixo e imprime
+# cada token assim que ele é reconhecido (o arquivo nunca é lido inteiro)
+# Uma passada só: o parser puxa os tokens do scanner, e cada token é
+# contado (e impresso) quando o parser o lê, então um erro no começo do
+# arquivo aparece na hora, sem esperar o fim da leitura
+# (show_tokens=False: sem a listagem, só os erros e o resumo)
+# (max_errors: para a análise sintática depois de tantos erros)
+def analyze_stream(source_path, show_tokens=True, chunk_size=DEFAULT_CHUNK_SIZE, max_errors=None):
+    # Se deve mostrar os tokens, imprime cabeçalho
+    if show_tokens:
+        print(f"\n{Colors.HEADER}{Colors.BOLD}🔤 TOKENS ENCONTRADOS{Colors.ENDC}")
+        print(f"{Colors.CYAN}{'─' * 80}{Colors.ENDC}")
+
+    # Contagem de tokens por tipo (feita enquanto o parser lê)
+    token_counts = Counter()
+
+    # Entrega os tokens do scanner ao parser, contando (e imprimindo) cada um
+    def listed(scanner):
+        for i, token in enumerate(scanner, 1):
+            token_counts[token.type] += 1
+            if show_tokens:
+                print_token(token, i)
+            yield token
+
+    try:
+        # Abre o arquivo em modo binário (o StreamScanner decodifica aos poucos)
+        with open(source_path, "rb") as f:
+            # O parser também lê os tokens aos poucos, sem guardar todos
+            parser = StreamingParser(listed(StreamScanner(f, chunk_size)), max_errors=max_errors)
+            if show_tokens:
+                # Com a listagem, cada erro sintático aparece logo depois do
+                # token onde foi encontrado (e de novo no resumo, no fim)
+                for error in parser.iter_errors():
+                    print(f"{Colors.RED}  ❌ {str(error)}{Colors.ENDC}")
             else:
-                # Se houve erros, pega a lista de erros
-                errors = parser.get_errors()
-                # Se há erros na lista
-                if errors:
-                    # Imprime cabeçalho de erros
-                    print(f"{Colors.RED}{Colors.BOLD}❌ ERROS SINTÁTICOS ENCONTRADOS:{Colors.ENDC}")
-                    # Para cada erro, imprime a mensagem
-                    for error in errors:
-                        print(f"{Colors.RED}  {str(error)}{Colors.ENDC}")
-        except SyntaxError as e:
-            # Se lançou exceção de erro sintático, imprime o erro
-            print(f"{Colors.RED}{Colors.BOLD}❌ ERRO SINTÁTICO:{Colors.ENDC}")
-            print(f"{Colors.RED}{str(e)}{Colors.ENDC}")
-        
+                # Sem a listagem, os erros saem direto na seção sintática
+                print_parse_result(parser.iter_errors())
+
+        # Se não encontrou nenhum token
+        if not token_counts:
+            # Imprime aviso
+            print(f"{Colors.YELLOW}⚠️  Nenhum token encontrado no código fornecido{Colors.ENDC}")
+            return
+
+        # Se deve mostrar os tokens, imprime as estatísticas e o resumo dos
+        # erros sintáticos
+        if show_tokens:
+            print_statistics(token_counts)
+            print_parse_result(parser.errors)
+        # Sem erros sintáticos, mostra os erros semânticos (mesmo passo)
+        if not parser.errors:
+            print_semantic_result(parser.semantic_errors)
+        print_error_limit(parser)
+
         # Se deve mostrar tokens, imprime mensagem de sucesso da análise léxica
         if show_tokens:
             print(f"\n{Colors.GREEN}{Colors.BOLD}✅ Análise léxica concluída com sucesso!{Colors.ENDC}")
-        
+
     except LexicalError as e:
         # Se lançou exceção de erro léxico, imprime o erro
         print(f"\n{Colors.RED}{Colors.BOLD}❌ ERRO LÉXICO:{Colors.ENDC}")
         print(f"{Colors.RED}{str(e)}{Colors.ENDC}")
 
 
+# Imprime o resultado de um arquivo do modo lote (ou do modo cliente)
+def print_file_report(report, max_errors=None):
+    if not report.errors:
+        print(f"{Colors.GREEN}✅ {report.path}{Colors.ENDC} {Colors.CYAN}({report.tokens} tokens){Colors.ENDC}")
+        return
+    print(f"{Colors.RED}❌ {report.path}{Colors.ENDC}")
+    for error in report.errors:
+        print(f"{Colors.RED}     {error}{Colors.ENDC}")
+    if report.stopped:
+        print(f"{Colors.YELLOW}     ⚠️  Análise interrompida no limite de erros (--max-erros={max_errors}){Colors.ENDC}")
+
+
+# Modo lote - analisa todos os arquivos encontrados (pastas e padrões glob)
+# em paralelo, imprimindo cada arquivo assim que termina e um resumo no fim
+# (retorna False se algum arquivo teve erro)
+# (metrics: recebe as métricas de todos os arquivos, somadas)
+# (max_errors: a análise de cada arquivo para depois de tantos erros)
+def analyze_batch(patterns, engine="regex", workers=None, cache_directory=None, metrics=NULL_METRICS,
+                  max_errors=None):
+    # Encontra os arquivos
+    sources = find_sources(patterns)
+    if not sources:
+        print(f"{Colors.RED}❌ Nenhum arquivo .mc encontrado em: {' '.join(patterns)}{Colors.ENDC}")
+        return False
+    workers = workers or os.cpu_count() or 1
+    # Imprime cabeçalho do modo lote
+    print(f"\n{Colors.HEADER}{Colors.BOLD}📦 MODO LOTE{Colors.ENDC}")
+    print(f"{Colors.CYAN}{'─' * 80}{Colors.ENDC}")
+    print(f"  {Colors.CYAN}{len(sources)} arquivos, {workers} processos, motor {engine}{Colors.ENDC}\n")
+    # Totais do resumo
+    total_tokens = 0
+    total_errors = 0
+    failed = 0
+    cached = 0
+    start = time.perf_counter()
+    # Imprime cada arquivo na ordem em que a análise dele termina
+    for report in run_batch(sources, engine, workers, cache_directory, metrics.enabled, max_errors):
+        total_tokens += report.tokens
+        cached += report.cached
+        if report.metrics is not None:
+            metrics.merge(report.metrics)
+        with metrics.phase("report"):
+            print_file_report(report, max_errors)
+        if report.errors:
+            failed += 1
+            total_errors += len(report.errors)
+    elapsed = time.perf_counter() - start
+    # Imprime o resumo
+    print(f"\n{Colors.HEADER}{Colors.BOLD}📊 RESUMO DO LOTE{Colors.ENDC}")
+    print(f"{Colors.CYAN}{'─' * 80}{Colors.ENDC}")
+    print(f"  Arquivos: {Colors.GREEN}{len(sources)}{Colors.ENDC} "
+          f"({Colors.RED if failed else Colors.GREEN}{failed} com erros{Colors.ENDC})")
+    print(f"  Tokens: {Colors.GREEN}{total_tokens}{Colors.ENDC}")
+    print(f"  Erros: {Colors.RED if total_errors else Colors.GREEN}{total_errors}{Colors.ENDC}")
+    if cache_directory is not None:
+        print(f"  Cache: {Colors.GREEN}{cached}{Colors.ENDC} de {len(sources)} arquivos sem nova análise")
+    rate = len(sources) / elapsed if elapsed > 0 else 0
+    print(f"  Tempo: {Colors.GREEN}{elapsed * 1000:.1f} ms{Colors.ENDC} ({rate:,.1f} arquivos/s)")
+    return not failed
+
+
+# Modo daemon - inicia o daemon e atende pedidos até ser encerrado
+# (command: "status" mostra o estado do daemon; "parar" encerra o daemon)
+# (retorna False se não conseguiu)
+def daemon_mode(command=True, socket_path=None, workers=None):
+    socket_path = socket_path or default_socket_path()
+    if command in ("status", "parar", "stop"):
+        client = DaemonClient.connect(socket_path)
+        if client is None:
+            print(f"{Colors.YELLOW}⚠️  Nenhum daemon rodando em {socket_path}{Colors.ENDC}")
+            return False
+        try:
+            response = client.request({"command": "status" if command == "status" else "shutdown"})
+        finally:
+            client.close()
+        if command != "status":
+            print(f"{Colors.GREEN}✅ Daemon encerrado{Colors.ENDC}")
+            return True
+        print(f"{Colors.HEADER}{Colors.BOLD}🛰️  DAEMON{Colors.ENDC} {Colors.CYAN}{socket_path}{Colors.ENDC}")
+        print(f"  Processo: {Colors.GREEN}{response['pid']}{Colors.ENDC} ({response['workers']} processos de análise)")
+        print(f"  Pedidos: {Colors.GREEN}{response['requests']}{Colors.ENDC}")
+        print(f"  Resultados em memória: {Colors.GREEN}{response['entries']}{Colors.ENDC} "
+              f"({response['hits']} acertos, {response['misses']} faltas)")
+        return True
+    server = start_daemon(socket_path, workers)
+    if server is None:
+        print(f"{Colors.RED}❌ Já há um daemon rodando em {socket_path}{Colors.ENDC}")
+        return False
+    # flush: a mensagem aparece na hora mesmo com a saída num arquivo
+    print(f"{Colors.HEADER}{Colors.BOLD}🛰️  Daemon ouvindo em {socket_path}{Colors.ENDC} "
+          f"{Colors.CYAN}({server.workers} processos; Ctrl+C ou --daemon=parar para encerrar){Colors.ENDC}",
+          flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print(f"{Colors.GREEN}✅ Daemon encerrado ({server.requests} pedidos atendidos){Colors.ENDC}")
+    return True
+
+
+# Modo cliente - pede ao daemon a análise de cada arquivo (pastas, padrões
+# glob, arquivos ou '-' para a entrada padrão) e imprime um resultado por
+# arquivo; sem daemon, analisa neste processo, com o mesmo resultado
+# (output_format: "ndjson" ou "tsv" escreve os registros de erro e de resumo)
+# (retorna False se algum arquivo teve erro)
+def analyze_client(patterns, engine="regex", max_errors=None, socket_path=None,
+                   output_format=None):
+    socket_path = socket_path or default_socket_path()
+    # Pedidos: caminho absoluto (o daemon pode estar em outra pasta) ou o código
+    requests = []
+    if "-" in patterns:
+        requests.append(("-", {"source": sys.stdin.read()}))
+    for source in find_sources([pattern for pattern in patterns if pattern != "-"]):
+        requests.append((str(source), {"path": str(Path(source).resolve())}))
+    if not requests:
+        print(f"{Colors.RED}❌ Nenhum arquivo .mc encontrado em: {' '.join(patterns)}{Colors.ENDC}")
+        return False
+    version = compiler_version().hex()
+    client = DaemonClient.connect(socket_path)
+    served = 0
+    failed = 0
+    for name, request in requests:
+        request.update(engine=engine, max_errors=max_errors, version=version)
+        response = None
+        if client is not None:
+            try:
+                response = client.request(request)
+            except (OSError, ValueError):
+                # O daemon parou no meio: o resto é analisado aqui
+                response = None
+            if response is None or "version" in response:
+                if response is not None:
+                    print(f"{Colors.YELLOW}⚠️  {response['message']}: análise feita neste processo{Colors.ENDC}",
+                          file=sys.stderr)
+                client.close()
+                client = None
+                response = None
+            else:
+                served += 1
+        if response is None:
+            try:
+                response = check_source(request_source(request), engine, max_errors)
+            except OSError as e:
+                response = {"ok": False, "message": f"Erro ao ler arquivo: {e}"}
+        # Erros remontados com a classe da fase (mesmo texto da análise local)
+        if response["ok"]:
+            errors = [(record["phase"], ERROR_PHASES[record["phase"]](
+                record["message"], record["line"], record["column"])) for record in response["errors"]]
+            report = FileReport(name, response["tokens"], [str(error) for _, error in errors], 0.0,
+                                response.get("cached", False), response["stopped"])
+        else:
+            errors = []
+            report = FileReport(name, 0, [response["message"]], 0.0)
+        failed += bool(report.errors)
+        if output_format is None:
+            print_file_report(report, max_errors)
+            continue
+        if not response["ok"]:
+            print(f"❌ {name}: {response['message']}", file=sys.stderr)
+        sys.stdout.writelines(machine_error_line(phase, error, output_format) for phase, error in errors)
+        sys.stdout.write(machine_summary_line(name, report.tokens, len(report.errors), report.stopped,
+                                              output_format))
+    if client is not None:
+        client.close()
+    if output_format is None:
+        where = f"daemon em {socket_path}" if served else "sem daemon: análise feita neste processo"
+        print(f"{Colors.CYAN}  {len(requests)} arquivos, {failed} com erros ({where}){Colors.ENDC}")
+    return not failed
+
+
+# Imprime o resultado de uma linha do modo interativo
+def print_repl_result(session, errors):
+    # Se houve erros, imprime cada um (já com a linha da sessão)
+    if errors:
+        for error in errors:
+            print(f"{Colors.RED}  ❌ {str(error)}{Colors.ENDC}")
+        return
+    # Se um comando terminou nesta linha, imprime os tokens dele
+    if session.completed is not None:
+        # Numeração continua a da sessão (o primeiro token deste comando)
+        first = session.token_count - len(session.completed) + 1
+        for i, token in enumerate(session.completed_tokens(), first):
+            print_token(token, i)
+        print(f"{Colors.GREEN}  ✅ Comando válido{Colors.ENDC}")
+
+
+# Imprime as variáveis da sessão interativa
+def print_variables(session):
+    # Se nenhuma variável foi declarada, avisa
+    if not session.variables:
+        print(f"{Colors.YELLOW}  Nenhuma variável declarada{Colors.ENDC}")
+        return
+    # Imprime cada variável com o tipo
+    # (variável criada só por atribuição não tem tipo declarado)
+    for name, type_name in session.variables.items():
+        print(f"  {Colors.GREEN}{name:<15}{Colors.ENDC} {Colors.CYAN}{type_name or 'sem tipo'}{Colors.ENDC}")
+
+
 # Modo interativo - permite digitar código diretamente no terminal
-def interactive_mode():
+# Cada linha é analisada assim que é digitada, sem analisar de novo as
+# linhas anteriores (o estado fica guardado numa ReplSession)
+def interactive_mode(engine="classico"):
     # Imprime o cabeçalho do programa
     print_header()
     # Imprime mensagem de modo interativo ativado
     print(f"{Colors.GREEN}{Colors.BOLD}🎯 MODO INTERATIVO ATIVADO{Colors.ENDC}")
     print(f"{Colors.CYAN}Digite seu código diretamente no terminal!{Colors.ENDC}")
-    
+    # Imprime dicas de uso
+    print(f"{Colors.WARNING}💡 Dicas:{Colors.ENDC}")
+    print(f"  • Cada linha é analisada assim que você aperta Enter")
+    print(f"  • Comandos incompletos continuam na próxima linha (prompt '...')")
+    print(f"  • Digite 'VARS' para ver as variáveis declaradas")
+    print(f"  • Digite 'SAIR' para encerrar")
+    print(f"  • Digite 'AJUDA' para ver exemplos de sintaxe")
+    print(f"  • Use Ctrl+C para sair a qualquer momento")
+    # Imprime linha de separação
+    print(f"{Colors.CYAN}{'─' * 60}{Colors.ENDC}")
+
+    # Sessão que guarda os tokens, o comando pendente e as variáveis
+    session = ReplSession(engine)
+
     # Loop principal do modo interativo
     while True:
-        # Obtém o código digitado pelo usuário
-        source_code = get_user_input()
-        # Se retornou None, o usuário quer sair
-        if source_code is None:
-            # Sai do loop
-            break
-            
-        # Imprime resumo (modo interativo)
-        print_summary(is_interactive=True)
-        # Analisa o código digitado
-        analyze_code(source_code, is_interactive=True)
-        
-        # Pergunta se quer analisar outro código
-        print(f"\n{Colors.CYAN}Deseja analisar outro código? (s/n): {Colors.ENDC}", end="", flush=True)
+        # Prompt: '...' enquanto um comando não terminou
+        prompt = "... " if session.is_pending else ">>> "
+        print(f"{Colors.GREEN}{prompt}{Colors.ENDC}", end="", flush=True)
         try:
-            # Lê a resposta do usuário
-            response = input().strip().lower()
-            # Se não respondeu 's', 'sim', 'y' ou 'yes', sai
-            if response not in ['s', 'sim', 'y', 'yes']:
-                # Sai do loop
-                break
-        except KeyboardInterrupt:
-            # Se pressionou Ctrl+C, sai
+            # Lê uma linha do usuário
+            line = input()
+        except (KeyboardInterrupt, EOFError):
+            # Se o usuário pressionou Ctrl+C (ou a entrada acabou), sai
+            print(f"\n{Colors.YELLOW}👋 Saindo...{Colors.ENDC}")
             break
-    
+        # Comandos do modo interativo (só fora de um comando pendente)
+        command = line.strip().upper()
+        if not session.is_pending:
+            # Se digitou 'SAIR', encerra
+            if command == "SAIR":
+                break
+            # Se digitou 'AJUDA', mostra a ajuda com exemplos
+            if command == "AJUDA":
+                print_help()
+                continue
+            # Se digitou 'VARS', mostra as variáveis declaradas
+            if command == "VARS":
+                print_variables(session)
+                continue
+        # Analisa a linha e imprime o resultado
+        print_repl_result(session, session.feed(line))
+
     # Mensagem de despedida
     print(f"\n{Colors.GREEN}{Colors.BOLD}👋 Obrigado por usar o Analisador Léxico!{Colors.ENDC}")
 
 
+# Grava as métricas no formato pedido, num arquivo ou na saída padrão
+def write_metrics(metrics, format_name="json", output=None):
+    text = metrics.render(format_name)
+    if output:
+        Path(output).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+
+
+# Separa as opções (--nome ou --nome=valor) dos argumentos comuns (arquivos)
+def parse_options(argv):
+    # Dicionário de opções: "--motor=regex" vira {"motor": "regex"}, "-i" vira {"i": True}
+    options = {}
+    # Lista dos demais argumentos (nomes de arquivos)
+    args = []
+    # Para cada argumento recebido
+    for arg in argv:
+        # Se não começa com '-', é um argumento comum
+        if not arg.startswith("-") or arg == "-":
+            args.append(arg)
+            continue
+        # Remove os traços do início e separa nome e valor (se houver '=')
+        name, sep, value = arg.lstrip("-").partition("=")
+        # Sem '=', a opção é apenas uma flag (True)
+        options[name] = value if sep else True
+    # Retorna as opções e os argumentos
+    return options, args
+
+
+# Lê o número de processos (--processos=N ou --workers=N; None: um por núcleo)
+def parse_workers(options) -> Optional[int]:
+    workers = options.get("processos", options.get("workers"))
+    # Sem a opção, o padrão fica por conta de quem usa
+    if workers is None:
+        return None
+    # Precisa ser um inteiro a partir de 1 (sem valor, 0, negativo ou texto: erro)
+    if workers is True or not workers.isdigit() or int(workers) < 1:
+        print(f"{Colors.RED}❌ Número de processos inválido: use --processos=N (N a partir de 1){Colors.ENDC}")
+        sys.exit(1)
+    return int(workers)
+
+
 # Função principal do programa
 def main() -> None:
+    # Separa opções e argumentos da linha de comando
+    options, args = parse_options(sys.argv[1:])
+    # Motor de varredura escolhido (--motor=regex ou --engine=regex)
+    engine = options.get("motor", options.get("engine", "classico"))
+    # Se o motor não existe, avisa e sai
+    if engine not in SCANNER_ENGINES:
+        print(f"{Colors.RED}❌ Motor desconhecido: {engine} (opções: {', '.join(SCANNER_ENGINES)}){Colors.ENDC}")
+        sys.exit(1)
+
+    # Métricas (--metricas=json ou --metricas=prometheus; --metricas-saida=arquivo
+    # grava num arquivo em vez de imprimir no fim)
+    metrics_format = options.get("metricas", options.get("metrics"))
+    if metrics_format is True:
+        metrics_format = "json"
+    if metrics_format is not None and metrics_format not in METRIC_FORMATS:
+        print(f"{Colors.RED}❌ Formato de métricas desconhecido: {metrics_format} "
+              f"(opções: {', '.join(METRIC_FORMATS)}){Colors.ENDC}")
+        sys.exit(1)
+    metrics = Metrics() if metrics_format else NULL_METRICS
+    metrics_output = options.get("metricas-saida", options.get("metrics-output"))
+
+    # Saída para outros programas (--saida=ndjson ou --saida=tsv), sem cores
+    # (--sem-tokens e --sem-estatisticas pulam essas partes)
+    output_format = options.get("saida", options.get("output"))
+    if output_format is not None and output_format not in MACHINE_FORMATS:
+        print(f"{Colors.RED}❌ Formato de saída desconhecido: {output_format} "
+              f"(opções: {', '.join(MACHINE_FORMATS)}){Colors.ENDC}")
+        sys.exit(1)
+
+    # Cache de análise em disco (--cache usa a pasta .mccache; --cache=PASTA)
+    cache_directory = options.get("cache")
+    if cache_directory is True:
+        cache_directory = DEFAULT_CACHE_DIRECTORY
+
+    # Limite de erros (--max-erros=N: para a análise depois de N erros;
+    # --parar-no-erro é o mesmo que --max-erros=1)
+    max_errors = options.get("max-erros", options.get("max-errors"))
+    if options.keys() & {'parar-no-erro', 'fail-fast'}:
+        max_errors = "1"
+    if max_errors is not None:
+        if max_errors is True or not max_errors.isdigit() or int(max_errors) < 1:
+            print(f"{Colors.RED}❌ Limite de erros inválido: use --max-erros=N (N a partir de 1){Colors.ENDC}")
+            sys.exit(1)
+        max_errors = int(max_errors)
+
+    # Verificação rápida (--verificar ou --check): só diz se os arquivos têm
+    # erros (léxicos, sintáticos ou semânticos), sem cores, cabeçalho nem
+    # listagem de tokens; sai com código 1 se algum arquivo tiver erro.
+    # Feita para scripts de build que verificam um arquivo por vez: só o
+    # scanner e o parser são usados (nenhum módulo extra é importado)
+    if options.keys() & {'verificar', 'check'}:
+        check_engine = options.get("motor", options.get("engine", "regex"))
+        failed = False
+        for path in args or ["programa.mc"]:
+            report = check_file(path, check_engine, cache_directory, max_errors=max_errors)
+            for error in report.errors:
+                print(f"{report.path}: {error}")
+            failed = failed or bool(report.errors)
+        sys.exit(1 if failed else 0)
+
+    # Servidor de linguagem para editores (--lsp): fala o protocolo pela
+    # entrada e saída padrão (nada mais pode ser impresso na saída)
+    # A entrada é lida por uma thread que pode estar bloqueada quando o
+    # programa sai: ela usa um leitor próprio, e não o sys.stdin (que o
+    # Python fecha ao sair)
+    if "lsp" in options:
+        import asyncio
+        stdin = open(sys.stdin.fileno(), "rb", closefd=False)
+        sys.exit(asyncio.run(LanguageServer(stdin, sys.stdout.buffer).serve()))
+
+    # Caminho do socket do daemon (--socket=CAMINHO; padrão: na pasta temporária)
+    socket_path = options.get("socket")
+    if socket_path is True:
+        socket_path = None
+
+    # Daemon (--daemon inicia e atende pedidos; --daemon=status mostra o
+    # estado; --daemon=parar encerra; --processos=N: processos de análise)
+    if "daemon" in options:
+        command = options["daemon"]
+        if command not in (True, "status", "parar", "stop"):
+            print(f"{Colors.RED}❌ Comando do daemon desconhecido: {command} (opções: status, parar){Colors.ENDC}")
+            sys.exit(1)
+        ok = daemon_mode(command, socket_path, parse_workers(options))
+        sys.exit(0 if ok else 1)
+
+    # Cliente do daemon (--cliente ou --client): os argumentos são como no
+    # modo lote; sem daemon rodando, a análise é feita neste processo
+    if options.keys() & {'cliente', 'client'}:
+        client_engine = options.get("motor", options.get("engine", "regex"))
+        ok = analyze_client(args or ["."], client_engine, max_errors, socket_path, output_format)
+        # Código de saída 1 se algum arquivo teve erro
+        sys.exit(0 if ok else 1)
+
+    # Modo lote (--lote ou --batch): os argumentos são pastas, padrões glob ou
+    # arquivos (--processos=N: número de processos; padrão: um por núcleo)
+    if options.keys() & {'lote', 'batch'}:
+        workers = parse_workers(options)
+        print_header()
+        # Sem --motor, usa o scanner regex (o mais rápido)
+        batch_engine = options.get("motor", options.get("engine", "regex"))
+        ok = analyze_batch(args or ["."], batch_engine, workers,
+                           cache_directory, metrics, max_errors)
+        if metrics.enabled:
+            write_metrics(metrics, metrics_format, metrics_output)
+        # Código de saída 1 se algum arquivo teve erro
+        sys.exit(0 if ok else 1)
+
     # Verifica se foi passado argumento '-i', '--interactive' ou '--interativo'
-    if len(sys.argv) > 1 and sys.argv[1] in ['-i', '--interactive', '--interativo']:
+    if options.keys() & {'i', 'interactive', 'interativo'}:
         # Se sim, inicia o modo interativo
-        interactive_mode()
+        interactive_mode(engine)
         # Retorna (sai da função)
         return
     
     # Se não foi passado nenhum argumento
-    if len(sys.argv) < 2:
+    if not args:
         # Tenta usar o arquivo padrão 'programa.mc'
         source_path = Path("programa.mc")
         # Se o arquivo não existe
@@ -1134,12 +6049,25 @@ def main() -> None:
             print(f"{Colors.YELLOW}💡 Opções disponíveis:{Colors.ENDC}")
             print(f"  • {Colors.CYAN}python3 main.py <arquivo.mc>{Colors.ENDC} - Analisar arquivo")
             print(f"  • {Colors.CYAN}python3 main.py -i{Colors.ENDC} - Modo interativo")
+            print(f"  • {Colors.CYAN}python3 main.py --motor=regex <arquivo.mc>{Colors.ENDC} - Usar o scanner regex (mais rápido)")
+            print(f"  • {Colors.CYAN}python3 main.py --fluxo <arquivo.mc>{Colors.ENDC} - Ler o arquivo em blocos (arquivos enormes)")
+            print(f"  • {Colors.CYAN}python3 main.py --arvore <arquivo.mc>{Colors.ENDC} - Mostrar a árvore sintática")
+            print(f"  • {Colors.CYAN}python3 main.py --executar <arquivo.mc>{Colors.ENDC} - Compilar e executar o programa")
+            print(f"  • {Colors.CYAN}python3 main.py --otimizar <arquivo.mc>{Colors.ENDC} - Otimizar, compilar e executar")
+            print(f"  • {Colors.CYAN}python3 main.py --lote <pasta> <padrão>{Colors.ENDC} - Analisar vários arquivos em paralelo")
+            print(f"  • {Colors.CYAN}python3 main.py --cache <arquivo.mc>{Colors.ENDC} - Reaproveitar a análise de arquivos que não mudaram")
+            print(f"  • {Colors.CYAN}python3 main.py --metricas=json <arquivo.mc>{Colors.ENDC} - Tempo de cada fase e contadores (json ou prometheus)")
+            print(f"  • {Colors.CYAN}python3 main.py --saida=ndjson <arquivo.mc>{Colors.ENDC} - Tokens e erros para outros programas (ndjson ou tsv)")
+            print(f"  • {Colors.CYAN}python3 main.py --max-erros=N <arquivo.mc>{Colors.ENDC} - Parar a análise depois de N erros (--parar-no-erro: no primeiro)")
+            print(f"  • {Colors.CYAN}python3 main.py --daemon{Colors.ENDC} - Manter o compilador carregado (use --cliente <arquivo.mc> para pedir análises)")
+            print(f"  • {Colors.CYAN}python3 -m main --verificar <arquivo.mc>{Colors.ENDC} - Só verificar se há erros (rápido, para scripts; na pasta do projeto)")
+            print(f"  • {Colors.CYAN}python3 main.py --lsp{Colors.ENDC} - Servidor de linguagem: erros no editor enquanto o código é digitado")
             print(f"  • {Colors.CYAN}Coloque um arquivo chamado 'programa.mc' na pasta atual{Colors.ENDC}")
             # Sai do programa com código de erro
             sys.exit(1)
     else:
         # Se foi passado um argumento, usa como nome do arquivo
-        source_path = Path(sys.argv[1])
+        source_path = Path(args[0])
         # Se o arquivo não existe
         if not source_path.exists():
             # Imprime erro
@@ -1147,18 +6075,71 @@ def main() -> None:
             # Sai do programa com código de erro
             sys.exit(1)
 
+    # Saída para outros programas: só os registros (sem cabeçalho nem resumo)
+    if output_format is not None:
+        try:
+            unit = CompilationUnit.from_path(source_path, engine, open_cache(cache_directory), metrics,
+                                             max_errors)
+            try:
+                with metrics.phase("report"):
+                    write_machine_output(unit, output_format,
+                                         show_tokens=not options.keys() & {'sem-tokens', 'no-tokens'},
+                                         show_statistics=not options.keys() & {'sem-estatisticas', 'no-stats'},
+                                         check_types=bool(options.keys() & TREE_OPTIONS))
+            finally:
+                unit.close()
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"❌ Erro ao ler arquivo: {e}", file=sys.stderr)
+            sys.exit(1)
+        if metrics.enabled:
+            # As métricas vão para o arquivo pedido, ou para a saída de erros
+            # (a saída padrão tem só os registros)
+            if metrics_output:
+                write_metrics(metrics, metrics_format, metrics_output)
+            else:
+                sys.stderr.write(metrics.render(metrics_format))
+        return
+
     # Imprime o cabeçalho do programa
     print_header()
-    # Imprime resumo do arquivo
-    print_summary(source_path)
     
     try:
-        # Abre o arquivo em modo leitura com codificação UTF-8
-        with open(source_path, 'r', encoding='utf-8') as f:
-            # Lê todo o conteúdo do arquivo
-            source_code = f.read()
-        # Analisa o código (análise léxica e sintática)
-        analyze_code(source_code)
+        # Modo fluxo (--fluxo ou --stream): lê o arquivo em blocos, sem carregá-lo inteiro
+        if options.keys() & {'fluxo', 'stream'}:
+            # Imprime resumo do arquivo (contado linha a linha)
+            print_summary(source_path)
+            analyze_stream(source_path, max_errors=max_errors,
+                           show_tokens=not options.keys() & {'sem-tokens', 'no-tokens'})
+            return
+        # Lê o arquivo uma única vez (o motor mmap mapeia em vez de ler)
+        # (com --cache, a análise de um arquivo que não mudou vem do cache)
+        # (com --metricas, o tempo de cada fase e os contadores vão para metrics)
+        unit = CompilationUnit.from_path(source_path, engine, open_cache(cache_directory), metrics,
+                                         max_errors)
+        try:
+            # A impressão conta como "report" (as fases calculadas no meio
+            # dela contam com o próprio nome)
+            with metrics.phase("report"):
+                # Imprime resumo do arquivo (calculado sobre o que já foi lido)
+                print_summary(source_path, unit=unit)
+                # Decodifica o texto já aqui (um arquivo que não é UTF-8 dá erro
+                # de leitura antes de a análise começar)
+                unit.text()
+                # Analisa o código (análise léxica e sintática)
+                # (--arvore ou --ast: imprime também a árvore sintática)
+                # (--executar ou --run: compila e executa; --bytecode: mostra as instruções)
+                # (--otimizar ou --optimize: otimiza antes de compilar e executar)
+                analyze_code(None, engine=engine, unit=unit,
+                             show_tree=bool(options.keys() & {'arvore', 'ast'}),
+                             run=bool(options.keys() & {'executar', 'run'}),
+                             show_bytecode='bytecode' in options,
+                             optimize=bool(options.keys() & {'otimizar', 'optimize'}))
+        finally:
+            # Libera o arquivo mapeado (se houver)
+            unit.close()
+        # Se pediu, grava (ou imprime) as métricas
+        if metrics.enabled:
+            write_metrics(metrics, metrics_format, metrics_output)
     except Exception as e:
         # Se der qualquer erro ao ler o arquivo, imprime o erro
         print(f"{Colors.RED}❌ Erro ao ler arquivo: {e}{Colors.ENDC}")